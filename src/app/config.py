@@ -9,3 +9,6 @@ WMTS_URL = "https://wmts.marine.copernicus.eu/teroWmts/GLOBAL_ANALYSISFORECAST_W
 
 COPERNICUS_USERNAME = os.getenv("COPERNICUS_USERNAME")
 COPERNICUS_PASSWORD = os.getenv("COPERNICUS_PASSWORD")
+
+# Serveur de tuiles local : ses tuiles /wmts/... relaient Copernicus avec un cache disque
+TILE_SERVER_URL = os.getenv("TILE_SERVER_URL", "http://localhost:8000")
@@ -5,7 +5,7 @@ from src.app.config import WMTS_URL, COPERNICUS_USERNAME, COPERNICUS_PASSWORD
 
 
 def main():
-    wmts = get_wmts_capabilities()
+    wmts = get_wmts_capabilities(WMTS_URL, COPERNICUS_USERNAME, COPERNICUS_PASSWORD)
     # Exemple : première couche trouvée
     layer_name = list(wmts.contents.keys())[0]
     print(f"\n🛰️ Visualisation de la couche : {layer_name}")
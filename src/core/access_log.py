@@ -0,0 +1,56 @@
+# src/core/access_log.py
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+
+# Logger du serveur de tuiles (journal d'accès et messages des workers)
+LOGGER_NAME = "tile_server"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON."""
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+                  + f'.{int(record.msecs):03d}',
+            'level': record.levelname.lower(),
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+def start_logging(stream=None, level=logging.INFO):
+    """Branche le logger sur une file : l'écriture a lieu dans un thread dédié.
+
+    Les workers ne font que déposer l'enregistrement dans la file ; la
+    sérialisation JSON et les écritures sur le flux sont faites par le
+    QueueListener. Retourne le listener, à arrêter avec stop_logging().
+    """
+    log_queue = queue.SimpleQueue()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    return listener
+
+
+def stop_logging(listener):
+    """Vide la file puis arrête le thread d'écriture."""
+    listener.stop()
+    logger.handlers = []
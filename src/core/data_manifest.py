@@ -0,0 +1,220 @@
+# src/core/data_manifest.py
+import json
+import os
+import tempfile
+import time
+
+from src.core.tile_pyramid import TILES_DIR
+from src.core.vector_data import GEOJSON_DIR
+
+
+# Manifeste persistant des données servies (reconstruit de façon incrémentale)
+MANIFEST_PATH = "data/.manifest.json"
+MANIFEST_VERSION = 2
+
+VECTOR_DIR = "data/vector"
+
+# Extensions suivies dans les dossiers Shapefile
+SHAPEFILE_EXTENSIONS = ('shp', 'dbf', 'shx', 'prj', 'cpg')
+REQUIRED_SHAPEFILE_EXTENSIONS = ('shp', 'dbf', 'shx')
+
+
+def _dir_fingerprint(path):
+    """mtime le plus récent du répertoire et de ses entrées directes.
+
+    Le mtime du répertoire suit les ajouts, suppressions et remplacements
+    atomiques ; celui des fichiers, les réécritures en place.
+    """
+    try:
+        latest = os.stat(path).st_mtime_ns
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    latest = max(latest, entry.stat(follow_symlinks=False).st_mtime_ns)
+                except OSError:
+                    pass
+    except OSError:
+        return None
+    return latest
+
+
+def _pyramid_fingerprint(path):
+    """Empreinte d'une pyramide : ses niveaux de zoom et la tuile 0/0/0."""
+    fingerprint = _dir_fingerprint(path)
+    try:
+        root_tile = os.stat(os.path.join(path, '0', '0', '0.png')).st_mtime_ns
+    except OSError:
+        root_tile = None
+    return [fingerprint, root_tile]
+
+
+def _scan_shapefile_folder(path):
+    """Compte les fichiers Shapefile d'un dossier en un seul listing."""
+    counts = dict.fromkeys(SHAPEFILE_EXTENSIONS, 0)
+    shp_files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            ext = entry.name.rsplit('.', 1)[-1].lower() if '.' in entry.name else ''
+            if ext in counts and entry.is_file():
+                counts[ext] += 1
+                if ext == 'shp':
+                    shp_files.append(entry.name)
+
+    shp_files.sort()
+    return {
+        'shp_files': shp_files,
+        'main_shp': shp_files[0] if shp_files else None,
+        'associated_files': counts,
+        'is_complete': all(counts[ext] > 0 for ext in REQUIRED_SHAPEFILE_EXTENSIONS),
+    }
+
+
+def _scan_geojson_dir(path):
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.geojson') and entry.is_file():
+                size = entry.stat().st_size
+                files.append({
+                    'name': entry.name,
+                    'size': size,
+                    'size_mb': size / (1024 * 1024),
+                })
+    files.sort(key=lambda f: f['name'])
+    return files
+
+
+def _scan_pyramid(path):
+    """Niveaux de zoom présents et taille de la tuile 0/0/0 d'une pyramide."""
+    with os.scandir(path) as entries:
+        zooms = sorted(int(e.name) for e in entries
+                       if e.is_dir() and e.name.isdigit())
+    try:
+        root_tile_size = os.path.getsize(os.path.join(path, '0', '0', '0.png'))
+    except OSError:
+        root_tile_size = None
+    return {'zooms': zooms, 'root_tile_size': root_tile_size}
+
+
+def _reuse_or_scan(previous, key, path, scanner, fingerprinter=_dir_fingerprint):
+    """Réutilise l'entrée précédente si l'empreinte du répertoire n'a pas changé."""
+    fingerprint = fingerprinter(path)
+    entry = previous.get(key)
+    if entry and entry.get('fingerprint') == fingerprint:
+        return entry, False
+    return {'fingerprint': fingerprint, **scanner(path)}, True
+
+
+def build_manifest(previous=None):
+    """Construit le manifeste en ne re-parcourant que les répertoires modifiés.
+
+    Les entrées sont indexées par une empreinte de leur répertoire (mtime du
+    répertoire et de ses fichiers) : elle change à chaque ajout, suppression,
+    remplacement atomique ou réécriture en place d'un fichier. Retourne (manifeste, nombre de répertoires re-parcourus).
+    """
+    previous = previous or {}
+    rescanned = 0
+
+    shapefile_folders = {}
+    previous_folders = previous.get('shapefile_folders', {})
+    if os.path.isdir(VECTOR_DIR):
+        with os.scandir(VECTOR_DIR) as entries:
+            folders = [e for e in entries if e.is_dir()]
+        for folder in folders:
+            entry, scanned = _reuse_or_scan(
+                previous_folders, folder.name, folder.path, _scan_shapefile_folder)
+            rescanned += scanned
+            if entry['shp_files']:
+                shapefile_folders[folder.name] = entry
+
+    geojson = None
+    if os.path.isdir(GEOJSON_DIR):
+        geojson, scanned = _reuse_or_scan(
+            {'geojson': previous.get('geojson')}, 'geojson', GEOJSON_DIR,
+            lambda path: {'files': _scan_geojson_dir(path)})
+        rescanned += scanned
+
+    pyramids = {}
+    previous_pyramids = previous.get('pyramids', {})
+    if os.path.isdir(TILES_DIR):
+        with os.scandir(TILES_DIR) as entries:
+            pyramid_dirs = [e for e in entries if e.is_dir()]
+        for pyramid in pyramid_dirs:
+            pyramids[pyramid.name], scanned = _reuse_or_scan(
+                previous_pyramids, pyramid.name, pyramid.path, _scan_pyramid,
+                _pyramid_fingerprint)
+            rescanned += scanned
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'built_at': time.time(),
+        'shapefile_folders': shapefile_folders,
+        'geojson': geojson,
+        'pyramids': pyramids,
+    }
+    return manifest, rescanned
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Charge le manifeste persistant (ou None s'il est absent/incompatible)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Enregistre le manifeste (écriture atomique)."""
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.manifest-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            json.dump(manifest, tmp)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def update_manifest(path=MANIFEST_PATH):
+    """Met à jour le manifeste persistant de façon incrémentale."""
+    manifest, rescanned = build_manifest(load_manifest(path))
+    try:
+        save_manifest(manifest, path)
+    except OSError as e:
+        print(f"⚠️ Manifeste non enregistré: {e}")
+    return manifest, rescanned
+
+
+def summarize_manifest(manifest):
+    """Diagnostic des données vectorielles et des tuiles (sérialisable en JSON)."""
+    shapefile_names = set(manifest['shapefile_folders'])
+    geojson_files = (manifest['geojson'] or {}).get('files', [])
+    geojson_names = {f['name'][:-len('.geojson')] for f in geojson_files}
+
+    missing_directories = [d for d in (VECTOR_DIR, GEOJSON_DIR, TILES_DIR)
+                           if not os.path.isdir(d)]
+    missing_geojson = sorted(shapefile_names - geojson_names)
+
+    return {
+        'status': 'degraded' if missing_directories or missing_geojson else 'ok',
+        'missing_directories': missing_directories,
+        'shapefile_folders': {
+            name: {k: folder[k] for k in ('main_shp', 'associated_files', 'is_complete')}
+            for name, folder in sorted(manifest['shapefile_folders'].items())
+        },
+        'geojson_files': geojson_files,
+        'missing_geojson': missing_geojson,
+        'extra_geojson': sorted(geojson_names - shapefile_names),
+        'pyramids': {
+            name: {'zooms': info['zooms'], 'root_tile_size': info['root_tile_size']}
+            for name, info in sorted(manifest['pyramids'].items())
+        },
+    }
@@ -0,0 +1,75 @@
+# src/core/http_cache.py
+import hashlib
+from email.utils import parsedate_to_datetime
+
+
+# Politique Cache-Control par préfixe de route (premier préfixe trouvé)
+CACHE_POLICIES = [
+    # Les tuiles ne changent qu'à la régénération de la pyramide
+    ('/data/map/tiles/', 'public, max-age=86400, stale-while-revalidate=604800'),
+    # L'index des tuiles existantes change avec le rendu dynamique : cache court
+    ('/data/map/tile-index/', 'public, max-age=300, must-revalidate'),
+    # Les GeoJSON sont gros mais stables : cache court + revalidation par ETag
+    ('/data/vector/', 'public, max-age=3600, must-revalidate'),
+    # Les fichiers statiques et templates ne sont pas versionnés : revalider
+    ('/static/', 'no-cache'),
+    ('/templates/', 'no-cache'),
+]
+
+DEFAULT_CACHE_POLICY = 'no-cache'
+
+
+def cache_control_for(path):
+    """Retourne la politique Cache-Control à appliquer à une route."""
+    for prefix, policy in CACHE_POLICIES:
+        if path.startswith(prefix):
+            return policy
+    return DEFAULT_CACHE_POLICY
+
+
+def file_etag(stat):
+    """ETag fort dérivé de l'inode, du mtime et de la taille d'un fichier."""
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def content_etag(data):
+    """ETag fort dérivé du contenu (réponses générées en mémoire)."""
+    return f'"{hashlib.blake2b(data, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Vérifie si l'en-tête If-None-Match correspond à l'ETag courant."""
+    if if_none_match.strip() == '*':
+        return True
+
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def is_not_modified(headers, etag=None, mtime=None):
+    """Évalue une requête conditionnelle (If-None-Match puis If-Modified-Since).
+
+    `mtime` est exprimé en secondes depuis l'epoch.
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match and etag:
+        # If-None-Match est prioritaire sur If-Modified-Since (RFC 7232)
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since and mtime is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since is None or since.tzinfo is None:
+            return False
+        return int(mtime) <= since.timestamp()
+
+    return False
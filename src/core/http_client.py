@@ -0,0 +1,226 @@
+# src/core/http_client.py
+import bisect
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import RequestHistory, Retry
+
+from src.core.metrics import LATENCY_BUCKETS
+
+
+# Connexions gardées ouvertes par hôte (tuiles et GetCapabilities simultanés)
+POOL_SIZE = 32
+
+# Délais par défaut (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (5, 30)
+
+# Nouvelles tentatives sur limitation de débit et erreurs serveur, avec
+# attente exponentielle (0 s, 1 s, 2 s) et respect de Retry-After
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def retry_policy():
+    """Politique de nouvelles tentatives de tous les clients amont.
+
+    Utilisée telle quelle par la session requests (urllib3) et, via
+    is_retryable / retry_delay, par les clients qui gèrent eux-mêmes leurs
+    tentatives (téléchargement en masse httpx).
+    """
+    return Retry(
+        total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False)
+
+
+def is_retryable(status, has_retry_after=False):
+    """Indique si une réponse GET de statut `status` doit être retentée."""
+    return retry_policy().is_retry('GET', status, has_retry_after)
+
+
+def retry_delay(retries, status=None, retry_after=None):
+    """Attente (secondes) avant la nouvelle tentative numéro `retries` (1, 2…).
+
+    Même calcul que urllib3 : Retry-After pour les statuts qui le portent,
+    sinon attente exponentielle de la politique.
+    """
+    policy = retry_policy()
+    if retry_after and status in policy.RETRY_AFTER_STATUS_CODES:
+        try:
+            return policy.parse_retry_after(retry_after)
+        except InvalidHeader:
+            pass
+    history = (RequestHistory('GET', None, None, status, None),) * retries
+    return policy.new(history=history).get_backoff_time()
+
+
+class UpstreamMetrics:
+    """Latence et statuts des requêtes sortantes, par hôte."""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, status, retries, duration):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        with self._lock:
+            metrics = self._hosts.get(host)
+            if metrics is None:
+                metrics = self._hosts[host] = {
+                    'statuses': {}, 'retries': 0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'duration_sum': 0.0, 'count': 0,
+                }
+            metrics['statuses'][status] = metrics['statuses'].get(status, 0) + 1
+            metrics['retries'] += retries
+            metrics['buckets'][bucket] += 1
+            metrics['duration_sum'] += duration
+            metrics['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {host: {**m, 'statuses': dict(m['statuses']), 'buckets': list(m['buckets'])}
+                    for host, m in self._hosts.items()}
+
+
+class PooledAdapter(HTTPAdapter):
+    """Adaptateur avec délai par défaut, nouvelles tentatives et métriques."""
+
+    def __init__(self, metrics, timeout=DEFAULT_TIMEOUT, pool_size=POOL_SIZE):
+        self.metrics = metrics
+        self.timeout = timeout
+        super().__init__(pool_connections=8, pool_maxsize=pool_size,
+                         max_retries=retry_policy())
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        host = requests.utils.urlparse(request.url).netloc
+        start = time.perf_counter()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(host, 'error', 0, time.perf_counter() - start)
+            raise
+        retries = response.raw.retries
+        self.metrics.record(host, response.status_code,
+                            len(retries.history) if retries else 0,
+                            time.perf_counter() - start)
+        return response
+
+    def connection_stats(self):
+        """Connexions ouvertes et requêtes envoyées, cumulées sur les pools.
+
+        urllib3 compte les deux par pool : leur rapport mesure la
+        réutilisation des connexions (keep-alive).
+        """
+        pools = self.poolmanager.pools
+        with pools.lock:
+            pools = list(pools._container.values())
+        return {
+            'connections_opened': sum(pool.num_connections for pool in pools),
+            'requests': sum(pool.num_requests for pool in pools),
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Session HTTP partagée par toutes les requêtes vers Copernicus."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = PooledAdapter(UpstreamMetrics())
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close_session():
+    """Ferme les connexions de la session partagée (arrêt du processus)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def upstream_stats():
+    """Statistiques de la session partagée (diagnostic), ou None si inutilisée."""
+    if _session is None:
+        return None
+    adapter = _session.get_adapter("https://")
+    connections = adapter.connection_stats()
+    requests_sent = connections['requests']
+    hosts = {}
+    for host, m in adapter.metrics.snapshot().items():
+        hosts[host] = {
+            'requests': m['count'],
+            'statuses': {str(k): v for k, v in m['statuses'].items()},
+            'retries': m['retries'],
+            'mean_latency_ms': round(m['duration_sum'] / m['count'] * 1000, 1),
+        }
+    return {
+        **connections,
+        'connection_reuse_ratio': (
+            round(1 - connections['connections_opened'] / requests_sent, 4)
+            if requests_sent else 0.0),
+        'hosts': hosts,
+    }
+
+
+def render_upstream_metrics():
+    """Métriques des requêtes sortantes au format texte Prometheus."""
+    if _session is None:
+        return b''
+    adapter = _session.get_adapter("https://")
+    connections = adapter.connection_stats()
+    hosts = sorted(adapter.metrics.snapshot().items())
+
+    lines = [
+        '# HELP tile_server_upstream_connections_opened_total Connexions ouvertes vers les services amont.',
+        '# TYPE tile_server_upstream_connections_opened_total counter',
+        f'tile_server_upstream_connections_opened_total {connections["connections_opened"]}',
+        '# HELP tile_server_upstream_pool_requests_total Requêtes envoyées sur les connexions du pool.',
+        '# TYPE tile_server_upstream_pool_requests_total counter',
+        f'tile_server_upstream_pool_requests_total {connections["requests"]}',
+        '# HELP tile_server_upstream_requests_total Requêtes vers les services amont.',
+        '# TYPE tile_server_upstream_requests_total counter',
+    ]
+    for host, m in hosts:
+        for status, count in sorted(m['statuses'].items(), key=lambda item: str(item[0])):
+            lines.append(f'tile_server_upstream_requests_total{{host="{host}",'
+                         f'status="{status}"}} {count}')
+
+    lines += [
+        '# HELP tile_server_upstream_retries_total Nouvelles tentatives (429, 5xx).',
+        '# TYPE tile_server_upstream_retries_total counter',
+    ]
+    for host, m in hosts:
+        lines.append(f'tile_server_upstream_retries_total{{host="{host}"}} {m["retries"]}')
+
+    lines += [
+        '# HELP tile_server_upstream_duration_seconds Durée des requêtes amont (tentatives comprises).',
+        '# TYPE tile_server_upstream_duration_seconds histogram',
+    ]
+    for host, m in hosts:
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, m['buckets']):
+            cumulative += bucket_count
+            lines.append(f'tile_server_upstream_duration_seconds_bucket'
+                         f'{{host="{host}",le="{bound}"}} {cumulative}')
+        lines.append(f'tile_server_upstream_duration_seconds_bucket'
+                     f'{{host="{host}",le="+Inf"}} {m["count"]}')
+        lines.append(f'tile_server_upstream_duration_seconds_sum'
+                     f'{{host="{host}"}} {m["duration_sum"]:.6f}')
+        lines.append(f'tile_server_upstream_duration_seconds_count'
+                     f'{{host="{host}"}} {m["count"]}')
+
+    return ('\n'.join(lines) + '\n').encode('utf-8')
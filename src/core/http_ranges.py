@@ -0,0 +1,107 @@
+# src/core/http_ranges.py
+import uuid
+
+
+# Au-delà, la requête multi-plages est ignorée et le fichier servi en entier
+MAX_RANGES = 32
+
+
+class RangeNotSatisfiable(Exception):
+    """Aucune des plages demandées ne recouvre le fichier (416)."""
+
+
+def parse_range_header(header, length):
+    """Analyse un en-tête Range (RFC 7233) pour une ressource de `length` octets.
+
+    Retourne une liste triée de plages (début, fin incluse), fusionnées si elles
+    se chevauchent, ou None si l'en-tête doit être ignoré (syntaxe invalide,
+    unité inconnue, trop de plages). Lève RangeNotSatisfiable si aucune plage
+    n'est satisfaisable.
+    """
+    if not header:
+        return None
+
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, sep, last = spec.partition('-')
+        if not sep:
+            return None
+        first, last = first.strip(), last.strip()
+
+        try:
+            if not first:
+                # Suffixe : les N derniers octets
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(length - suffix, 0), length - 1
+            else:
+                start = int(first)
+                end = int(last) if last else length - 1
+                if last and end < start:
+                    return None
+                end = min(end, length - 1)
+        except ValueError:
+            return None
+
+        if start < 0:
+            return None
+        if start < length:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    # Fusion des plages qui se chevauchent ou sont contiguës
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(if_range, etag, last_modified):
+    """Évalue If-Range : la requête partielle n'est honorée que si la
+    représentation n'a pas changé (comparaison forte de l'ETag ou date exacte).
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return not if_range.startswith('W/') and if_range == etag
+    return if_range == last_modified
+
+
+def build_multipart(ranges, length, content_type):
+    """Prépare une réponse multipart/byteranges.
+
+    Retourne (boundary, parts, trailer, content_length) où `parts` est une
+    liste de (en-tête de partie, offset, longueur).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    total = 0
+    for start, end in ranges:
+        header = (f"\r\n--{boundary}\r\n"
+                  f"Content-Type: {content_type}\r\n"
+                  f"Content-Range: bytes {start}-{end}/{length}\r\n\r\n").encode('latin-1')
+        part_length = end - start + 1
+        parts.append((header, start, part_length))
+        total += len(header) + part_length
+
+    trailer = f"\r\n--{boundary}--\r\n".encode('latin-1')
+    total += len(trailer)
+    return boundary, parts, trailer, total
@@ -0,0 +1,138 @@
+# src/core/mbtiles.py
+import os
+import sqlite3
+import threading
+import urllib.parse
+
+
+# Répertoire par défaut des archives MBTiles ({pyramide}.mbtiles)
+MBTILES_DIR = "data/map/mbtiles"
+
+# Contenus partagés par plusieurs tuiles gardés en mémoire (schéma map/images)
+SHARED_MIN_REFERENCES = 2
+SHARED_MAX_BYTES = 16 * 1024 * 1024
+
+
+class MBTilesStore:
+    """Lecture seule d'une archive MBTiles (SQLite).
+
+    Chaque thread du serveur utilise sa propre connexion en lecture seule,
+    ouverte à la première requête puis réutilisée. Les lignes sont stockées
+    telles qu'elles figurent dans la pyramide de répertoires (z/x/y), pour que
+    les URL construites par le navigateur restent inchangées.
+
+    Les archives dédupliquées (tables map/images, voir pack_mbtiles --dedup)
+    sont détectées à l'ouverture : les contenus référencés par plusieurs
+    tuiles sont chargés en mémoire et servis avec un ETag unique, dérivé de
+    leur empreinte.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.mtime = os.path.getmtime(self.path)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        conn = self._connection()
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.dedup = {'map', 'images'} <= tables
+        self.shared = self._load_shared() if self.dedup else {}
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            uri = f"file:{urllib.parse.quote(self.path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute("PRAGMA mmap_size = 268435456")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _load_shared(self):
+        """Charge les contenus les plus partagés, dans la limite SHARED_MAX_BYTES."""
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT tile_id FROM map GROUP BY tile_id HAVING COUNT(*) >= ? "
+            "ORDER BY COUNT(*) DESC", (SHARED_MIN_REFERENCES,)).fetchall()
+
+        shared = {}
+        total = 0
+        for (tile_id,) in rows:
+            row = conn.execute("SELECT tile_data FROM images WHERE tile_id = ?",
+                               (tile_id,)).fetchone()
+            if row is None:
+                continue
+            total += len(row[0])
+            if total > SHARED_MAX_BYTES:
+                break
+            shared[tile_id] = bytes(row[0])
+        return shared
+
+    def get_tile(self, z, x, y):
+        """Retourne les octets de la tuile ou None si elle est absente."""
+        entry = self.get_tile_entry(z, x, y)
+        return entry[0] if entry else None
+
+    def get_tile_entry(self, z, x, y):
+        """Retourne (octets, ETag) de la tuile, ou None si elle est absente.
+
+        L'ETag n'est connu que pour les archives dédupliquées (None sinon).
+        """
+        conn = self._connection()
+        if not self.dedup:
+            row = conn.execute(
+                "SELECT tile_data FROM tiles "
+                "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, y)).fetchone()
+            return (row[0], None) if row else None
+
+        row = conn.execute(
+            "SELECT tile_id FROM map "
+            "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, y)).fetchone()
+        if row is None:
+            return None
+        tile_id = row[0]
+        data = self.shared.get(tile_id)
+        if data is None:
+            row = conn.execute("SELECT tile_data FROM images WHERE tile_id = ?",
+                               (tile_id,)).fetchone()
+            if row is None:
+                return None
+            data = row[0]
+        return data, f'"{tile_id}"'
+
+    def metadata(self):
+        """Retourne la table metadata sous forme de dictionnaire."""
+        rows = self._connection().execute(
+            "SELECT name, value FROM metadata").fetchall()
+        return dict(rows)
+
+    def iter_tile_coords(self):
+        """Parcourt les coordonnées (z, x, y) présentes dans l'archive."""
+        table = 'map' if self.dedup else 'tiles'
+        yield from self._connection().execute(
+            f"SELECT zoom_level, tile_column, tile_row FROM {table}")
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def open_mbtiles_stores(mbtiles_dir=MBTILES_DIR):
+    """Ouvre toutes les archives {pyramide}.mbtiles d'un répertoire."""
+    stores = {}
+    if not os.path.isdir(mbtiles_dir):
+        return stores
+
+    for name in sorted(os.listdir(mbtiles_dir)):
+        pyramid, ext = os.path.splitext(name)
+        if ext == '.mbtiles':
+            stores[pyramid] = MBTilesStore(os.path.join(mbtiles_dir, name))
+    return stores
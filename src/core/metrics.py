@@ -0,0 +1,135 @@
+# src/core/metrics.py
+import bisect
+import threading
+
+
+# Classes de routes suivies (premier préfixe trouvé, 'other' sinon)
+ROUTE_CLASSES = [
+    ('/data/map/tiles/', 'tiles'),
+    ('/data/map/tile-index/', 'tiles'),
+    ('/data/vector/', 'vector'),
+    ('/static/', 'static'),
+    ('/templates/', 'templates'),
+    ('/wmts/', 'wmts'),
+]
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def route_class(path):
+    """Classe de route d'une URL pour l'agrégation des métriques."""
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return 'other'
+
+
+class RouteMetrics:
+    """Compteurs et histogramme de latence d'une classe de route."""
+
+    def __init__(self):
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.count = 0
+
+
+class RequestMetrics:
+    """Métriques des requêtes HTTP, agrégées par classe de route.
+
+    Les mises à jour se font sous un verrou unique : quelques additions par
+    requête, négligeables devant le traitement lui-même. Le rendu au format
+    texte Prometheus n'a lieu qu'à la lecture de /metrics.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route):
+        metrics = self._routes.get(route)
+        if metrics is None:
+            metrics = self._routes.setdefault(route, RouteMetrics())
+        return metrics
+
+    def begin(self, route):
+        """Signale le début d'une requête (requêtes en cours)."""
+        with self._lock:
+            self._route(route).in_flight += 1
+
+    def end(self, route, status, bytes_sent, duration):
+        """Enregistre une requête terminée."""
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        with self._lock:
+            metrics = self._route(route)
+            metrics.in_flight -= 1
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.bytes_sent += bytes_sent
+            metrics.buckets[bucket] += 1
+            metrics.duration_sum += duration
+            metrics.count += 1
+
+    def render(self, gauges=None):
+        """Exporte les métriques au format texte Prometheus.
+
+        `gauges` ajoute des séries (nom -> (type, aide, valeur)) calculées par
+        l'appelant, comme les statistiques du cache de tuiles.
+        """
+        with self._lock:
+            routes = sorted(
+                (route, dict(m.statuses), m.bytes_sent, m.in_flight,
+                 list(m.buckets), m.duration_sum, m.count)
+                for route, m in self._routes.items())
+
+        lines = [
+            '# HELP tile_server_requests_total Requêtes HTTP traitées.',
+            '# TYPE tile_server_requests_total counter',
+        ]
+        for route, statuses, *_ in routes:
+            for status, count in sorted(statuses.items()):
+                lines.append(f'tile_server_requests_total{{route="{route}",'
+                             f'status="{status}"}} {count}')
+
+        lines += [
+            '# HELP tile_server_response_bytes_total Octets envoyés (en-têtes compris).',
+            '# TYPE tile_server_response_bytes_total counter',
+        ]
+        for route, _, bytes_sent, *_ in routes:
+            lines.append(f'tile_server_response_bytes_total{{route="{route}"}} {bytes_sent}')
+
+        lines += [
+            '# HELP tile_server_requests_in_flight Requêtes en cours de traitement.',
+            '# TYPE tile_server_requests_in_flight gauge',
+        ]
+        for route, _, _, in_flight, *_ in routes:
+            lines.append(f'tile_server_requests_in_flight{{route="{route}"}} {in_flight}')
+
+        lines += [
+            '# HELP tile_server_request_duration_seconds Durée de traitement des requêtes.',
+            '# TYPE tile_server_request_duration_seconds histogram',
+        ]
+        for route, _, _, _, buckets, duration_sum, count in routes:
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f'tile_server_request_duration_seconds_bucket'
+                             f'{{route="{route}",le="{bound}"}} {cumulative}')
+            lines.append(f'tile_server_request_duration_seconds_bucket'
+                         f'{{route="{route}",le="+Inf"}} {count}')
+            lines.append(f'tile_server_request_duration_seconds_sum'
+                         f'{{route="{route}"}} {duration_sum:.6f}')
+            lines.append(f'tile_server_request_duration_seconds_count'
+                         f'{{route="{route}"}} {count}')
+
+        for name, (metric_type, help_text, value) in (gauges or {}).items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+
+        return ('\n'.join(lines) + '\n').encode('utf-8')
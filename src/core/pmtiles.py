@@ -0,0 +1,356 @@
+# src/core/pmtiles.py
+import bisect
+import gzip
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+
+
+# Répertoire par défaut des archives PMTiles ({pyramide}.pmtiles)
+PMTILES_DIR = "data/map/pmtiles"
+
+# Taille de l'en-tête PMTiles v3 et de la zone réservée au répertoire racine
+HEADER_SIZE = 127
+ROOT_DIRECTORY_MAX_SIZE = 16384 - HEADER_SIZE
+
+# Énumérations de la spécification v3
+COMPRESSION_UNKNOWN = 0
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+TILE_TYPE_PNG = 2
+
+# Nombre de répertoires feuilles gardés en mémoire par archive
+LEAF_CACHE_SIZE = 256
+
+Entry = namedtuple("Entry", ["tile_id", "offset", "length", "run_length"])
+
+_HEADER_STRUCT = struct.Struct("<7sBQQQQQQQQQQQBBBBBBiiiiBii")
+
+
+def zxy_to_tileid(z, x, y):
+    """Identifiant PMTiles (courbe de Hilbert) d'une tuile z/x/y."""
+    if z > 31:
+        raise OverflowError("Zoom trop élevé pour PMTiles")
+    if x >= 1 << z or y >= 1 << z:
+        raise ValueError(f"Tuile hors grille: {z}/{x}/{y}")
+
+    acc = ((1 << (z * 2)) - 1) // 3
+    a = z - 1
+    while a >= 0:
+        s = 1 << a
+        rx = s & x
+        ry = s & y
+        acc += ((3 * rx) ^ ry) << a
+        if ry == 0:
+            if rx != 0:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        a -= 1
+    return acc
+
+
+def flip_row(z, y):
+    """Convertit une ligne TMS (répertoires) en ligne XYZ (PMTiles), et inversement.
+
+    Les identifiants PMTiles v3 numérotent les lignes depuis le nord, comme
+    les URL z/x/y des clients (pmtiles.js) ; les répertoires de tuiles les
+    comptent depuis le sud.
+    """
+    return (1 << z) - 1 - y
+
+
+def tileid_to_zxy(tile_id):
+    """Coordonnées (z, x, y) d'un identifiant PMTiles (inverse de zxy_to_tileid)."""
+    z = 0
+    acc = 0
+    while acc + (1 << (z * 2)) <= tile_id:
+        acc += 1 << (z * 2)
+        z += 1
+        if z > 31:
+            raise OverflowError("Identifiant de tuile trop grand")
+
+    position = tile_id - acc
+    x = y = 0
+    s = 1
+    while s < 1 << z:
+        rx = 1 & (position >> 1)
+        ry = 1 & (position ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        x += s * rx
+        y += s * ry
+        position >>= 2
+        s <<= 1
+    return z, x, y
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decompress(data, compression):
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression in (COMPRESSION_NONE, COMPRESSION_UNKNOWN):
+        return bytes(data)
+    raise ValueError(f"Compression PMTiles non supportée: {compression}")
+
+
+def deserialize_directory(buf):
+    """Décode un répertoire PMTiles (déjà décompressé) en liste d'Entry."""
+    count, pos = _read_varint(buf, 0)
+
+    tile_ids = []
+    last_id = 0
+    for _ in range(count):
+        delta, pos = _read_varint(buf, pos)
+        last_id += delta
+        tile_ids.append(last_id)
+
+    run_lengths = []
+    for _ in range(count):
+        value, pos = _read_varint(buf, pos)
+        run_lengths.append(value)
+
+    lengths = []
+    for _ in range(count):
+        value, pos = _read_varint(buf, pos)
+        lengths.append(value)
+
+    entries = []
+    for i in range(count):
+        value, pos = _read_varint(buf, pos)
+        if value == 0 and i > 0:
+            # Données contiguës à l'entrée précédente
+            previous = entries[i - 1]
+            offset = previous.offset + previous.length
+        else:
+            offset = value - 1
+        entries.append(Entry(tile_ids[i], offset, lengths[i], run_lengths[i]))
+    return entries
+
+
+def serialize_directory(entries):
+    """Encode une liste d'Entry en répertoire PMTiles compressé (gzip)."""
+    out = bytearray()
+    _write_varint(out, len(entries))
+
+    last_id = 0
+    for entry in entries:
+        _write_varint(out, entry.tile_id - last_id)
+        last_id = entry.tile_id
+    for entry in entries:
+        _write_varint(out, entry.run_length)
+    for entry in entries:
+        _write_varint(out, entry.length)
+    for i, entry in enumerate(entries):
+        previous = entries[i - 1] if i > 0 else None
+        if previous and entry.offset == previous.offset + previous.length:
+            _write_varint(out, 0)
+        else:
+            _write_varint(out, entry.offset + 1)
+
+    return gzip.compress(bytes(out), mtime=0)
+
+
+def deserialize_header(buf):
+    """Décode l'en-tête binaire de 127 octets."""
+    fields = _HEADER_STRUCT.unpack(bytes(buf[:HEADER_SIZE]))
+    if fields[0] != b"PMTiles" or fields[1] != 3:
+        raise ValueError("Archive PMTiles v3 invalide")
+
+    names = [
+        'root_offset', 'root_length', 'metadata_offset', 'metadata_length',
+        'leaf_directory_offset', 'leaf_directory_length', 'tile_data_offset',
+        'tile_data_length', 'addressed_tiles_count', 'tile_entries_count',
+        'tile_contents_count', 'clustered', 'internal_compression',
+        'tile_compression', 'tile_type', 'min_zoom', 'max_zoom', 'min_lon_e7',
+        'min_lat_e7', 'max_lon_e7', 'max_lat_e7', 'center_zoom',
+        'center_lon_e7', 'center_lat_e7',
+    ]
+    return dict(zip(names, fields[2:]))
+
+
+def serialize_header(header):
+    """Encode l'en-tête binaire de 127 octets."""
+    return _HEADER_STRUCT.pack(
+        b"PMTiles", 3,
+        header['root_offset'], header['root_length'],
+        header['metadata_offset'], header['metadata_length'],
+        header['leaf_directory_offset'], header['leaf_directory_length'],
+        header['tile_data_offset'], header['tile_data_length'],
+        header['addressed_tiles_count'], header['tile_entries_count'],
+        header['tile_contents_count'], header['clustered'],
+        header['internal_compression'], header['tile_compression'],
+        header['tile_type'], header['min_zoom'], header['max_zoom'],
+        header['min_lon_e7'], header['min_lat_e7'],
+        header['max_lon_e7'], header['max_lat_e7'],
+        header['center_zoom'], header['center_lon_e7'], header['center_lat_e7'])
+
+
+def find_entry(entries, tile_id):
+    """Recherche l'entrée couvrant `tile_id` (ou le pointeur de feuille)."""
+    index = bisect.bisect_right(entries, tile_id, key=lambda e: e.tile_id) - 1
+    if index < 0:
+        return None
+    entry = entries[index]
+    if entry.run_length == 0:
+        # Pointeur vers un répertoire feuille
+        return entry
+    if tile_id < entry.tile_id + entry.run_length:
+        return entry
+    return None
+
+
+class PMTilesStore:
+    """Lecture d'une archive PMTiles v3 via un mmap du fichier.
+
+    Le répertoire racine est décodé à l'ouverture et les répertoires feuilles
+    sont gardés dans un cache LRU : une recherche de tuile est une recherche
+    dichotomique en mémoire, et les octets renvoyés sont une vue (memoryview)
+    sur le mmap, sans copie.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.mtime = os.path.getmtime(self.path)
+        # Identifie la version de l'archive dans les ETags des tuiles
+        stat = os.stat(self.path)
+        self._etag_prefix = f"{stat.st_ino:x}-{stat.st_mtime_ns:x}"
+
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        self.header = deserialize_header(self._view)
+        self._root = self._read_directory(
+            self.header['root_offset'], self.header['root_length'])
+
+        self._leaves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _read_directory(self, offset, length):
+        data = self._view[offset:offset + length]
+        return deserialize_directory(
+            _decompress(data, self.header['internal_compression']))
+
+    def _leaf(self, offset, length):
+        key = (offset, length)
+        with self._lock:
+            entries = self._leaves.get(key)
+            if entries is not None:
+                self._leaves.move_to_end(key)
+                return entries
+
+        entries = self._read_directory(
+            self.header['leaf_directory_offset'] + offset, length)
+
+        with self._lock:
+            self._leaves[key] = entries
+            if len(self._leaves) > LEAF_CACHE_SIZE:
+                self._leaves.popitem(last=False)
+        return entries
+
+    def find_tile(self, z, x, y):
+        """Retourne l'entrée de données (offset, longueur) d'une tuile TMS ou None."""
+        try:
+            tile_id = zxy_to_tileid(z, x, flip_row(z, y))
+        except (ValueError, OverflowError):
+            return None
+
+        entries = self._root
+        # Profondeur bornée : racine + quelques niveaux de feuilles
+        for _ in range(4):
+            entry = find_entry(entries, tile_id)
+            if entry is None:
+                return None
+            if entry.run_length > 0:
+                return entry
+            entries = self._leaf(entry.offset, entry.length)
+        return None
+
+    def get_tile(self, z, x, y):
+        """Retourne une vue sur les octets de la tuile ou None."""
+        entry = self.get_tile_entry(z, x, y)
+        return entry[0] if entry else None
+
+    def get_tile_entry(self, z, x, y):
+        """Retourne (octets, ETag) de la tuile, ou None si elle est absente.
+
+        Les tuiles identiques partagent le même segment de données : l'ETag,
+        dérivé de l'offset et de la longueur, est donc commun à toutes.
+        """
+        entry = self.find_tile(z, x, y)
+        if entry is None:
+            return None
+
+        start = self.header['tile_data_offset'] + entry.offset
+        data = self._view[start:start + entry.length]
+        if self.header['tile_compression'] == COMPRESSION_GZIP:
+            data = gzip.decompress(data)
+        return data, f'"{self._etag_prefix}-{entry.offset:x}-{entry.length:x}"'
+
+    def iter_tile_coords(self):
+        """Parcourt les coordonnées (z, x, y) TMS présentes dans l'archive."""
+        stack = [self._root]
+        while stack:
+            for entry in stack.pop():
+                if entry.run_length == 0:
+                    # Lecture directe : ne pas vider le cache LRU des feuilles
+                    stack.append(self._read_directory(
+                        self.header['leaf_directory_offset'] + entry.offset,
+                        entry.length))
+                    continue
+                for tile_id in range(entry.tile_id, entry.tile_id + entry.run_length):
+                    z, x, y = tileid_to_zxy(tile_id)
+                    yield z, x, flip_row(z, y)
+
+    def metadata(self):
+        """Retourne les métadonnées JSON de l'archive."""
+        offset = self.header['metadata_offset']
+        data = self._view[offset:offset + self.header['metadata_length']]
+        return json.loads(_decompress(data, self.header['internal_compression']))
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # Des réponses en cours référencent encore le mmap
+            pass
+        self._file.close()
+
+
+def open_pmtiles_stores(pmtiles_dir=PMTILES_DIR):
+    """Ouvre toutes les archives {pyramide}.pmtiles d'un répertoire."""
+    stores = {}
+    if not os.path.isdir(pmtiles_dir):
+        return stores
+
+    for name in sorted(os.listdir(pmtiles_dir)):
+        pyramid, ext = os.path.splitext(name)
+        if ext == '.pmtiles':
+            stores[pyramid] = PMTilesStore(os.path.join(pmtiles_dir, name))
+    return stores
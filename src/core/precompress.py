@@ -0,0 +1,184 @@
+# src/core/precompress.py
+import gzip
+import os
+import queue
+import tempfile
+import threading
+
+from src.core.access_log import logger
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : on se limite alors à gzip
+    brotli = None
+
+
+# Routes dont les fichiers texte peuvent être servis compressés
+COMPRESSIBLE_PREFIXES = ('/data/vector/', '/static/js/', '/static/css/')
+COMPRESSIBLE_EXTENSIONS = ('.geojson', '.json', '.js', '.css', '.svg', '.kml')
+
+# En dessous de cette taille, la compression ne vaut pas le coût
+MIN_COMPRESS_SIZE = 1024
+
+# Encodages supportés par ordre de préférence : (Content-Encoding, suffixe)
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Niveaux utilisés pour construire les fichiers annexes
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Répertoires dont les fichiers annexes sont construits au démarrage
+PRECOMPRESS_DIRECTORIES = tuple(prefix.strip('/') for prefix in COMPRESSIBLE_PREFIXES)
+
+# Fichiers annexes à construire, traités par un seul thread d'arrière-plan :
+# la compression (brotli surtout) ne retarde ni n'occupe les requêtes
+_build_queue = queue.SimpleQueue()
+_builder = None
+# Fichiers annexes en attente (dédoublonnage) ; retirés une fois construits
+_pending = set()
+# Échecs de construction : fichier annexe -> mtime de la source à ce moment
+_failed = {}
+_state_lock = threading.Lock()
+
+
+def is_compressible(url_path, file_path):
+    """Indique si le fichier demandé peut être servi compressé."""
+    return (url_path.startswith(COMPRESSIBLE_PREFIXES)
+            and file_path.endswith(COMPRESSIBLE_EXTENSIONS))
+
+
+def parse_accept_encoding(header):
+    """Retourne un dictionnaire {encodage: qvalue} depuis Accept-Encoding."""
+    codings = {}
+    for item in (header or '').split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def accepted_encodings(header):
+    """Liste des encodages supportés et acceptés par le client, par préférence."""
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+    accepted = []
+    for coding, suffix in ENCODINGS:
+        if codings.get(coding, wildcard) > 0:
+            accepted.append((coding, suffix))
+    return accepted
+
+
+def _compress(data, coding):
+    if coding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _build_sidecar(source_path, sidecar_path, coding):
+    """Compresse le fichier source dans un fichier annexe (écriture atomique)."""
+    with open(source_path, 'rb') as f:
+        data = f.read()
+
+    directory = os.path.dirname(sidecar_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.precompress-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(_compress(data, coding))
+        os.replace(tmp_path, sidecar_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _is_fresh(sidecar_path, source_mtime_ns):
+    try:
+        return os.stat(sidecar_path).st_mtime_ns >= source_mtime_ns
+    except OSError:
+        return False
+
+
+def _schedule(source_path, sidecar_path, coding, source_mtime_ns):
+    """Met la construction d'un fichier annexe en file (une seule fois)."""
+    global _builder
+    with _state_lock:
+        if sidecar_path in _pending or _failed.get(sidecar_path) == source_mtime_ns:
+            return
+        _pending.add(sidecar_path)
+        if _builder is None:
+            _builder = threading.Thread(target=_build_loop, name="precompress", daemon=True)
+            _builder.start()
+    _build_queue.put((source_path, sidecar_path, coding))
+
+
+def _build_loop():
+    while True:
+        source_path, sidecar_path, coding = _build_queue.get()
+        source_mtime_ns = None
+        try:
+            source_mtime_ns = os.stat(source_path).st_mtime_ns
+            if not _is_fresh(sidecar_path, source_mtime_ns):
+                _build_sidecar(source_path, sidecar_path, coding)
+            with _state_lock:
+                _failed.pop(sidecar_path, None)
+        except OSError as e:
+            logger.warning('precompression failed: %s', e, extra={'fields': {
+                'path': source_path, 'encoding': coding}})
+            with _state_lock:
+                _failed[sidecar_path] = source_mtime_ns
+        finally:
+            with _state_lock:
+                _pending.discard(sidecar_path)
+
+
+def get_sidecar(source_path, source_stat, coding, suffix):
+    """Retourne le chemin du fichier compressé s'il est à jour, sinon None.
+
+    Un fichier annexe absent ou périmé est construit en arrière-plan : la
+    version brute est servie en attendant.
+    """
+    sidecar_path = source_path + suffix
+    if _is_fresh(sidecar_path, source_stat.st_mtime_ns):
+        return sidecar_path
+    if coding == 'br' and brotli is None:
+        return None
+    _schedule(source_path, sidecar_path, coding, source_stat.st_mtime_ns)
+    return None
+
+
+def precompress_directories(directories=PRECOMPRESS_DIRECTORIES):
+    """Met en file les fichiers annexes absents ou périmés des répertoires servis.
+
+    Appelé au démarrage du serveur ; retourne le nombre de constructions lancées.
+    """
+    scheduled = 0
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                source_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(source_path)
+                except OSError:
+                    continue
+                if stat.st_size < MIN_COMPRESS_SIZE:
+                    continue
+                for coding, suffix in ENCODINGS:
+                    if coding == 'br' and brotli is None:
+                        continue
+                    if not _is_fresh(source_path + suffix, stat.st_mtime_ns):
+                        _schedule(source_path, source_path + suffix, coding,
+                                  stat.st_mtime_ns)
+                        scheduled += 1
+    return scheduled
@@ -0,0 +1,140 @@
+# src/core/prefork.py
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+
+# Délai laissé aux workers pour terminer les requêtes en cours à l'arrêt (s)
+WORKER_DRAIN_TIMEOUT = 30.0
+
+# Délai minimal avant de relancer un worker mort juste après son démarrage (s)
+RESTART_DELAY = 1.0
+
+
+def prefork_supported():
+    """Le mode multi-processus requiert fork, SO_REUSEPORT et le thread principal."""
+    return (hasattr(os, 'fork') and hasattr(socket, 'SO_REUSEPORT')
+            and threading.current_thread() is threading.main_thread())
+
+
+def port_available(port):
+    """Vérifie qu'aucun autre programme n'occupe déjà le port d'écoute."""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        probe.bind(("", port))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def drain_on_signal(httpd):
+    """Arrête proprement le serveur à la réception de SIGTERM ou SIGINT.
+
+    Le serveur cesse d'accepter des connexions ; les connexions keep-alive
+    inactives sont fermées, les requêtes en cours se terminent (server_close
+    les attend, dans une limite de temps) puis leur connexion est fermée.
+    Sans effet hors du thread principal.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def handler(signum, frame):
+        httpd.draining = True
+        # shutdown() attend la fin de serve_forever : depuis un autre thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def supervise(workers, worker_main):
+    """Lance `workers` processus et les relance s'ils s'arrêtent.
+
+    `worker_main(index)` s'exécute dans le processus fils (après fork) : il
+    ouvre son propre socket d'écoute avec SO_REUSEPORT, le noyau répartissant
+    les connexions entre les workers. À la réception de SIGTERM ou SIGINT, le
+    superviseur transmet SIGTERM aux workers, leur laisse WORKER_DRAIN_TIMEOUT
+    secondes pour terminer, puis force l'arrêt des retardataires.
+    """
+    stopping = threading.Event()
+    children = {}
+
+    def request_stop(signum, frame):
+        stopping.set()
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            for sig in previous:
+                signal.signal(sig, signal.SIG_DFL)
+            try:
+                code = worker_main(index) or 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        children[pid] = (index, time.monotonic())
+
+    previous = {sig: signal.signal(sig, request_stop)
+                for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for index in range(workers):
+            spawn(index)
+
+        while not stopping.is_set():
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid == 0 or pid not in children:
+                stopping.wait(0.2)
+                continue
+
+            index, started = children.pop(pid)
+            code = os.waitstatus_to_exitcode(status)
+            print(f"⚠️ Worker {index} (pid {pid}) arrêté (code {code}), redémarrage")
+            if time.monotonic() - started < RESTART_DELAY:
+                stopping.wait(RESTART_DELAY)
+            if not stopping.is_set():
+                spawn(index)
+
+        print(f"\n🛑 Arrêt des workers ({len(children)})...")
+        for pid in children:
+            _signal_child(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + WORKER_DRAIN_TIMEOUT
+        while children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                children.pop(pid, None)
+
+        for pid in list(children):
+            print(f"⚠️ Worker pid {pid} toujours actif, arrêt forcé")
+            _signal_child(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+def _signal_child(pid, sig):
+    try:
+        os.kill(pid, sig)
+    except ProcessLookupError:
+        pass
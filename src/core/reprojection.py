@@ -0,0 +1,197 @@
+# src/core/reprojection.py
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from src.core.http_cache import content_etag
+from src.core.tile_image import (
+    bilinear_sample, decode_png, encode_png, imaging_available, premultiply,
+    resize_rgba, unpremultiply)
+from src.core.tile_pyramid import (
+    TILE_SIZE, is_valid_tile, pyramid_crs, pyramid_name, tile_bounds)
+
+try:
+    import numpy as np
+except ImportError:  # La reprojection nécessite numpy
+    np = None
+
+
+# Pyramide canonique (stockée) et projection dérivée à la demande
+CANONICAL_CRS = "EPSG:3857"
+DERIVED_CRS = "EPSG:4326"
+
+# Latitude maximale couverte par la grille Web Mercator (degrés)
+MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+# Tuiles sources décodées gardées en mémoire (tuiles voisines partagées)
+DECODED_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=4096)
+def column_lut(z, x, size):
+    """Colonnes sources (pixels Mercator globaux) des colonnes d'une tuile EPSG:4326.
+
+    La longitude est commune aux deux projections : la table est linéaire.
+    """
+    minx, _, maxx, _ = tile_bounds(DERIVED_CRS, z, x, 0)
+    lon = minx + (np.arange(size) + 0.5) * ((maxx - minx) / size)
+    world = size * (1 << z)
+    return (lon + 180.0) / 360.0 * world - 0.5
+
+
+@lru_cache(maxsize=4096)
+def row_lut(z, y, size):
+    """Lignes sources (pixels Mercator globaux, depuis le nord) d'une ligne de tuiles.
+
+    Retourne (lignes, masque des lignes couvertes par la grille Mercator).
+    """
+    _, miny, _, maxy = tile_bounds(DERIVED_CRS, z, 0, y)
+    lat = maxy - (np.arange(size) + 0.5) * ((maxy - miny) / size)
+    valid = np.abs(lat) <= MERCATOR_MAX_LATITUDE
+    lat = np.clip(lat, -MERCATOR_MAX_LATITUDE, MERCATOR_MAX_LATITUDE)
+    world = size * (1 << z)
+    merc = np.arcsinh(np.tan(np.radians(lat))) / math.pi
+    return (1.0 - merc) / 2.0 * world - 0.5, valid
+
+
+def derived_source(pyramid):
+    """Pyramide canonique d'une pyramide dérivée (EPSG4326@2x → EPSG3857@2x), ou None."""
+    crs, scale = pyramid_crs(pyramid)
+    if crs != DERIVED_CRS:
+        return None
+    return pyramid_name(CANONICAL_CRS, scale)
+
+
+class TileReprojector:
+    """Production des tuiles EPSG:4326 à partir de la pyramide EPSG:3857.
+
+    Les deux projections partagent la longitude : seules les lignes changent.
+    Pour chaque zoom, des tables de correspondance (mises en cache) donnent la
+    position source de chaque colonne et de chaque ligne de pixels ; la tuile
+    est ensuite ré-échantillonnée (bilinéaire, alpha prémultiplié) par
+    indexation vectorisée numpy sur les tuiles sources qui la recouvrent.
+
+    `read_tile(pyramide, z, x, y)` retourne (octets PNG, ETag) d'une tuile
+    source TMS, ou None si elle est absente. Le résultat est mis en cache dans
+    `cache` (TileCache) sous une clé qui inclut les ETags des tuiles sources.
+    """
+
+    def __init__(self, read_tile, cache, sources):
+        if not imaging_available():
+            raise RuntimeError("La reprojection des tuiles nécessite numpy et Pillow")
+        self.read_tile = read_tile
+        self.cache = cache
+        # Pyramides canoniques disponibles (ex: EPSG3857, EPSG3857@2x)
+        self.sources = set(sources)
+
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Compteurs exposés pour le diagnostic
+        self.reprojected = 0
+        self.empty = 0
+        self.empty_hits = 0
+
+    def handles(self, pyramid):
+        """Indique si la pyramide est dérivée d'une pyramide canonique servie."""
+        return derived_source(pyramid) in self.sources
+
+    def get_tile(self, pyramid, z, x, y):
+        """Retourne (octets PNG, ETag) de la tuile dérivée, ou None si elle est vide."""
+        crs, scale = pyramid_crs(pyramid)
+        if not is_valid_tile(crs, z, x, y):
+            return None
+        source = derived_source(pyramid)
+        size = TILE_SIZE * scale
+
+        u = column_lut(z, x, size)
+        v, valid = row_lut(z, y, size)
+        if not valid.any():
+            return None
+
+        # Tuiles sources (ligne depuis le nord, colonne) recouvertes
+        world_tiles = 1 << z
+        columns = range(max(int(u.min()) // size, 0),
+                        min((int(u.max()) + 1) // size, world_tiles - 1) + 1)
+        rows = range(max(int(v[valid].min()) // size, 0),
+                     min((int(v[valid].max()) + 1) // size, world_tiles - 1) + 1)
+
+        entries = {}
+        for row in rows:
+            for column in columns:
+                entry = self.read_tile(source, z, column, world_tiles - 1 - row)
+                if entry is not None:
+                    entries[(row, column)] = entry
+        if not entries:
+            return None
+
+        key = ('reproject', pyramid, z, x, y,
+               tuple(sorted((k, etag) for k, (_, etag) in entries.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            if not cached.data:
+                # Tuile vide mémorisée : ni décodage ni ré-échantillonnage
+                self.empty_hits += 1
+                return None
+            return cached.data, cached.etag
+
+        rgba = self._remap(entries, rows, columns, u, v, valid, size)
+        if rgba is None:
+            self.empty += 1
+            # Entrée négative, invalidée avec les ETags des tuiles sources
+            self.cache.put(key, b'')
+            return None
+
+        data = encode_png(rgba)
+        cached = self.cache.put(key, data, content_etag(data))
+        self.reprojected += 1
+        return cached.data, cached.etag
+
+    def _decode(self, data, etag, size):
+        """Décode une tuile source à la taille attendue (size × size pixels).
+
+        Les pyramides gdal2tiles @2x/@3x peuvent contenir des tuiles de 256
+        pixels : elles sont ré-échantillonnées plutôt que refusées.
+        """
+        key = (etag, size)
+        with self._lock:
+            rgba = self._decoded.get(key)
+            if rgba is not None:
+                self._decoded.move_to_end(key)
+                return rgba
+
+        rgba = decode_png(bytes(data))
+        if rgba.shape[:2] != (size, size):
+            rgba = resize_rgba(rgba, size, size)
+        with self._lock:
+            self._decoded[key] = rgba
+            if len(self._decoded) > DECODED_CACHE_SIZE:
+                self._decoded.popitem(last=False)
+        return rgba
+
+    def _remap(self, entries, rows, columns, u, v, valid, size):
+        # Pile des tuiles sources ; l'indice 0 est une tuile transparente
+        stack = [np.zeros((size, size, 4), dtype=np.uint8)]
+        lookup = np.zeros((len(rows), len(columns)), dtype=np.intp)
+        for (row, column), (data, etag) in entries.items():
+            rgba = self._decode(data, etag, size)
+            lookup[row - rows.start, column - columns.start] = len(stack)
+            stack.append(rgba)
+        stack = np.stack(stack)
+
+        def sample(vi, ui):
+            # Bornage aux tuiles chargées (bords du monde et des tuiles)
+            vi = np.clip(vi, rows.start * size, (rows.stop * size) - 1)
+            ui = np.clip(ui, columns.start * size, (columns.stop * size) - 1)
+            tiles = lookup[(vi // size - rows.start)[:, np.newaxis],
+                           (ui // size - columns.start)[np.newaxis, :]]
+            return premultiply(stack[tiles, (vi % size)[:, np.newaxis],
+                                     (ui % size)[np.newaxis, :]])
+
+        pixels = bilinear_sample(sample, u, v)
+        alpha = pixels[..., 3]
+        alpha[~valid, :] = 0
+        if not (alpha >= 0.5).any():
+            return None
+        return unpremultiply(pixels)
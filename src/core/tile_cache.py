@@ -0,0 +1,149 @@
+# src/core/tile_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from src.core.http_cache import file_etag
+
+
+# Entrée du cache : contenu, mtime (ns), ETag et date de dernière vérification
+CachedTile = namedtuple(
+    "CachedTile", ["data", "mtime_ns", "etag", "checked_at"])
+
+
+class TileCache:
+    """Cache LRU en mémoire des tuiles, borné par un budget en octets.
+
+    Chaque entrée compte ENTRY_OVERHEAD octets en plus de son contenu : les
+    entrées vides (tuiles vides mémorisées) restent bornées par le budget.
+
+    Les entrées sont indexées par chemin de fichier et invalidées lorsque le
+    mtime du fichier change. Pour éviter un stat() à chaque requête, le mtime
+    n'est revérifié qu'au plus toutes les `revalidate_interval` secondes.
+    Les contenus générés (get/put) sont indexés par une clé qui inclut la
+    version de leur source, et disparaissent par éviction LRU.
+    """
+
+    ENTRY_OVERHEAD = 256
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=1024 * 1024,
+                 revalidate_interval=2.0):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.revalidate_interval = revalidate_interval
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+        # Compteurs exposés pour le diagnostic
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_file(self, path):
+        """Retourne le contenu d'un fichier depuis le cache ou le disque.
+
+        Retourne None si le fichier n'existe pas.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry.checked_at < self.revalidate_interval:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns:
+                entry = entry._replace(checked_at=now)
+                self._entries[path] = entry
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        entry = CachedTile(data, stat.st_mtime_ns, file_etag(stat), now)
+        self._store(path, entry)
+        return entry
+
+    def get(self, key):
+        """Retourne une entrée générée (tuile vectorielle, ...) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, data, etag=None):
+        """Ajoute une entrée générée ; la clé doit inclure sa version."""
+        entry = CachedTile(data, None, etag, time.monotonic())
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key, entry):
+        """Ajoute une entrée et évince les moins récemment utilisées."""
+        size = self._size(entry)
+        if len(entry.data) > self.max_entry_bytes or size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= self._size(previous)
+
+            self._entries[key] = entry
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= self._size(evicted)
+                self.evictions += 1
+
+    def _size(self, entry):
+        return len(entry.data) + self.ENTRY_OVERHEAD
+
+    def invalidate(self, key):
+        """Retire une entrée du cache."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= self._size(entry)
+
+    def clear(self):
+        """Vide complètement le cache."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
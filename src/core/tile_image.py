@@ -0,0 +1,103 @@
+# src/core/tile_image.py
+import io
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # Rendu d'images indisponible sans numpy/Pillow
+    np = None
+    Image = None
+
+
+def imaging_available():
+    """Indique si numpy et Pillow sont installés."""
+    return np is not None and Image is not None
+
+
+def to_rgba(bands, alpha=None):
+    """Convertit des bandes (bands, h, w) en tableau RGBA (h, w, 4) uint8."""
+    bands = np.asarray(bands)
+    if bands.ndim == 2:
+        bands = bands[np.newaxis]
+
+    if bands.dtype != np.uint8:
+        bands = np.clip(bands, 0, 255).astype(np.uint8)
+
+    count, height, width = bands.shape
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    if count >= 3:
+        rgba[..., :3] = np.moveaxis(bands[:3], 0, -1)
+    else:
+        rgba[..., :3] = bands[0][..., np.newaxis]
+
+    if alpha is not None:
+        rgba[..., 3] = alpha
+    elif count in (2, 4):
+        rgba[..., 3] = bands[-1]
+    else:
+        rgba[..., 3] = 255
+    return rgba
+
+
+def encode_png(rgba, compress_level=6):
+    """Encode un tableau RGBA (h, w, 4) en PNG."""
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(
+        buffer, format='PNG', compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def decode_png(data):
+    """Décode une tuile PNG en tableau RGBA (h, w, 4) uint8."""
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert('RGBA'))
+
+
+def resize_rgba(rgba, width, height):
+    """Redimensionne un tableau RGBA (bilinéaire, alpha prémultiplié)."""
+    image = Image.fromarray(rgba, 'RGBA').convert('RGBa')
+    resized = image.resize((width, height), Image.Resampling.BILINEAR)
+    return np.asarray(resized.convert('RGBA'))
+
+
+def is_empty(rgba):
+    """Une tuile entièrement transparente n'est pas écrite (comme gdal2tiles)."""
+    return not rgba[..., 3].any()
+
+
+def premultiply(rgba):
+    """Convertit un tableau RGBA uint8 en float32 à alpha prémultiplié.
+
+    Interpoler en alpha prémultiplié évite le liseré sombre sur les bords
+    transparents (les pixels transparents ont une couleur arbitraire).
+    """
+    pixels = rgba.astype(np.float32)
+    pixels[..., :3] *= pixels[..., 3:] / 255.0
+    return pixels
+
+
+def unpremultiply(pixels):
+    """Reconvertit des pixels float32 prémultipliés en tableau RGBA uint8."""
+    alpha = pixels[..., 3:]
+    rgba = np.empty(pixels.shape, dtype=np.uint8)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rgb = np.where(alpha > 0, pixels[..., :3] * 255.0 / alpha, 0)
+    rgba[..., :3] = np.clip(rgb + 0.5, 0, 255)
+    rgba[..., 3] = np.clip(pixels[..., 3] + 0.5, 0, 255)
+    return rgba
+
+
+def bilinear_sample(sample, u, v):
+    """Interpolation bilinéaire séparable aux colonnes `u` × lignes `v`.
+
+    `sample(vi, ui)` retourne les pixels prémultipliés (len(vi), len(ui), 4)
+    aux indices entiers demandés (bornage à la charge de l'appelant).
+    """
+    u0 = np.floor(u).astype(np.intp)
+    v0 = np.floor(v).astype(np.intp)
+    fu = (u - u0).astype(np.float32)[np.newaxis, :, np.newaxis]
+    fv = (v - v0).astype(np.float32)[:, np.newaxis, np.newaxis]
+
+    top = sample(v0, u0) * (1 - fu) + sample(v0, u0 + 1) * fu
+    bottom = sample(v0 + 1, u0) * (1 - fu) + sample(v0 + 1, u0 + 1) * fu
+    return top * (1 - fv) + bottom * fv
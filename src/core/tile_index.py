@@ -0,0 +1,175 @@
+# src/core/tile_index.py
+import os
+import re
+import struct
+import threading
+
+from src.core.tile_pyramid import TILES_DIR, grid_size, iter_pyramid_tiles, pyramid_crs
+
+
+# Route de l'index des tuiles existantes :
+#   /data/map/tile-index/{pyramide}.json    résumé par zoom
+#   /data/map/tile-index/{pyramide}/{z}.bin bitmap (ou blocs) du zoom z
+TILE_INDEX_ROUTE = re.compile(
+    r"^/data/map/tile-index/(?P<pyramid>[^/]+?)(?:\.json|/(?P<z>\d+)\.bin)$")
+
+# Côté (en tuiles) des blocs de bitmap alloués à la demande
+INDEX_BLOCK_SIZE = 64
+_BLOCK_BYTES = INDEX_BLOCK_SIZE * INDEX_BLOCK_SIZE // 8
+_BLOCK_HEADER = struct.Struct('<II')
+
+# Taille maximale (octets) d'un bitmap de zoom envoyé en entier au client ;
+# au-delà, seuls les blocs contenant des tuiles sont envoyés
+DENSE_BITMAP_MAX_BYTES = 512 * 1024
+
+
+def parse_tile_index_path(url_path):
+    """Extrait (pyramide, z ou None pour le résumé) d'une URL d'index, ou None."""
+    match = TILE_INDEX_ROUTE.match(url_path)
+    if not match:
+        return None
+    z = match.group('z')
+    return match.group('pyramid'), int(z) if z is not None else None
+
+
+class TileIndex:
+    """Bitmap des tuiles existantes d'une pyramide, un bit par tuile et par zoom.
+
+    Chaque zoom est découpé en blocs de INDEX_BLOCK_SIZE × INDEX_BLOCK_SIZE
+    tuiles, alloués à la première tuile présente : la mémoire suit l'emprise
+    des données et non la taille de la grille (4^z tuiles).
+
+    Le bit de la tuile (x, y) en numérotation TMS est le bit `i & 7` (poids
+    faible en premier) de l'octet `i >> 3`. Pour un bitmap complet,
+    i = y * colonnes + x ; dans un bloc (bx, by), i = (y % 64) * 64 + (x % 64).
+    Les mêmes formats sont décodés côté navigateur par TileValidator.
+    """
+
+    def __init__(self, pyramid):
+        self.pyramid = pyramid
+        self.crs, self.scale = pyramid_crs(pyramid)
+        # Vérifie que la grille du CRS est connue (ValueError sinon)
+        grid_size(self.crs, 0)
+        # z -> {(bx, by): bytearray}
+        self._levels = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, z, x, y):
+        """Marque une tuile comme présente (ignorée si hors grille)."""
+        columns, rows = grid_size(self.crs, z)
+        if not (0 <= x < columns and 0 <= y < rows):
+            return
+        key = (x // INDEX_BLOCK_SIZE, y // INDEX_BLOCK_SIZE)
+        i = (y % INDEX_BLOCK_SIZE) * INDEX_BLOCK_SIZE + x % INDEX_BLOCK_SIZE
+        with self._lock:
+            blocks = self._levels.get(z)
+            if blocks is None:
+                blocks = self._levels[z] = {}
+                self._counts[z] = 0
+            block = blocks.get(key)
+            if block is None:
+                block = blocks[key] = bytearray(_BLOCK_BYTES)
+            mask = 1 << (i & 7)
+            if not block[i >> 3] & mask:
+                block[i >> 3] |= mask
+                self._counts[z] += 1
+
+    def contains(self, z, x, y):
+        """Vérifie la présence d'une tuile, sans accès disque."""
+        blocks = self._levels.get(z)
+        if blocks is None or x < 0 or y < 0:
+            return False
+        block = blocks.get((x // INDEX_BLOCK_SIZE, y // INDEX_BLOCK_SIZE))
+        if block is None:
+            return False
+        i = (y % INDEX_BLOCK_SIZE) * INDEX_BLOCK_SIZE + x % INDEX_BLOCK_SIZE
+        return bool(block[i >> 3] & (1 << (i & 7)))
+
+    def encoding(self, z):
+        """Format du .bin d'un zoom : 'bitmap' (grille entière) ou 'blocks'."""
+        columns, rows = grid_size(self.crs, z)
+        return 'bitmap' if (columns * rows + 7) // 8 <= DENSE_BITMAP_MAX_BYTES else 'blocks'
+
+    def bitmap(self, z):
+        """Données .bin d'un zoom, ou None s'il ne contient aucune tuile.
+
+        'bitmap' : bitmap complet de la grille. 'blocks' : suite de blocs
+        non vides, chacun précédé de (bx, by) en uint32 petit-boutiste.
+        """
+        with self._lock:
+            blocks = self._levels.get(z)
+            if blocks is None:
+                return None
+            blocks = sorted(((by, bx), bytes(block)) for (bx, by), block in blocks.items())
+
+        if self.encoding(z) == 'blocks':
+            return b''.join(_BLOCK_HEADER.pack(bx, by) + block
+                            for (by, bx), block in blocks)
+
+        columns, rows = grid_size(self.crs, z)
+        bitmap = bytearray((columns * rows + 7) // 8)
+        row_bytes = INDEX_BLOCK_SIZE // 8
+        for (by, bx), block in blocks:
+            for row in range(min(INDEX_BLOCK_SIZE, rows - by * INDEX_BLOCK_SIZE)):
+                y = by * INDEX_BLOCK_SIZE + row
+                if columns >= INDEX_BLOCK_SIZE:
+                    # Lignes de bloc alignées sur l'octet : copie directe
+                    start = (y * columns + bx * INDEX_BLOCK_SIZE) >> 3
+                    bitmap[start:start + row_bytes] = block[row * row_bytes:(row + 1) * row_bytes]
+                    continue
+                for x in range(columns):
+                    i = row * INDEX_BLOCK_SIZE + x
+                    if block[i >> 3] & (1 << (i & 7)):
+                        j = y * columns + x
+                        bitmap[j >> 3] |= 1 << (j & 7)
+        return bytes(bitmap)
+
+    def summary(self):
+        """Résumé sérialisable en JSON : grille et nombre de tuiles par zoom."""
+        with self._lock:
+            counts = dict(self._counts)
+        zooms = {}
+        for z in sorted(counts):
+            columns, rows = grid_size(self.crs, z)
+            zooms[str(z)] = {'columns': columns, 'rows': rows, 'count': counts[z],
+                             'encoding': self.encoding(z)}
+        return {
+            'pyramid': self.pyramid,
+            'scheme': 'tms',
+            'bit_order': 'lsb',
+            'block_size': INDEX_BLOCK_SIZE,
+            'min_zoom': min(counts) if counts else None,
+            'max_zoom': max(counts) if counts else None,
+            'zooms': zooms,
+        }
+
+
+def build_tile_indexes(tiles_dir=TILES_DIR, tile_stores=None):
+    """Construit l'index de chaque pyramide (archives et répertoires z/x/y).
+
+    Les pyramides servies depuis une archive sont indexées via
+    `iter_tile_coords()`. Les pyramides d'un CRS sans grille connue ne sont
+    pas indexées : leurs tuiles restent servies via le disque.
+    """
+    tile_stores = tile_stores or {}
+    sources = {pyramid: store.iter_tile_coords()
+               for pyramid, store in tile_stores.items()}
+
+    if os.path.isdir(tiles_dir):
+        with os.scandir(tiles_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and entry.name not in sources:
+                    sources[entry.name] = (
+                        (z, x, y) for z, x, y, _ in iter_pyramid_tiles(entry.path))
+
+    indexes = {}
+    for pyramid, coords in sorted(sources.items()):
+        try:
+            index = TileIndex(pyramid)
+        except ValueError:
+            continue
+        for z, x, y in coords:
+            index.add(z, x, y)
+        indexes[pyramid] = index
+    return indexes
@@ -0,0 +1,126 @@
+# src/core/tile_pyramid.py
+import os
+import re
+import tempfile
+
+
+# Répertoire racine des pyramides de tuiles (EPSG3857, EPSG4326@2x, ...)
+TILES_DIR = "data/map/tiles"
+
+# Route des tuiles attendue par MapManager.getTileUrl (static/js/map.js)
+TILE_ROUTE = re.compile(
+    r"^/data/map/tiles/(?P<pyramid>[^/]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.png$")
+
+
+def parse_tile_path(url_path):
+    """Extrait (pyramide, z, x, y) d'une URL de tuile, ou None."""
+    match = TILE_ROUTE.match(url_path)
+    if not match:
+        return None
+    return (match.group('pyramid'), int(match.group('z')),
+            int(match.group('x')), int(match.group('y')))
+
+
+def iter_pyramid_tiles(pyramid_dir):
+    """Parcourt une pyramide z/x/y.png et produit (z, x, y, chemin)."""
+    if not os.path.isdir(pyramid_dir):
+        return
+
+    with os.scandir(pyramid_dir) as zoom_entries:
+        zoom_dirs = [e for e in zoom_entries if e.is_dir() and e.name.isdigit()]
+
+    for zoom_entry in sorted(zoom_dirs, key=lambda e: int(e.name)):
+        z = int(zoom_entry.name)
+        with os.scandir(zoom_entry.path) as column_entries:
+            column_dirs = [e for e in column_entries
+                           if e.is_dir() and e.name.isdigit()]
+
+        for column_entry in sorted(column_dirs, key=lambda e: int(e.name)):
+            x = int(column_entry.name)
+            with os.scandir(column_entry.path) as tile_entries:
+                for tile_entry in tile_entries:
+                    name, ext = os.path.splitext(tile_entry.name)
+                    if ext == '.png' and name.isdigit():
+                        yield z, x, int(name), tile_entry.path
+
+
+def write_tile(pyramid_dir, z, x, y, data):
+    """Écrit la tuile z/x/y.png d'une pyramide (écriture atomique).
+
+    Le PNG est écrit dans un fichier temporaire caché du même répertoire puis
+    renommé : un lecteur concurrent (serveur, reprise) ne voit jamais de
+    tuile tronquée.
+    """
+    directory = os.path.join(pyramid_dir, str(z), str(x))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tile-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, os.path.join(directory, f"{y}.png"))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Taille d'une tuile à l'échelle 1 (pixels)
+TILE_SIZE = 256
+
+# Demi-emprise du globe en Web Mercator (mètres)
+MERCATOR_EXTENT = 20037508.342789244
+
+
+def pyramid_crs(pyramid):
+    """Retourne (crs, échelle) d'un nom de pyramide, ex: EPSG4326@2x → ('EPSG:4326', 2)."""
+    name, _, scale = pyramid.partition('@')
+    crs = name.replace('EPSG', 'EPSG:', 1)
+    try:
+        scale = int(scale.rstrip('xX')) if scale else 1
+    except ValueError:
+        scale = 1
+    return crs, scale
+
+
+def pyramid_name(crs, scale=1):
+    """Nom du répertoire d'une pyramide, ex: ('EPSG:3857', 2) → EPSG3857@2x."""
+    scale_suffix = f"@{scale}x" if scale > 1 else ""
+    return f"{crs.replace(':', '')}{scale_suffix}"
+
+
+def grid_size(crs, z):
+    """Nombre de tuiles (colonnes, lignes) au zoom z pour un CRS.
+
+    La grille géodésique est celle de gdal2tiles (une tuile de 360° au zoom 0,
+    puis 2^z × 2^(z-1) tuiles), comme attendu par TileValidator.
+    """
+    if crs == "EPSG:3857":
+        return 1 << z, 1 << z
+    if crs == "EPSG:4326":
+        return 1 << z, 1 << max(z - 1, 0)
+    raise ValueError(f"CRS non supporté: {crs}")
+
+
+def tile_bounds(crs, z, x, y):
+    """Emprise (minx, miny, maxx, maxy) d'une tuile en numérotation TMS."""
+    if crs == "EPSG:3857":
+        size = 2 * MERCATOR_EXTENT / (1 << z)
+        minx = -MERCATOR_EXTENT + x * size
+        miny = -MERCATOR_EXTENT + y * size
+    elif crs == "EPSG:4326":
+        size = 360.0 / (1 << z)
+        minx = -180.0 + x * size
+        miny = -90.0 + y * size
+    else:
+        raise ValueError(f"CRS non supporté: {crs}")
+    return minx, miny, minx + size, miny + size
+
+
+def is_valid_tile(crs, z, x, y):
+    """Vérifie qu'une tuile appartient à la grille du CRS."""
+    try:
+        columns, rows = grid_size(crs, z)
+    except ValueError:
+        return False
+    return 0 <= x < columns and 0 <= y < rows
@@ -0,0 +1,155 @@
+# src/core/tile_renderer.py
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from src.core.tile_image import encode_png, imaging_available, is_empty, to_rgba
+from src.core.tile_pyramid import (
+    TILE_SIZE, TILES_DIR, is_valid_tile, pyramid_crs, tile_bounds, write_tile)
+
+try:
+    from osgeo import gdal
+except ImportError:  # Le rendu dynamique nécessite GDAL
+    gdal = None
+
+
+# Zoom maximal rendu à la demande (au-delà : 404 comme aujourd'hui)
+RENDER_MAX_ZOOM = 12
+
+# Temps maximal d'attente d'un rendu lancé par une autre requête (secondes)
+RENDER_WAIT_TIMEOUT = 60
+
+# Ré-échantillonnage utilisé pour le rendu des tuiles
+RENDER_RESAMPLING = 'bilinear'
+
+# Nombre de tuiles vides (océan, hors emprise) mémorisées pour éviter de
+# relancer gdal.Warp à chaque requête
+EMPTY_TILE_CACHE_SIZE = 65536
+
+
+class TileRenderer:
+    """Rendu à la demande des tuiles absentes à partir du GeoTIFF source.
+
+    Le GeoTIFF est ouvert une fois par thread du serveur (les datasets GDAL ne
+    sont pas partagés entre threads). Pour chaque tuile, gdal.Warp ne lit que
+    la fenêtre source qui recouvre l'emprise de la tuile et la ré-échantillonne
+    dans la grille cible ; la tuile PNG est ensuite réécrite dans la pyramide
+    pour que les requêtes suivantes soient servies depuis le disque.
+    Les requêtes simultanées pour une même tuile partagent un seul rendu.
+    Les tuiles vides ne sont pas écrites : elles sont mémorisées (cache LRU
+    borné, invalidé quand le GeoTIFF source est modifié).
+    """
+
+    def __init__(self, source_path, tiles_dir=TILES_DIR, max_zoom=RENDER_MAX_ZOOM,
+                 resampling=RENDER_RESAMPLING):
+        if gdal is None or not imaging_available():
+            raise RuntimeError(
+                "Le rendu dynamique nécessite GDAL, numpy et Pillow")
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f"GeoTIFF source introuvable: {source_path}")
+
+        gdal.UseExceptions()
+        self.source_path = os.path.abspath(source_path)
+        self.tiles_dir = tiles_dir
+        self.max_zoom = max_zoom
+        self.resampling = resampling
+
+        self._local = threading.local()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # (pyramide, z, x, y, mtime de la source) des tuiles rendues vides
+        self._empty_tiles = OrderedDict()
+
+        # Compteurs exposés pour le diagnostic
+        self.rendered = 0
+        self.collapsed = 0
+        self.empty = 0
+        self.empty_hits = 0
+
+    def _dataset(self):
+        dataset = getattr(self._local, 'dataset', None)
+        if dataset is None:
+            dataset = gdal.Open(self.source_path, gdal.GA_ReadOnly)
+            self._local.dataset = dataset
+        return dataset
+
+    def can_render(self, pyramid, z, x, y):
+        """Indique si la tuile fait partie de la grille rendable."""
+        crs, _ = pyramid_crs(pyramid)
+        return z <= self.max_zoom and is_valid_tile(crs, z, x, y)
+
+    def render(self, pyramid, z, x, y):
+        """Retourne la tuile PNG rendue (ou None si elle est vide)."""
+        key = (pyramid, z, x, y)
+        try:
+            empty_key = key + (os.stat(self.source_path).st_mtime_ns,)
+        except OSError:
+            empty_key = None
+
+        with self._lock:
+            if empty_key in self._empty_tiles:
+                self._empty_tiles.move_to_end(empty_key)
+                self.empty_hits += 1
+                return None
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.collapsed += 1
+
+        if not owner:
+            return future.result(timeout=RENDER_WAIT_TIMEOUT)
+
+        try:
+            data = self._render(pyramid, z, x, y)
+            if data is None and empty_key is not None:
+                with self._lock:
+                    self._empty_tiles[empty_key] = True
+                    if len(self._empty_tiles) > EMPTY_TILE_CACHE_SIZE:
+                        self._empty_tiles.popitem(last=False)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _render(self, pyramid, z, x, y):
+        crs, scale = pyramid_crs(pyramid)
+        size = TILE_SIZE * scale
+        minx, miny, maxx, maxy = tile_bounds(crs, z, x, y)
+
+        warped = gdal.Warp(
+            '', self._dataset(), format='MEM', dstSRS=crs,
+            outputBounds=(minx, miny, maxx, maxy), width=size, height=size,
+            resampleAlg=self.resampling, dstAlpha=True)
+        if warped is None:
+            raise RuntimeError(f"Échec du rendu de {pyramid}/{z}/{x}/{y}")
+
+        bands = warped.ReadAsArray()
+        warped = None
+
+        rgba = to_rgba(bands)
+        if is_empty(rgba):
+            self.empty += 1
+            return None
+
+        data = encode_png(rgba)
+        write_tile(os.path.join(self.tiles_dir, pyramid), z, x, y, data)
+        self.rendered += 1
+        return data
+
+    def stats(self):
+        return {
+            'rendered': self.rendered,
+            'collapsed': self.collapsed,
+            'empty': self.empty,
+            'empty_hits': self.empty_hits,
+            'empty_cached': len(self._empty_tiles),
+            'inflight': len(self._inflight),
+        }
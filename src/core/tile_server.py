@@ -1,18 +1,399 @@
 # src/core/tile_server.py
 import http.server
-import socketserver
+import io
 import os
+import socket
 import urllib.parse
+import json
 import threading
-from pathlib import Path
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from src.core.tile_cache import TileCache
+from src.core.access_log import logger, start_logging, stop_logging
+from src.core.metrics import METRICS_CONTENT_TYPE, RequestMetrics, route_class
+from src.core.http_client import close_session, render_upstream_metrics, upstream_stats
+from src.core.prefork import (
+    drain_on_signal, port_available, prefork_supported, supervise)
+from src.core.data_manifest import summarize_manifest, update_manifest
+from src.core.tile_pyramid import TILES_DIR, parse_tile_path, pyramid_crs
+from src.core.tile_index import build_tile_indexes, parse_tile_index_path
+from src.core.reprojection import CANONICAL_CRS, TileReprojector
+from src.core.wmts_proxy import (
+    DEFAULT_TILE_MATRIX_SET, WMTS_CACHE_PRUNE_INTERVAL, WMTS_UPSTREAM_URL,
+    UpstreamError, WmtsProxy, parse_wmts_path)
+from src.core.mbtiles import MBTILES_DIR, open_mbtiles_stores
+from src.core.pmtiles import PMTILES_DIR, open_pmtiles_stores
+from src.core.tile_renderer import RENDER_MAX_ZOOM, TileRenderer
+from src.core.vector_data import LayerCache
+from src.core.vector_query import (
+    QueryError, build_query_index, iter_feature_collection, parse_query_params,
+    parse_vector_query_path, query_features)
+from src.core.vector_tiles import (
+    MVT_CONTENT_TYPE, MVT_MAX_ZOOM, encode_vector_tile, parse_vector_tile_path,
+    prepare_layer)
+from src.core.http_cache import (
+    cache_control_for, content_etag, file_etag, is_not_modified)
+from src.core.http_ranges import (
+    RangeNotSatisfiable, build_multipart, if_range_matches, parse_range_header)
+from src.core.precompress import (
+    MIN_COMPRESS_SIZE, accepted_encodings, get_sidecar, is_compressible,
+    precompress_directories)
+
+
+# Nombre maximal de requêtes traitées simultanément par le serveur
+MAX_WORKERS = 64
+
+# Nombre maximal de connexions ouvertes (un thread chacune, le plus souvent
+# inactif en attente de la requête suivante) ; au-delà : 503 immédiat
+MAX_CONNECTIONS = 512
+
+# Délai d'inactivité (secondes) avant fermeture d'une connexion keep-alive
+KEEP_ALIVE_TIMEOUT = 15
+
+# Délai d'inactivité réduit quand la moitié des connexions est occupée
+KEEP_ALIVE_BUSY_TIMEOUT = 2
+BUSY_CONNECTIONS_RATIO = 0.5
+
+# Attente maximale d'une place de traitement (secondes) ; au-delà : 503
+REQUEST_SLOT_TIMEOUT = 5
+
+# Délai laissé aux requêtes en cours à l'arrêt du serveur (secondes)
+REQUEST_DRAIN_TIMEOUT = 10
+
+# Réponse envoyée aux connexions refusées (limite atteinte)
+OVERLOADED_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\n"
+                       b"Retry-After: 1\r\nContent-Length: 0\r\n"
+                       b"Connection: close\r\n\r\n")
+
+# Budget mémoire par défaut du cache de tuiles (Mo)
+TILE_CACHE_MB = 64
+
+# Stockage des tuiles : 'directory' (z/x/y.png), 'mbtiles' (SQLite)
+# ou 'pmtiles' (archive unique lue par mmap)
+TILE_BACKENDS = ('directory', 'mbtiles', 'pmtiles')
+
+
+class TileHTTPServer(http.server.HTTPServer):
+    """Serveur HTTP concurrent basé sur un pool de threads borné.
+
+    Chaque connexion (éventuellement keep-alive) occupe un thread du pool
+    pendant toute sa durée, mais seules `max_workers` requêtes sont traitées
+    simultanément : une connexion inactive n'occupe pas de place de
+    traitement. Une requête qui n'obtient pas de place en
+    REQUEST_SLOT_TIMEOUT secondes reçoit un 503. Au-delà de `max_connections`
+    connexions ouvertes, les nouvelles reçoivent un 503 ; à l'approche de la
+    limite, le délai keep-alive est raccourci et les connexions inactives
+    sont fermées.
+    """
+
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS,
+                 tile_cache_mb=TILE_CACHE_MB, tile_stores=None, tile_renderer=None,
+                 reuse_port=False, max_connections=MAX_CONNECTIONS):
+        # SO_REUSEPORT : plusieurs processus écoutent sur le même port
+        self.reuse_port = reuse_port
+        # Arrêt en cours : les connexions keep-alive sont fermées
+        self.draining = False
+        # Un thread par connexion ouverte : la file du pool reste bornée
+        self.max_connections = max_connections
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="tile-worker")
+        # Places de traitement des requêtes, indépendantes des connexions
+        self.request_slots = threading.BoundedSemaphore(max_workers)
+        # Connexions ouvertes -> début d'inactivité (None : requête en cours)
+        self.connections = {}
+        # Connexions inactives fermées par le serveur, pas encore libérées
+        self.closing = set()
+        self.connections_changed = threading.Condition()
+        # Cache LRU partagé par tous les workers pour les tuiles chaudes
+        self.tile_cache = TileCache(max_bytes=tile_cache_mb * 1024 * 1024)
+        # Archives de tuiles par pyramide (les autres restent sur disque)
+        self.tile_stores = tile_stores or {}
+        # Rendu à la demande des tuiles absentes (None : désactivé)
+        self.tile_renderer = tile_renderer
+        # Bitmaps des tuiles existantes par pyramide (construits en arrière-plan)
+        self.tile_indexes = {}
+        # Tuiles EPSG:4326 dérivées de la pyramide EPSG:3857 (None : désactivé)
+        self.tile_reprojector = None
+        # Proxy des tuiles WMTS Copernicus avec cache disque (None : désactivé)
+        self.wmts_proxy = None
+        # Couches GeoJSON projetées pour les tuiles vectorielles (paresseux)
+        self.vector_tile_layers = LayerCache(prepare_layer)
+        # Index spatiaux (shapely.STRtree) des couches pour les requêtes par bbox
+        self.vector_query_layers = LayerCache(build_query_index)
+        # Diagnostic des données, calculé en arrière-plan après le démarrage
+        self.diagnostics = None
+        self.started_at = time.time()
+        # Métriques des requêtes exposées sur /metrics
+        self.metrics = RequestMetrics()
+        super().__init__(server_address, handler_class)
+
+    def read_tile(self, pyramid, z, x, y):
+        """Retourne (octets, ETag) d'une tuile stockée (archive ou disque), ou None."""
+        index = self.tile_indexes.get(pyramid)
+        if index is not None and not index.contains(z, x, y):
+            return None
+
+        store = self.tile_stores.get(pyramid)
+        if store is not None:
+            entry = store.get_tile_entry(z, x, y)
+            if entry is None:
+                return None
+            data, etag = entry
+            return data, etag or content_etag(data)
+
+        path = os.path.join(TILES_DIR, pyramid, str(z), str(x), f"{y}.png")
+        tile = self.tile_cache.get_file(path)
+        return (tile.data, tile.etag) if tile is not None else None
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        """Délègue la connexion au pool, ou la refuse si la limite est atteinte."""
+        with self.connections_changed:
+            # Sous forte charge, les connexions inactives depuis plus de
+            # KEEP_ALIVE_BUSY_TIMEOUT sont fermées ; à la limite, la plus
+            # ancienne connexion inactive cède sa place
+            if len(self.connections) >= self.max_connections * BUSY_CONNECTIONS_RATIO:
+                self._close_idle(KEEP_ALIVE_BUSY_TIMEOUT)
+            accepted = (len(self.connections) - len(self.closing) < self.max_connections
+                        or self._close_idle(0, limit=1))
+            if accepted:
+                self.connections[request] = time.monotonic()
+        if not accepted:
+            logger.warning('connection refused', extra={'fields': {
+                'client': client_address[0], 'connections': self.max_connections}})
+            try:
+                request.sendall(OVERLOADED_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.executor.submit(self._process_request_worker,
+                             request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.connections_changed:
+                self.connections.pop(request, None)
+                self.closing.discard(request)
+            self.shutdown_request(request)
+
+    def _close_idle(self, min_idle, limit=None):
+        """Ferme les connexions inactives depuis `min_idle` s (verrou détenu).
+
+        Retourne le nombre de connexions fermées, les plus anciennes d'abord.
+        """
+        now = time.monotonic()
+        idle = sorted((since, id(connection), connection)
+                      for connection, since in self.connections.items()
+                      if since is not None and connection not in self.closing
+                      and now - since >= min_idle)
+        closed = 0
+        for _, _, connection in idle[:limit]:
+            self.closing.add(connection)
+            # Lecture seule : une requête reçue au même instant peut encore
+            # recevoir sa réponse (voir begin_request)
+            _shutdown_socket(connection, socket.SHUT_RD)
+            closed += 1
+        return closed
+
+    def idle_timeout(self):
+        """Délai d'attente de la requête suivante sur une connexion keep-alive."""
+        if len(self.connections) >= self.max_connections * BUSY_CONNECTIONS_RATIO:
+            return KEEP_ALIVE_BUSY_TIMEOUT
+        return KEEP_ALIVE_TIMEOUT
+
+    def begin_request(self, connection):
+        """Marque la connexion occupée puis réserve une place de traitement.
+
+        Retourne (place obtenue, connexion en cours de fermeture). Une
+        connexion fermée par _close_idle pendant la lecture de la requête
+        n'est plus comptée comme fermée : la requête est traitée, puis la
+        connexion fermée.
+        """
+        with self.connections_changed:
+            closing = connection in self.closing
+            self.closing.discard(connection)
+            if connection in self.connections:
+                self.connections[connection] = None
+        return self.request_slots.acquire(timeout=REQUEST_SLOT_TIMEOUT), closing
+
+    def end_request(self, connection, acquired=True):
+        if acquired:
+            self.request_slots.release()
+        with self.connections_changed:
+            if connection in self.connections:
+                self.connections[connection] = time.monotonic()
+            self.connections_changed.notify_all()
+
+    def server_close(self):
+        super().server_close()
+        self.draining = True
+        # Les connexions inactives sont fermées sans attendre leur délai
+        # keep-alive ; les requêtes en cours disposent de REQUEST_DRAIN_TIMEOUT
+        with self.connections_changed:
+            self._close_idle(0)
+            self.connections_changed.wait_for(
+                lambda: None not in self.connections.values(),
+                timeout=REQUEST_DRAIN_TIMEOUT)
+            for connection in self.connections:
+                _shutdown_socket(connection)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for store in self.tile_stores.values():
+            store.close()
+        if self.wmts_proxy is not None:
+            close_session()
+
+
+def _shutdown_socket(connection, how=socket.SHUT_RDWR):
+    # Débloque le thread en attente de lecture sur ce socket
+    try:
+        connection.shutdown(how)
+    except OSError:
+        pass
+
+
+class CountingWriter:
+    """Enveloppe le flux de sortie pour compter les octets envoyés."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class MemoryBody:
+    """Corps de réponse en mémoire (bytes ou memoryview), écrit sans copie."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def close(self):
+        pass
+
+
+class StreamBody:
+    """Corps de réponse produit au fil de l'eau (chunked, éventuellement gzip)."""
+
+    def __init__(self, chunks, chunked=True, gzip=False):
+        self.chunks = chunks
+        self.chunked = chunked
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def close(self):
+        close = getattr(self.chunks, 'close', None)
+        if close:
+            close()
+
+
+class FileParts:
+    """Corps de réponse 206 composé de segments d'un fichier ouvert."""
+
+    def __init__(self, f, parts, trailer=b''):
+        self.file = f
+        # Liste de (préfixe en octets, offset, longueur)
+        self.parts = parts
+        self.trailer = trailer
+
+    def close(self):
+        self.file.close()
 
 
 class TileHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 pour réutiliser la connexion entre les nombreuses tuiles
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, **kwargs):
         # Définir le répertoire de base
         self.base_directory = os.getcwd()
         super().__init__(*args, directory=self.base_directory, **kwargs)
 
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+
+    def handle_one_request(self):
+        """Traite une requête en mesurant sa durée, son statut et sa taille."""
+        self._request_started = None
+        self._status = None
+        # Attente de la requête suivante : délai raccourci sous forte charge
+        self.connection.settimeout(self.server.idle_timeout())
+        try:
+            super().handle_one_request()
+        finally:
+            if self._request_started is not None:
+                self.server.end_request(self.connection, self._slot_acquired)
+                self._record_request()
+            if self.server.draining:
+                self.close_connection = True
+
+    def parse_request(self):
+        # Requête reçue : connexion occupée, place de traitement et délai de
+        # lecture normal
+        self._slot_acquired, closing = self.server.begin_request(self.connection)
+        self._request_started = time.perf_counter()
+        self.connection.settimeout(self.timeout)
+        self._request_bytes = self.wfile.bytes_written
+        ok = super().parse_request()
+        self._route = route_class(getattr(self, 'path', ''))
+        self.server.metrics.begin(self._route)
+        if closing:
+            self.close_connection = True
+        if ok and not self._slot_acquired:
+            self._send_overloaded()
+            return False
+        return ok
+
+    def _send_overloaded(self):
+        """503 : aucune place de traitement libérée à temps."""
+        logger.warning('request refused', extra={'fields': {
+            'client': self.client_address[0], 'path': self.path,
+            'wait_s': REQUEST_SLOT_TIMEOUT}})
+        self.close_connection = True
+        self.send_response(503)
+        self.send_header('Retry-After', '1')
+        self.send_header('Content-Length', '0')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def _record_request(self):
+        duration = time.perf_counter() - self._request_started
+        bytes_sent = self.wfile.bytes_written - self._request_bytes
+        status = self._status or 0
+        self.server.metrics.end(self._route, status, bytes_sent, duration)
+        logger.info('request', extra={'fields': {
+            'client': self.client_address[0],
+            'method': getattr(self, 'command', None),
+            'path': getattr(self, 'path', None),
+            'route': self._route,
+            'status': status,
+            'bytes': bytes_sent,
+            'duration_ms': round(duration * 1000, 3),
+        }})
+
     def translate_path(self, path):
         """Traduit le chemin pour servir correctement les fichiers."""
         path = urllib.parse.unquote(path)
@@ -28,11 +409,11 @@ class TileHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         # Servir les fichiers GeoJSON vectoriels
         if path.startswith('/data/vector/'):
             if os.path.exists(full_path):
-                print(f"✅ Fichier vectoriel servi: {path} -> {full_path}")
+                logger.debug("Fichier vectoriel servi: %s -> %s", path, full_path)
                 return full_path
             else:
-                print(
-                    f"❌ Fichier vectoriel introuvable: {path} -> {full_path}")
+                logger.debug("Fichier vectoriel introuvable: %s -> %s",
+                             path, full_path)
 
         # Servir les fichiers statiques
         if path.startswith('/static/'):
@@ -51,6 +432,553 @@ class TileHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
         return super().translate_path(path)
 
+    def send_head(self):
+        """Sert les tuiles depuis le cache mémoire, le reste via le disque."""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+
+        if path == '/health':
+            return self._send_health()
+
+        if path == '/metrics':
+            return self._send_metrics()
+
+        vector_tile = parse_vector_tile_path(path)
+        if vector_tile:
+            return self._send_vector_tile(*vector_tile)
+
+        query_layer = parse_vector_query_path(path)
+        if query_layer:
+            return self._send_vector_query(query_layer)
+
+        wmts_tile = parse_wmts_path(path)
+        if wmts_tile:
+            return self._send_wmts_tile(*wmts_tile)
+
+        tile_index = parse_tile_index_path(path)
+        if tile_index:
+            return self._send_tile_index(*tile_index)
+
+        tile_coords = parse_tile_path(path)
+        if tile_coords:
+            pyramid, z, x, y = tile_coords
+            reprojector = self.server.tile_reprojector
+            if reprojector is not None and reprojector.handles(pyramid):
+                return self._send_reprojected_tile(reprojector, *tile_coords)
+
+            index = self.server.tile_indexes.get(pyramid)
+            if index is not None and not index.contains(z, x, y):
+                # Tuile absente de l'index : pas d'accès disque
+                renderer = self.server.tile_renderer
+                if renderer is not None and renderer.can_render(*tile_coords):
+                    return self._send_rendered_tile(renderer, *tile_coords)
+                self.send_error(404, "Tile not found")
+                return None
+
+            store = getattr(self.server, 'tile_stores', {}).get(pyramid)
+            if store is not None:
+                return self._send_store_tile(store, z, x, y)
+
+        if '/data/map/tiles/' in path and path.endswith('.png'):
+            tile = self._get_cached_tile(path)
+            if tile is not None:
+                return self._send_bytes(tile.data, 'image/png',
+                                        tile.mtime_ns // 1_000_000_000,
+                                        tile.etag)
+
+            renderer = getattr(self.server, 'tile_renderer', None)
+            if tile_coords and renderer is not None and renderer.can_render(*tile_coords):
+                return self._send_rendered_tile(renderer, *tile_coords)
+
+        file_path = self.translate_path(self.path)
+        if os.path.isdir(file_path):
+            # Redirections et listings de répertoires : comportement standard
+            return super().send_head()
+
+        return self._send_file(file_path)
+
+    def _send_store_tile(self, store, z, x, y):
+        """Sert une tuile lue dans une archive (MBTiles, PMTiles)."""
+        entry = store.get_tile_entry(z, x, y)
+        if entry is None:
+            self.send_error(404, "Tile not found")
+            return None
+        data, etag = entry
+        return self._send_bytes(data, 'image/png', store.mtime, etag)
+
+    def _send_rendered_tile(self, renderer, pyramid, z, x, y):
+        """Rend une tuile absente depuis le GeoTIFF source et la sert."""
+        try:
+            data = renderer.render(pyramid, z, x, y)
+        except Exception as e:
+            self.log_error("Rendu impossible %s/%d/%d/%d: %s", pyramid, z, x, y, e)
+            self.send_error(500, "Tile rendering failed")
+            return None
+
+        if data is None:
+            self.send_error(404, "Tile not found")
+            return None
+
+        index = self.server.tile_indexes.get(pyramid)
+        if index is not None:
+            index.add(z, x, y)
+        return self._send_bytes(data, 'image/png')
+
+    def _send_reprojected_tile(self, reprojector, pyramid, z, x, y):
+        """Sert une tuile EPSG:4326 dérivée de la pyramide EPSG:3857."""
+        try:
+            entry = reprojector.get_tile(pyramid, z, x, y)
+        except Exception as e:
+            self.log_error("Reprojection impossible %s/%d/%d/%d: %s", pyramid, z, x, y, e)
+            self.send_error(500, "Tile reprojection failed")
+            return None
+
+        if entry is None:
+            self.send_error(404, "Tile not found")
+            return None
+        data, etag = entry
+        return self._send_bytes(data, 'image/png', None, etag)
+
+    def _send_wmts_tile(self, layer, time_step, z, x, y):
+        """Sert une tuile WMTS Copernicus depuis le cache disque ou l'amont."""
+        proxy = self.server.wmts_proxy
+        if proxy is None:
+            self.send_error(404, "WMTS proxy disabled")
+            return None
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        matrix_set = query.get('tilematrixset', [DEFAULT_TILE_MATRIX_SET])[0]
+        try:
+            tile = proxy.get_tile(layer, time_step, z, x, y, matrix_set)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return None
+        except UpstreamError as e:
+            self.log_error("%s", e)
+            self.send_error(502, "WMTS upstream unavailable")
+            return None
+
+        if tile.data is None:
+            self.send_error(404, "Tile not found upstream")
+            return None
+
+        etag = content_etag(tile.data)
+        max_age = max(int(tile.expires_at - time.time()), 0)
+        if is_not_modified(self.headers, etag, None):
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(tile.data)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(tile.fetched_at))
+        # Valable jusqu'à la publication du prochain run de prévision
+        self.send_header('Cache-Control', f'public, max-age={max_age}')
+        if tile.stale:
+            self.send_header('Warning', '110 - "Response is Stale"')
+        self.end_headers()
+        return MemoryBody(tile.data) if self._status == 200 else None
+
+    def _send_tile_index(self, pyramid, z):
+        """Sert le résumé JSON ou le bitmap (ou les blocs) d'un zoom de l'index."""
+        index = self.server.tile_indexes.get(pyramid)
+        if index is None:
+            self.send_error(404, "Tile index not available")
+            return None
+
+        if z is None:
+            summary = index.summary()
+            # Tuiles absentes rendues à la demande : le client ne doit pas filtrer
+            summary['dynamic'] = self.server.tile_renderer is not None
+            data = json.dumps(summary).encode('utf-8')
+            return self._send_bytes(data, 'application/json')
+
+        data = index.bitmap(z)
+        if data is None:
+            self.send_error(404, "Zoom level not indexed")
+            return None
+
+        # Les bitmaps (souvent pleins ou vides par zones) se compressent très bien
+        coding = None
+        if len(data) >= MIN_COMPRESS_SIZE and any(
+                c == 'gzip' for c, _ in accepted_encodings(self.headers.get('Accept-Encoding'))):
+            data = zlib.compress(data, 6, wbits=31)
+            coding = 'gzip'
+
+        etag = content_etag(data)
+        if is_not_modified(self.headers, etag, None):
+            self._send_not_modified(etag, None, vary=True)
+            return None
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        if coding:
+            self.send_header('Content-Encoding', coding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self._send_validators(etag, None)
+        self.end_headers()
+        return MemoryBody(data)
+
+    def _send_health(self):
+        """Expose l'état du serveur et le diagnostic des données en JSON."""
+        diagnostics = getattr(self.server, 'diagnostics', None)
+        renderer = getattr(self.server, 'tile_renderer', None)
+        reprojector = self.server.tile_reprojector
+        health = {
+            'status': diagnostics['status'] if diagnostics else 'starting',
+            'uptime_s': round(time.time() - self.server.started_at, 1),
+            'tile_cache': self.server.tile_cache.stats(),
+            'tile_stores': {name: store.path
+                            for name, store in self.server.tile_stores.items()},
+            'renderer': renderer.stats() if renderer else None,
+            'reprojector': {
+                'sources': sorted(reprojector.sources),
+                'reprojected': reprojector.reprojected,
+                'empty': reprojector.empty,
+                'empty_hits': reprojector.empty_hits,
+            } if reprojector else None,
+            'wmts_proxy': self.server.wmts_proxy.stats() if self.server.wmts_proxy else None,
+            'upstream': upstream_stats(),
+            'tile_indexes': {name: index.summary()['zooms']
+                             for name, index in self.server.tile_indexes.items()},
+            'diagnostics': diagnostics,
+        }
+        data = json.dumps(health, ensure_ascii=False, indent=2).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        return MemoryBody(data)
+
+    def _send_metrics(self):
+        """Expose les métriques des requêtes et des caches (format Prometheus)."""
+        server = self.server
+        cache = server.tile_cache.stats()
+        gauges = {
+            'tile_server_uptime_seconds': (
+                'gauge', 'Durée de fonctionnement du serveur.',
+                round(time.time() - server.started_at, 3)),
+            'tile_server_tile_cache_hits_total': (
+                'counter', 'Tuiles servies depuis le cache mémoire.', cache['hits']),
+            'tile_server_tile_cache_misses_total': (
+                'counter', 'Tuiles absentes du cache mémoire.', cache['misses']),
+            'tile_server_tile_cache_evictions_total': (
+                'counter', 'Tuiles évincées du cache mémoire.', cache['evictions']),
+            'tile_server_tile_cache_hit_ratio': (
+                'gauge', 'Taux de succès du cache mémoire des tuiles.',
+                round(cache['hit_ratio'], 6)),
+            'tile_server_tile_cache_bytes': (
+                'gauge', 'Octets occupés par le cache mémoire des tuiles.', cache['bytes']),
+            'tile_server_tile_cache_entries': (
+                'gauge', 'Tuiles présentes dans le cache mémoire.', cache['entries']),
+        }
+        renderer = server.tile_renderer
+        if renderer is not None:
+            stats = renderer.stats()
+            gauges['tile_server_rendered_tiles_total'] = (
+                'counter', 'Tuiles rendues à la demande.', stats['rendered'])
+            gauges['tile_server_empty_tile_hits_total'] = (
+                'counter', 'Tuiles vides servies sans nouveau rendu.', stats['empty_hits'])
+            gauges['tile_server_render_in_flight'] = (
+                'gauge', 'Rendus de tuiles en cours.', stats['inflight'])
+
+        data = server.metrics.render(gauges) + render_upstream_metrics()
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        return MemoryBody(data)
+
+    def _send_vector_tile(self, layer, z, x, y):
+        """Sert une tuile Mapbox Vector Tile générée depuis un GeoJSON."""
+        if z > MVT_MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+            self.send_error(404, "Tile not found")
+            return None
+
+        prepared = self.server.vector_tile_layers.get(layer)
+        if prepared is None:
+            self.send_error(404, "Layer not found")
+            return None
+        layer_index, mtime_ns = prepared
+
+        key = ('mvt', layer, mtime_ns, z, x, y)
+        entry = self.server.tile_cache.get(key)
+        if entry is None:
+            data = encode_vector_tile(layer, layer_index, z, x, y)
+            entry = self.server.tile_cache.put(key, data, content_etag(data))
+
+        return self._send_bytes(entry.data, MVT_CONTENT_TYPE,
+                                mtime_ns // 1_000_000_000, entry.etag)
+
+    def _send_vector_query(self, layer):
+        """Sert les features d'une couche qui intersectent une bbox (streaming)."""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        try:
+            bbox, limit = parse_query_params(query)
+        except QueryError as e:
+            self.send_error(400, str(e))
+            return None
+
+        prepared = self.server.vector_query_layers.get(layer)
+        if prepared is None:
+            self.send_error(404, "Layer not found")
+            return None
+        index, mtime_ns = prepared
+
+        gzip = any(coding == 'gzip' for coding, _ in
+                   accepted_encodings(self.headers.get('Accept-Encoding')))
+
+        # Réponse déterministe pour une version de couche et une requête données
+        etag = content_etag(f"{layer}:{mtime_ns}:{bbox}:{limit}".encode())
+        if gzip:
+            # ETag distinct par représentation encodée
+            etag = f'{etag[:-1]}-gzip"'
+        mtime = mtime_ns // 1_000_000_000
+        if is_not_modified(self.headers, etag, mtime):
+            self._send_not_modified(etag, mtime, vary=True)
+            return None
+
+        features = query_features(index, bbox, limit)
+        chunked = self.request_version >= 'HTTP/1.1'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/geo+json')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            # Sans chunked, la fin du corps est signalée par la fermeture
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        if gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('X-Feature-Count', str(len(features)))
+        self._send_validators(etag, mtime)
+        self.end_headers()
+        return StreamBody(iter_feature_collection(features), chunked, gzip)
+
+    def _get_cached_tile(self, path):
+        """Retourne la tuile depuis le cache LRU du serveur (ou None)."""
+        tile_cache = getattr(self.server, 'tile_cache', None)
+        if tile_cache is None:
+            return None
+
+        full_path = os.path.normpath(os.path.join(
+            self.base_directory, path.lstrip('/')))
+        if not full_path.startswith(self.base_directory):
+            return None
+
+        return tile_cache.get_file(full_path)
+
+    def _send_validators(self, etag, mtime):
+        """Envoie ETag, Last-Modified et Cache-Control de la route courante."""
+        if etag:
+            self.send_header('ETag', etag)
+        if mtime is not None:
+            self.send_header('Last-Modified', self.date_time_string(mtime))
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        self.send_header('Cache-Control', cache_control_for(path))
+
+    def _send_not_modified(self, etag, mtime, vary=False):
+        """Répond 304 Not Modified (sans corps)."""
+        self.send_response(304)
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+        self._send_validators(etag, mtime)
+        self.end_headers()
+
+    def _send_bytes(self, data, content_type, mtime=None, etag=None):
+        """Envoie les en-têtes d'une réponse dont le corps est en mémoire."""
+        if etag is None:
+            etag = content_etag(data)
+
+        if is_not_modified(self.headers, etag, mtime):
+            self._send_not_modified(etag, mtime)
+            return None
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self._send_validators(etag, mtime)
+        self.end_headers()
+        return MemoryBody(data)
+
+    def _select_encoding(self, file_path, stat):
+        """Choisit un fichier annexe compressé (.br/.gz) selon Accept-Encoding.
+
+        Retourne (encodage, chemin) ou (None, None) pour la version brute.
+        """
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if not is_compressible(url_path, file_path) or stat.st_size < MIN_COMPRESS_SIZE:
+            return None, None
+
+        # Les requêtes partielles portent sur les octets bruts du fichier
+        if 'Range' in self.headers:
+            return None, None
+
+        for coding, suffix in accepted_encodings(self.headers.get('Accept-Encoding')):
+            sidecar_path = get_sidecar(file_path, stat, coding, suffix)
+            if sidecar_path:
+                return coding, sidecar_path
+        return None, None
+
+    def _send_file(self, file_path):
+        """Envoie les en-têtes d'un fichier avec GET conditionnel et compression."""
+        if file_path.endswith('/'):
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            f = open(file_path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            stat = os.fstat(f.fileno())
+            url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+            vary = is_compressible(url_path, file_path)
+            coding, sidecar_path = self._select_encoding(file_path, stat)
+
+            etag = file_etag(stat)
+            if coding:
+                # ETag distinct par représentation encodée
+                etag = f'{etag[:-1]}-{coding}"'
+
+            if is_not_modified(self.headers, etag, stat.st_mtime):
+                f.close()
+                self._send_not_modified(etag, stat.st_mtime, vary)
+                return None
+
+            length = stat.st_size
+            if coding:
+                try:
+                    encoded = open(sidecar_path, 'rb')
+                except OSError:
+                    coding = None
+                    etag = file_etag(stat)
+                else:
+                    f.close()
+                    f = encoded
+                    length = os.fstat(f.fileno()).st_size
+
+            content_type = self.guess_type(file_path)
+            last_modified = self.date_time_string(stat.st_mtime)
+
+            ranges = None
+            if 'Range' in self.headers and if_range_matches(
+                    self.headers.get('If-Range'), etag, last_modified):
+                try:
+                    ranges = parse_range_header(self.headers['Range'], length)
+                except RangeNotSatisfiable:
+                    f.close()
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{length}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return None
+
+            if ranges:
+                self.send_response(206)
+                if len(ranges) == 1:
+                    start, end = ranges[0]
+                    body = FileParts(f, [(b'', start, end - start + 1)])
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Range',
+                                     f'bytes {start}-{end}/{length}')
+                    self.send_header('Content-Length', str(end - start + 1))
+                else:
+                    boundary, parts, trailer, total = build_multipart(
+                        ranges, length, content_type)
+                    body = FileParts(f, parts, trailer)
+                    self.send_header('Content-Type',
+                                     f'multipart/byteranges; boundary={boundary}')
+                    self.send_header('Content-Length', str(total))
+            else:
+                body = f
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(length))
+
+            self.send_header('Accept-Ranges', 'bytes')
+            if coding:
+                self.send_header('Content-Encoding', coding)
+            if vary:
+                self.send_header('Vary', 'Accept-Encoding')
+            self._send_validators(etag, stat.st_mtime)
+            self.end_headers()
+            return body
+        except Exception:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        """Copie le corps de la réponse, en zéro-copie (sendfile) si possible."""
+        if isinstance(source, MemoryBody):
+            outputfile.write(source.data)
+            return
+
+        if isinstance(source, StreamBody):
+            self._write_stream(source, outputfile)
+            return
+
+        if isinstance(source, FileParts):
+            for prefix, offset, count in source.parts:
+                if prefix:
+                    outputfile.write(prefix)
+                self._sendfile(source.file, offset, count, outputfile)
+            if source.trailer:
+                outputfile.write(source.trailer)
+            return
+
+        if isinstance(source, io.BufferedReader):
+            self._sendfile(source, 0, None, outputfile)
+            return
+
+        super().copyfile(source, outputfile)
+
+    def _write_stream(self, body, outputfile):
+        """Écrit un corps StreamBody (transfert chunked si demandé)."""
+        def write(data):
+            if not data:
+                return
+            if body.chunked:
+                outputfile.write(f"{len(data):X}\r\n".encode('ascii'))
+                outputfile.write(data)
+                outputfile.write(b"\r\n")
+            else:
+                outputfile.write(data)
+
+        for chunk in body.chunks:
+            if body.compressor:
+                chunk = body.compressor.compress(chunk)
+            write(chunk)
+
+        if body.compressor:
+            write(body.compressor.flush())
+        if body.chunked:
+            outputfile.write(b"0\r\n\r\n")
+
+    def _sendfile(self, f, offset, count, outputfile):
+        """Envoie `count` octets du fichier à partir de `offset`."""
+        if outputfile is self.wfile:
+            # socket.sendfile utilise os.sendfile quand la plateforme le permet
+            self.wfile.bytes_written += self.connection.sendfile(f, offset, count)
+            return
+
+        f.seek(offset)
+        remaining = count
+        while remaining is None or remaining > 0:
+            chunk = f.read(64 * 1024 if remaining is None
+                           else min(64 * 1024, remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+
     def guess_type(self, path):
         """Déterminer le type MIME correctement."""
         if path.endswith('.css'):
@@ -67,11 +995,13 @@ class TileHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             return 'application/geo+json'  # Type MIME pour GeoJSON
         return super().guess_type(path)
 
+    def log_request(self, code='-', size='-'):
+        """Le journal d'accès est écrit en fin de requête (_record_request)."""
+
     def log_message(self, format, *args):
-        """Réduire les logs pour éviter le spam."""
-        # Seulement logger les erreurs et les requêtes importantes
-        if args[1] != '200' or '/tiles/' in self.path or '/data/vector/' in self.path:
-            super().log_message(format, *args)
+        """Messages du serveur (erreurs) vers le logger asynchrone."""
+        logger.warning(format, *args, extra={'fields': {
+            'client': self.client_address[0]}})
 
     def end_headers(self):
         """Ajouter les headers CORS pour permettre l'accès depuis Panel"""
@@ -85,249 +1015,263 @@ class TileHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def do_OPTIONS(self):
         """Gérer les requêtes OPTIONS pour CORS"""
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
 
-def find_all_shapefile_folders():
-    """Trouve tous les dossiers contenant des Shapefiles dans data/vector/"""
-    base_dir = Path(__file__).parent.parent.parent
-    vector_dir = base_dir / "data/vector"
-
-    shapefile_folders = []
-
-    if not vector_dir.exists():
-        print(f"❌ Répertoire vector introuvable : {vector_dir}")
-        return []
-
-    # Parcourir tous les dossiers du répertoire vector
-    for folder in vector_dir.iterdir():
-        if folder.is_dir():
-            # Vérifier si le dossier contient des fichiers .shp
-            shp_files = list(folder.glob("*.shp"))
-            if shp_files:
-                # Vérifier les fichiers associés nécessaires
-                associated_files = {
-                    'shp': len(list(folder.glob("*.shp"))),
-                    'dbf': len(list(folder.glob("*.dbf"))),
-                    'shx': len(list(folder.glob("*.shx"))),
-                    'prj': len(list(folder.glob("*.prj"))),
-                    'cpg': len(list(folder.glob("*.cpg"))),
-                }
-
-                shapefile_folders.append({
-                    'name': folder.name,
-                    'path': folder,
-                    'shp_files': shp_files,
-                    'main_shp': shp_files[0].name if shp_files else None,
-                    'associated_files': associated_files,
-                    'is_complete': all(associated_files[ext] > 0 for ext in ['shp', 'dbf', 'shx'])
-                })
-
-    return shapefile_folders
-
-
-def find_all_geojson_files():
-    """Trouve tous les fichiers GeoJSON dans data/vector/geojson/"""
-    base_dir = Path(__file__).parent.parent.parent
-    geojson_dir = base_dir / "data/vector/geojson"
-
-    geojson_files = []
-
-    if not geojson_dir.exists():
-        print(f"❌ Répertoire GeoJSON introuvable : {geojson_dir}")
-        return []
-
-    for geojson_file in geojson_dir.glob("*.geojson"):
-        file_size = geojson_file.stat().st_size
-        geojson_files.append({
-            'name': geojson_file.name,
-            'path': geojson_file,
-            'size': file_size,
-            'size_mb': file_size / (1024 * 1024)
-        })
-
-    return geojson_files
-
-
-def check_vector_data_health():
-    """Vérifie la santé de tous les données vectorielles"""
-    print("\n" + "="*60)
-    print("🔍 DIAGNOSTIC COMPLET DES DONNÉES VECTORIELLES")
-    print("="*60)
-
-    # Vérifier les Shapefiles
-    shapefile_folders = find_all_shapefile_folders()
-
-    print(f"\n📁 SHAPEFILES TROUVÉS ({len(shapefile_folders)} dossiers):")
-    print("-" * 50)
-
-    for folder_info in shapefile_folders:
-        status = "✅ COMPLET" if folder_info['is_complete'] else "⚠️ INCOMPLET"
-        print(f"\n📂 {folder_info['name']} - {status}")
-        print(f"   📊 Fichier principal: {folder_info['main_shp']}")
-
-        # Afficher les fichiers associés
-        for file_type, count in folder_info['associated_files'].items():
-            status_icon = "✅" if count > 0 else "❌"
-            print(f"   {status_icon} .{file_type}: {count} fichier(s)")
-
-    # Vérifier les fichiers GeoJSON
-    geojson_files = find_all_geojson_files()
-
-    print(f"\n🗺️ FICHIERS GEOJSON ({len(geojson_files)} fichiers):")
-    print("-" * 50)
-
-    for geojson_info in geojson_files:
-        print(f"📄 {geojson_info['name']} - {geojson_info['size_mb']:.2f} MB")
-
-    # Vérifier la correspondance Shapefile -> GeoJSON
-    print(f"\n🔗 CORRESPONDANCE SHAPEFILE -> GEOJSON:")
-    print("-" * 50)
-
-    shapefile_names = {folder['name'] for folder in shapefile_folders}
-    geojson_names = {file['name'].replace(
-        '.geojson', '') for file in geojson_files}
-
-    # Shapefiles sans GeoJSON correspondant
-    missing_geojson = shapefile_names - geojson_names
-    if missing_geojson:
-        print("❌ Shapefiles sans GeoJSON correspondant:")
-        for name in sorted(missing_geojson):
-            print(f"   - {name}")
+def open_tile_stores(tile_backend):
+    """Ouvre les archives de tuiles correspondant au backend choisi."""
+    if tile_backend not in TILE_BACKENDS:
+        raise ValueError(f"Backend de tuiles non supporté: {tile_backend}")
+
+    if tile_backend == 'mbtiles':
+        stores, archive_dir = open_mbtiles_stores(MBTILES_DIR), MBTILES_DIR
+    elif tile_backend == 'pmtiles':
+        stores, archive_dir = open_pmtiles_stores(PMTILES_DIR), PMTILES_DIR
     else:
-        print("✅ Tous les Shapefiles ont un GeoJSON correspondant")
+        return {}
 
-    # GeoJSON sans Shapefile correspondant
-    extra_geojson = geojson_names - shapefile_names
-    if extra_geojson:
-        print("📝 GeoJSON sans Shapefile source (peut être normal):")
-        for name in sorted(extra_geojson):
-            print(f"   - {name}")
+    if not stores:
+        print(f"⚠️ Aucune archive .{tile_backend} dans {archive_dir}, "
+              "utilisation des répertoires de tuiles")
+    return stores
 
-    return {
-        'shapefile_folders': shapefile_folders,
-        'geojson_files': geojson_files,
-        'missing_geojson': missing_geojson
-    }
 
+def run_diagnostics(httpd):
+    """Met à jour le manifeste des données et publie le diagnostic sur /health."""
+    started = time.monotonic()
+    try:
+        manifest, rescanned = update_manifest()
+        diagnostics = summarize_manifest(manifest)
+        diagnostics['missing_static_directories'] = [
+            d for d in ('static/css', 'static/js', 'templates') if not os.path.isdir(d)]
+        diagnostics['rescanned_directories'] = rescanned
+        diagnostics['duration_s'] = round(time.monotonic() - started, 3)
+        diagnostics['checked_at'] = time.time()
+    except Exception as e:
+        diagnostics = {'status': 'error', 'error': str(e)}
 
-def run_tile_server(port=8000):
-    """Démarre le serveur de tuiles HTTP avec gestion de port alternatif."""
+    httpd.diagnostics = diagnostics
 
-    # Vérifier que les répertoires statiques existent
-    static_dirs = ['static/css', 'static/js', 'templates']
-    for static_dir in static_dirs:
-        if not os.path.exists(static_dir):
-            print(f"⚠️ Répertoire manquant: {static_dir}")
+    if diagnostics['status'] != 'ok':
+        print(f"⚠️ Diagnostic des données: {diagnostics['status']} "
+              f"(détails sur /health)")
+    return diagnostics
 
-    # Diagnostic complet des données vectorielles
-    vector_health = check_vector_data_health()
 
-    # Vérifier les répertoires vectoriels de base
-    vector_dirs_to_check = [
-        "data/vector",
-        "data/vector/geojson"
-    ]
+def prune_wmts_cache_periodically(httpd):
+    """Nettoie le cache disque du proxy WMTS au démarrage puis toutes les heures."""
+    while True:
+        try:
+            removed, remaining = httpd.wmts_proxy.prune()
+            logger.info('wmts cache pruned', extra={'fields': {
+                'removed_files': removed, 'remaining_mb': round(remaining / 1048576, 1)}})
+        except Exception as e:
+            logger.warning('wmts cache pruning failed: %s', e)
+        time.sleep(WMTS_CACHE_PRUNE_INTERVAL)
 
-    print(f"\n📁 STRUCTURE DES RÉPERTOIRES VECTORIELS:")
-    print("-" * 40)
-    for vector_dir in vector_dirs_to_check:
-        if os.path.exists(vector_dir):
-            files = os.listdir(vector_dir)
-            print(f"📁 {vector_dir} ({len(files)} éléments)")
-            # Afficher les sous-dossiers et fichiers
-            for item in sorted(files)[:10]:  # Limiter à 10 éléments
-                item_path = os.path.join(vector_dir, item)
-                if os.path.isdir(item_path):
-                    print(f"   📂 {item}/")
-                else:
-                    print(f"   📄 {item}")
-            if len(files) > 10:
-                print(f"   ... et {len(files) - 10} autres éléments")
-        else:
-            print(f"❌ {vector_dir} - RÉPERTOIRE MANQUANT")
 
-    # Essayer différents ports
-    ports_to_try = [port, 8001, 8002, 8003]
-    httpd = None
+def canonical_pyramids(tile_stores):
+    """Pyramides EPSG:3857 servies (archives et répertoires de tuiles)."""
+    names = set(tile_stores)
+    if os.path.isdir(TILES_DIR):
+        names.update(name for name in os.listdir(TILES_DIR)
+                     if os.path.isdir(os.path.join(TILES_DIR, name)))
+    return sorted(name for name in names if pyramid_crs(name)[0] == CANONICAL_CRS)
 
-    for current_port in ports_to_try:
+
+def create_tile_server(port, max_workers=MAX_WORKERS, tile_cache_mb=TILE_CACHE_MB,
+                       tile_backend='directory', render_source=None,
+                       render_max_zoom=RENDER_MAX_ZOOM, derive_geodetic=False,
+                       wmts_upstream=WMTS_UPSTREAM_URL, reuse_port=False,
+                       max_connections=MAX_CONNECTIONS, verbose=True):
+    """Ouvre les archives, le rendu dynamique et le socket d'écoute."""
+    tile_stores = open_tile_stores(tile_backend)
+
+    # Mode dynamique : rendu des tuiles absentes depuis le GeoTIFF source
+    tile_renderer = None
+    if render_source:
         try:
-            print(f"\n🔄 Tentative de démarrage sur le port {current_port}...")
-            httpd = socketserver.TCPServer(
-                ("", current_port), TileHTTPRequestHandler)
-            final_port = current_port
-            break
-        except OSError as e:
-            if current_port == ports_to_try[-1]:  # Dernier port essayé
-                print(
-                    f"❌ Impossible de démarrer le serveur sur les ports {ports_to_try}")
-                print(f"💡 Fermez les applications utilisant ces ports ou redémarrez")
-                return None
-            continue
+            tile_renderer = TileRenderer(render_source, max_zoom=render_max_zoom)
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"⚠️ Rendu dynamique désactivé: {e}")
 
-    print(f"\n✅ Serveur de tuiles démarré sur http://localhost:{final_port}")
-    print("📁 Répertoire de travail:", os.getcwd())
+    try:
+        httpd = TileHTTPServer(
+            ("", port), TileHTTPRequestHandler, max_workers, tile_cache_mb,
+            tile_stores, tile_renderer, reuse_port=reuse_port,
+            max_connections=max_connections)
+    except OSError:
+        for store in tile_stores.values():
+            store.close()
+        raise
 
-    # Vérifier que les tuiles existent
-    tiles_paths = [
-        "./data/map/tiles/EPSG3857/0/0/0.png",
-        "./data/map/tiles/EPSG4326/0/0/0.png"
-    ]
+    if wmts_upstream:
+        httpd.wmts_proxy = WmtsProxy(wmts_upstream)
+
+    if derive_geodetic:
+        try:
+            httpd.tile_reprojector = TileReprojector(
+                httpd.read_tile, httpd.tile_cache, canonical_pyramids(tile_stores))
+        except RuntimeError as e:
+            print(f"⚠️ Dérivation EPSG:4326 désactivée: {e}")
+
+    if verbose:
+        for pyramid, store in tile_stores.items():
+            print(f"🗄️  {pyramid} servi depuis {store.path}")
+        if tile_renderer:
+            print(f"🎨 Rendu dynamique jusqu'au zoom {render_max_zoom} "
+                  f"depuis {tile_renderer.source_path}")
+        if httpd.tile_reprojector:
+            print(f"🌐 Tuiles EPSG:4326 dérivées de "
+                  f"{', '.join(sorted(httpd.tile_reprojector.sources)) or '(aucune pyramide)'}")
+    return httpd
+
+
+def build_server_tile_indexes(httpd):
+    """Indexe les tuiles existantes, puis active le filtrage des tuiles absentes."""
+    started = time.monotonic()
+    try:
+        indexes = build_tile_indexes(TILES_DIR, httpd.tile_stores)
+    except Exception as e:
+        print(f"⚠️ Index des tuiles indisponible: {e}")
+        return
+
+    # Les pyramides dérivées ne sont pas servies depuis le disque
+    reprojector = httpd.tile_reprojector
+    if reprojector is not None:
+        indexes = {name: index for name, index in indexes.items()
+                   if not reprojector.handles(name)}
+    httpd.tile_indexes = indexes
+    logger.info('tile index ready', extra={'fields': {
+        'pyramids': sorted(httpd.tile_indexes),
+        'duration_s': round(time.monotonic() - started, 3),
+    }})
+
+
+def serve_tile_server(httpd, precompress=True):
+    """Sert les requêtes jusqu'à l'arrêt, puis libère les ressources.
+
+    Avec `precompress`, les fichiers .br/.gz manquants sont construits en
+    arrière-plan dès le démarrage (un seul processus s'en charge).
+    """
+    log_listener = start_logging()
+    drain_on_signal(httpd)
+
+    # Diagnostic des données en arrière-plan, sans retarder le démarrage
+    threading.Thread(target=run_diagnostics, args=(httpd,),
+                     name="tile-diagnostics", daemon=True).start()
+    threading.Thread(target=build_server_tile_indexes, args=(httpd,),
+                     name="tile-index", daemon=True).start()
+    if precompress:
+        threading.Thread(target=precompress_directories,
+                         name="precompress-scan", daemon=True).start()
+    if httpd.wmts_proxy is not None:
+        threading.Thread(target=prune_wmts_cache_periodically, args=(httpd,),
+                         name="wmts-cache-prune", daemon=True).start()
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du serveur de tuiles")
+    finally:
+        stats = httpd.tile_cache.stats()
+        print(f"📦 Cache tuiles (pid {os.getpid()}): {stats['hits']} hits, "
+              f"{stats['misses']} misses, {stats['evictions']} évictions "
+              f"({stats['hit_ratio']:.0%})")
+        httpd.server_close()
+        stop_logging(log_listener)
 
-    print(f"\n🔍 VÉRIFICATION DES TUILES:")
-    print("-" * 40)
-    for path in tiles_paths:
-        if os.path.exists(path):
-            file_size = os.path.getsize(path) / 1024
-            print(f"✅ {path} - {file_size:.1f} KB")
-        else:
-            print(f"⚠️ Tuiles manquantes: {path}")
+
+def print_server_summary(port, max_workers, max_connections, tile_cache_mb, workers):
+    print(f"\n✅ Serveur de tuiles démarré sur http://localhost:{port}")
+    print("📁 Répertoire de travail:", os.getcwd())
+    if workers > 1:
+        print(f"🧬 Processus: {workers} (SO_REUSEPORT, supervisés)")
+    print(f"🧵 Requêtes simultanées par processus: {max_workers}, "
+          f"connexions: {max_connections} (HTTP/1.1 keep-alive)")
+    print(f"📦 Cache mémoire des tuiles: {tile_cache_mb} Mo par processus (LRU)")
 
     # Résumé des URLs disponibles
     print(f"\n🌐 URLs IMPORTANTES:")
     print("-" * 40)
-    print(f"   🗺️  Carte: http://localhost:{final_port}/templates/index.html")
-    print(f"   🎨 CSS: http://localhost:{final_port}/static/css/main.css")
-    print(f"   ⚙️  JS: http://localhost:{final_port}/static/js/app.js")
-
-    # URLs pour les GeoJSON
-    print(f"\n   📊 DONNÉES VECTORIELLES GEOJSON:")
-    for geojson_info in vector_health['geojson_files']:
-        url_path = f"/data/vector/geojson/{geojson_info['name']}"
-        print(
-            f"      - {geojson_info['name']}: http://localhost:{final_port}{url_path}")
-
-    # URLs pour les tuiles
-    print(f"\n   🧩 TUILES:")
+    print(f"   🗺️  Carte: http://localhost:{port}/templates/index.html")
+    print(f"   🩺 Santé: http://localhost:{port}/health")
+    print(f"   📈 Métriques: http://localhost:{port}/metrics")
     print(
-        f"      - EPSG3857: http://localhost:{final_port}/data/map/tiles/EPSG3857/{{z}}/{{x}}/{{y}}.png")
+        f"   📊 GeoJSON: http://localhost:{port}/data/vector/geojson/{{layer}}.geojson")
     print(
-        f"      - EPSG4326: http://localhost:{final_port}/data/map/tiles/EPSG4326/{{z}}/{{x}}/{{y}}.png")
-
-    # Recommandations
-    if vector_health['missing_geojson']:
-        print(f"\n💡 RECOMMANDATIONS:")
-        print("-" * 40)
-        print("Certains Shapefiles n'ont pas de GeoJSON correspondant.")
-        print("Utilisez le convertisseur pour les générer:")
-        print("   python utils/convert_shp_to_geojson.py")
-
-    print(f"\n📊 STATUT GÉNÉRAL:")
-    print("-" * 40)
-    print(f"   ✅ Shapefiles: {len(vector_health['shapefile_folders'])}")
-    print(f"   ✅ GeoJSON: {len(vector_health['geojson_files'])}")
+        f"   🔎 Requête bbox: http://localhost:{port}/data/vector/query/{{layer}}?bbox=minx,miny,maxx,maxy")
+    print(
+        f"   🧩 Vectorielles: http://localhost:{port}/data/vector/tiles/{{layer}}/{{z}}/{{x}}/{{y}}.pbf")
+    print(
+        f"   🧩 Raster: http://localhost:{port}/data/map/tiles/{{EPSG}}/{{z}}/{{x}}/{{y}}.png")
     print(
-        f"   ⚠️  Conversions manquantes: {len(vector_health['missing_geojson'])}")
+        f"   🧮 Index des tuiles: http://localhost:{port}/data/map/tile-index/{{EPSG}}.json")
+    print(
+        f"   🛰️  WMTS (proxy): http://localhost:{port}/wmts/{{layer}}/{{time}}/{{z}}/{{x}}/{{y}}.png")
 
     print("\n🎯 Prêt à servir les tuiles Natural Earth et données vectorielles...")
 
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n🛑 Arrêt du serveur de tuiles")
 
-    return final_port
+def run_tile_server(port=8000, max_workers=MAX_WORKERS, tile_cache_mb=TILE_CACHE_MB,
+                    tile_backend='directory', render_source=None,
+                    render_max_zoom=RENDER_MAX_ZOOM, derive_geodetic=False,
+                    wmts_upstream=WMTS_UPSTREAM_URL, workers=1,
+                    max_connections=MAX_CONNECTIONS):
+    """Démarre le serveur de tuiles HTTP.
+
+    Avec workers > 1, le serveur pré-forke `workers` processus qui partagent
+    le port via SO_REUSEPORT : l'encodage PNG, la compression et le rendu ne
+    sont plus limités par le GIL d'un seul processus. Un superviseur relance
+    les workers arrêtés et draine les requêtes en cours à l'arrêt (SIGTERM).
+    Les caches et les métriques (/metrics) sont propres à chaque processus.
+
+    Avec derive_geodetic, seule la pyramide EPSG:3857 est stockée : les
+    tuiles EPSG:4326 (mêmes URL) sont ré-échantillonnées à la demande depuis
+    les tuiles EPSG:3857 qui les recouvrent, puis gardées en cache mémoire.
+
+    Les tuiles WMTS Copernicus sont relayées par /wmts/... depuis
+    `wmts_upstream` (None : proxy désactivé) avec un cache disque partagé.
+
+    Le socket est ouvert immédiatement ; le diagnostic des données (manifeste
+    incrémental) s'exécute en arrière-plan et est exposé sur /health.
+    """
+    server_options = dict(
+        max_workers=max_workers, tile_cache_mb=tile_cache_mb,
+        tile_backend=tile_backend, render_source=render_source,
+        render_max_zoom=render_max_zoom, derive_geodetic=derive_geodetic,
+        wmts_upstream=wmts_upstream, max_connections=max_connections)
+
+    if workers > 1 and not prefork_supported():
+        print("⚠️ Mode multi-processus indisponible (fork/SO_REUSEPORT ou thread "
+              "secondaire), démarrage en processus unique")
+        workers = 1
+
+    if workers == 1:
+        try:
+            httpd = create_tile_server(port, **server_options)
+        except OSError as e:
+            print(f"❌ Impossible de démarrer le serveur sur le port {port}: {e}")
+            print(f"💡 Fermez l'application utilisant ce port ou choisissez-en un autre")
+            return None
+        print_server_summary(port, max_workers, max_connections, tile_cache_mb, workers)
+        serve_tile_server(httpd)
+        return port
+
+    if not port_available(port):
+        print(f"❌ Impossible de démarrer le serveur: port {port} déjà utilisé")
+        print(f"💡 Fermez l'application utilisant ce port ou choisissez-en un autre")
+        return None
+
+    def worker_main(index):
+        httpd = create_tile_server(port, reuse_port=True, verbose=index == 0,
+                                   **server_options)
+        serve_tile_server(httpd, precompress=index == 0)
+
+    print_server_summary(port, max_workers, max_connections, tile_cache_mb, workers)
+    supervise(workers, worker_main)
+    return port
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+# src/core/vector_data.py
+import json
+import os
+import re
+import threading
+
+
+# Répertoire des couches GeoJSON servies par le serveur de tuiles
+GEOJSON_DIR = "data/vector/geojson"
+
+# Noms de couches acceptés dans les URL (ex: geography_regions)
+LAYER_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def layer_path(name, geojson_dir=GEOJSON_DIR):
+    """Chemin du fichier GeoJSON d'une couche, ou None si le nom est invalide."""
+    if not LAYER_NAME.match(name):
+        return None
+    return os.path.join(geojson_dir, f"{name}.geojson")
+
+
+def load_features(path):
+    """Charge les features d'un fichier GeoJSON (FeatureCollection ou Feature)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if data.get('type') == 'FeatureCollection':
+        return data.get('features') or []
+    if data.get('type') == 'Feature':
+        return [data]
+    # Géométrie nue
+    return [{'type': 'Feature', 'properties': {}, 'geometry': data}]
+
+
+def iter_positions(geometry):
+    """Parcourt toutes les positions [lon, lat] d'une géométrie GeoJSON."""
+    if not geometry:
+        return
+    geometry_type = geometry.get('type')
+    if geometry_type == 'GeometryCollection':
+        for child in geometry.get('geometries', []):
+            yield from iter_positions(child)
+        return
+
+    def walk(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            yield coords
+        else:
+            for item in coords:
+                yield from walk(item)
+
+    yield from walk(geometry.get('coordinates') or [])
+
+
+def geometry_bbox(geometry):
+    """Emprise (minx, miny, maxx, maxy) d'une géométrie, ou None si vide."""
+    minx = miny = float('inf')
+    maxx = maxy = float('-inf')
+    for position in iter_positions(geometry):
+        x, y = position[0], position[1]
+        if x < minx:
+            minx = x
+        if x > maxx:
+            maxx = x
+        if y < miny:
+            miny = y
+        if y > maxy:
+            maxy = y
+    if minx == float('inf'):
+        return None
+    return minx, miny, maxx, maxy
+
+
+class LayerCache:
+    """Cache des couches GeoJSON préparées, reconstruites si le fichier change.
+
+    `builder(path)` transforme un fichier GeoJSON en structure prête à l'emploi
+    (géométries projetées, index spatial...). La construction est paresseuse :
+    elle a lieu à la première requête sur la couche, une seule fois même si
+    plusieurs requêtes arrivent en même temps.
+    """
+
+    def __init__(self, builder, geojson_dir=GEOJSON_DIR):
+        self.builder = builder
+        self.geojson_dir = geojson_dir
+        self._layers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Retourne (données préparées, mtime_ns) ou None si la couche n'existe pas."""
+        path = layer_path(name, self.geojson_dir)
+        if path is None:
+            return None
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        entry = self._layers.get(name)
+        if entry is not None and entry[1] == mtime_ns:
+            return entry
+
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            entry = self._layers.get(name)
+            if entry is None or entry[1] != mtime_ns:
+                entry = (self.builder(path), mtime_ns)
+                self._layers[name] = entry
+        return entry
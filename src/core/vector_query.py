@@ -0,0 +1,119 @@
+# src/core/vector_query.py
+import json
+import math
+import re
+
+import shapely
+from shapely.geometry import shape
+
+from src.core.vector_data import geometry_bbox, load_features
+
+
+# Route des requêtes spatiales : /data/vector/query/{couche}?bbox=...&limit=...
+VECTOR_QUERY_ROUTE = re.compile(r"^/data/vector/query/(?P<layer>[A-Za-z0-9_\-]+)$")
+
+# Taille des blocs envoyés au client pendant la sérialisation (octets)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class QueryError(ValueError):
+    """Paramètres de requête invalides (réponse 400)."""
+
+
+def parse_vector_query_path(url_path):
+    """Extrait le nom de couche d'une URL de requête spatiale, ou None."""
+    match = VECTOR_QUERY_ROUTE.match(url_path)
+    return match.group('layer') if match else None
+
+
+def parse_query_params(params):
+    """Valide bbox (lon/lat) et limit ; `params` vient de urllib.parse.parse_qs."""
+    raw_bbox = params.get('bbox', [None])[0]
+    if not raw_bbox:
+        raise QueryError("Paramètre bbox requis: minx,miny,maxx,maxy")
+    try:
+        bbox = tuple(float(v) for v in raw_bbox.split(','))
+    except ValueError:
+        raise QueryError(f"bbox invalide: {raw_bbox}")
+    # minx > maxx est admis (antiméridien), pas miny > maxy ni NaN / infini
+    if (len(bbox) != 4 or not all(math.isfinite(v) for v in bbox)
+            or bbox[1] > bbox[3]
+            or not all(-180.0 <= v <= 180.0 for v in bbox[0::2])
+            or not all(-90.0 <= v <= 90.0 for v in bbox[1::2])):
+        raise QueryError(f"bbox invalide: {raw_bbox}")
+
+    limit = params.get('limit', [None])[0]
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise QueryError(f"limit invalide: {limit}")
+        if limit < 0:
+            raise QueryError(f"limit invalide: {limit}")
+    return bbox, limit
+
+
+def _shapely_geometry(geometry):
+    if not geometry:
+        return None
+    try:
+        return shape(geometry)
+    except Exception:
+        # Géométrie non reconnue : seule son emprise est testée
+        bbox = geometry_bbox(geometry)
+        return shapely.box(*bbox) if bbox is not None else None
+
+
+def build_query_index(path):
+    """Charge une couche GeoJSON et indexe la géométrie de chaque feature.
+
+    Les géométries sont converties une fois pour toutes et rangées dans un
+    shapely.STRtree (indices = rang des features dans le fichier).
+    """
+    features = load_features(path)
+    tree = shapely.STRtree(
+        [_shapely_geometry(feature.get('geometry')) for feature in features])
+    return features, tree
+
+
+def query_features(index, bbox, limit=None):
+    """Retourne les features qui intersectent bbox, dans l'ordre du fichier.
+
+    Les candidates de l'index (emprise qui intersecte bbox) sont filtrées par
+    un test d'intersection exact de leur géométrie (emprise seule pour les
+    géométries que shapely ne reconnaît pas). Une bbox dont minx > maxx
+    traverse l'antiméridien et est découpée en deux.
+    """
+    features, tree = index
+    minx, miny, maxx, maxy = bbox
+    if minx > maxx:
+        boxes = [(minx, miny, 180.0, maxy), (-180.0, miny, maxx, maxy)]
+    else:
+        boxes = [bbox]
+
+    hits = set()
+    for box in boxes:
+        hits.update(tree.query(shapely.box(*box), predicate='intersects').tolist())
+
+    ordered = sorted(hits)
+    if limit is not None:
+        ordered = ordered[:limit]
+    return [features[i] for i in ordered]
+
+
+def iter_feature_collection(features):
+    """Sérialise une FeatureCollection par blocs, au fil des features."""
+    buffer = ['{"type":"FeatureCollection","features":[']
+    size = len(buffer[0])
+
+    for i, feature in enumerate(features):
+        text = (',' if i else '') + json.dumps(
+            feature, ensure_ascii=False, separators=(',', ':'))
+        buffer.append(text)
+        size += len(text)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+
+    buffer.append(']}')
+    yield ''.join(buffer).encode('utf-8')
@@ -0,0 +1,417 @@
+# src/core/vector_tiles.py
+import json
+import math
+import re
+import struct
+
+import shapely
+
+from src.core.vector_data import geometry_bbox, load_features
+
+
+# Route des tuiles vectorielles (grille XYZ Web Mercator, y depuis le haut)
+VECTOR_TILE_ROUTE = re.compile(
+    r"^/data/vector/tiles/(?P<layer>[A-Za-z0-9_\-]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$")
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# Résolution interne d'une tuile et marge autour de l'emprise (unités tuile)
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+
+# Tolérance de simplification (Douglas-Peucker) en unités tuile : comme elle
+# est exprimée dans la grille de la tuile, le niveau de détail suit le zoom
+SIMPLIFY_TOLERANCE = 8.0
+
+MVT_MAX_ZOOM = 16
+
+# Latitude maximale représentable en Web Mercator
+MAX_LATITUDE = 85.0511287798
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+
+def parse_vector_tile_path(url_path):
+    """Extrait (couche, z, x, y) d'une URL de tuile vectorielle, ou None."""
+    match = VECTOR_TILE_ROUTE.match(url_path)
+    if not match:
+        return None
+    return (match.group('layer'), int(match.group('z')),
+            int(match.group('x')), int(match.group('y')))
+
+
+# ---------------------------------------------------------------------------
+# Préparation des couches : projection en coordonnées Mercator normalisées
+# ---------------------------------------------------------------------------
+
+def _project(position):
+    """lon/lat → coordonnées Mercator normalisées [0, 1] (y vers le bas)."""
+    lon, lat = position[0], position[1]
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def _project_geometry(geometry):
+    """Retourne (type MVT, liste de parties projetées) d'une géométrie GeoJSON.
+
+    Pour les polygones, chaque partie est la liste des anneaux d'un polygone.
+    """
+    geometry_type = geometry.get('type')
+    coords = geometry.get('coordinates') or []
+
+    if geometry_type == 'Point':
+        return GEOM_POINT, [_project(coords)]
+    if geometry_type == 'MultiPoint':
+        return GEOM_POINT, [_project(p) for p in coords]
+    if geometry_type == 'LineString':
+        return GEOM_LINESTRING, [[_project(p) for p in coords]]
+    if geometry_type == 'MultiLineString':
+        return GEOM_LINESTRING, [[_project(p) for p in line] for line in coords]
+    if geometry_type == 'Polygon':
+        return GEOM_POLYGON, [[[_project(p) for p in ring] for ring in coords]]
+    if geometry_type == 'MultiPolygon':
+        return GEOM_POLYGON, [[[_project(p) for p in ring] for ring in polygon]
+                              for polygon in coords]
+    return None, []
+
+
+def prepare_layer(path):
+    """Charge une couche GeoJSON et la projette une fois pour toutes.
+
+    Retourne (features projetées, shapely.STRtree de leurs emprises
+    projetées) : une tuile n'examine que les features qui recouvrent son
+    emprise.
+    """
+    features = []
+    for index, feature in enumerate(load_features(path)):
+        geometry = feature.get('geometry')
+        if not geometry:
+            continue
+        geometry_type, parts = _project_geometry(geometry)
+        if geometry_type is None or not parts:
+            continue
+
+        bbox = geometry_bbox(geometry)
+        minx, maxy = _project((bbox[0], bbox[1]))
+        maxx, miny = _project((bbox[2], bbox[3]))
+
+        feature_id = feature.get('id')
+        features.append({
+            'id': feature_id if isinstance(feature_id, int) and feature_id >= 0 else index,
+            'type': geometry_type,
+            'parts': parts,
+            'bbox': (minx, miny, maxx, maxy),
+            'properties': feature.get('properties') or {},
+        })
+
+    tree = shapely.STRtree([shapely.box(*feature['bbox']) for feature in features])
+    return features, tree
+
+
+# ---------------------------------------------------------------------------
+# Découpage, simplification et quantification
+# ---------------------------------------------------------------------------
+
+def _clip_ring(ring, lo, hi):
+    """Découpe un anneau (Sutherland-Hodgman) sur le carré [lo, hi]²."""
+    def clip(points, inside, intersect):
+        if not points:
+            return points
+        output = []
+        previous = points[-1]
+        for current in points:
+            if inside(current):
+                if not inside(previous):
+                    output.append(intersect(previous, current))
+                output.append(current)
+            elif inside(previous):
+                output.append(intersect(previous, current))
+            previous = current
+        return output
+
+    def at_x(value):
+        def intersect(a, b):
+            t = (value - a[0]) / (b[0] - a[0])
+            return value, a[1] + t * (b[1] - a[1])
+        return intersect
+
+    def at_y(value):
+        def intersect(a, b):
+            t = (value - a[1]) / (b[1] - a[1])
+            return a[0] + t * (b[0] - a[0]), value
+        return intersect
+
+    points = ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring
+    points = clip(points, lambda p: p[0] >= lo, at_x(lo))
+    points = clip(points, lambda p: p[0] <= hi, at_x(hi))
+    points = clip(points, lambda p: p[1] >= lo, at_y(lo))
+    points = clip(points, lambda p: p[1] <= hi, at_y(hi))
+    return points
+
+
+def _clip_line(line, lo, hi):
+    """Découpe une polyligne (Liang-Barsky) ; retourne les morceaux visibles."""
+    pieces = []
+    current = []
+    for a, b in zip(line, line[1:]):
+        t0, t1 = 0.0, 1.0
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        visible = True
+        for p, q in ((-dx, a[0] - lo), (dx, hi - a[0]), (-dy, a[1] - lo), (dy, hi - a[1])):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+            else:
+                t = q / p
+                if p < 0:
+                    t0 = max(t0, t)
+                else:
+                    t1 = min(t1, t)
+                if t0 > t1:
+                    visible = False
+                    break
+
+        if not visible:
+            if len(current) > 1:
+                pieces.append(current)
+            current = []
+            continue
+
+        start = (a[0] + t0 * dx, a[1] + t0 * dy)
+        end = (a[0] + t1 * dx, a[1] + t1 * dy)
+        if not current:
+            current = [start]
+        current.append(end)
+        if t1 < 1.0:
+            pieces.append(current)
+            current = []
+
+    if len(current) > 1:
+        pieces.append(current)
+    return pieces
+
+
+def _simplify(points, tolerance):
+    """Simplification Douglas-Peucker (itérative) d'une suite de points."""
+    if len(points) < 3:
+        return points
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    sq_tolerance = tolerance * tolerance
+
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+
+        max_distance = 0.0
+        index = first
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length:
+                t = ((px - ax) * dx + (py - ay) * dy) / length
+                t = max(0.0, min(1.0, t))
+                ex, ey = ax + t * dx - px, ay + t * dy - py
+            else:
+                ex, ey = px - ax, py - ay
+            distance = ex * ex + ey * ey
+            if distance > max_distance:
+                max_distance = distance
+                index = i
+
+        if max_distance > sq_tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _quantize(points):
+    """Arrondit à la grille entière et supprime les doublons consécutifs."""
+    output = []
+    for x, y in points:
+        point = (int(round(x)), int(round(y)))
+        if not output or output[-1] != point:
+            output.append(point)
+    return output
+
+
+def _ring_area(ring):
+    area = 0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def _to_tile(points, scale, origin_x, origin_y):
+    return [((x - origin_x) * scale, (y - origin_y) * scale) for x, y in points]
+
+
+def _tile_geometry(feature, scale, origin_x, origin_y):
+    """Projette, découpe, simplifie et quantifie une feature dans une tuile."""
+    lo, hi = -MVT_BUFFER, MVT_EXTENT + MVT_BUFFER
+    geometry_type = feature['type']
+
+    if geometry_type == GEOM_POINT:
+        points = _quantize(_to_tile(feature['parts'], scale, origin_x, origin_y))
+        return [[p] for p in points if lo <= p[0] <= hi and lo <= p[1] <= hi]
+
+    if geometry_type == GEOM_LINESTRING:
+        lines = []
+        for line in feature['parts']:
+            line = _to_tile(line, scale, origin_x, origin_y)
+            for piece in _clip_line(line, lo, hi):
+                piece = _quantize(_simplify(piece, SIMPLIFY_TOLERANCE))
+                if len(piece) > 1:
+                    lines.append(piece)
+        return lines
+
+    rings = []
+    for polygon in feature['parts']:
+        for ring_index, ring in enumerate(polygon):
+            ring = _clip_ring(_to_tile(ring, scale, origin_x, origin_y), lo, hi)
+            if len(ring) < 3:
+                continue
+            ring = _quantize(_simplify(ring + ring[:1], SIMPLIFY_TOLERANCE))
+            if len(ring) > 1 and ring[0] == ring[-1]:
+                ring.pop()
+            if len(ring) < 3:
+                continue
+            area = _ring_area(ring)
+            if area == 0:
+                continue
+            # MVT v2 : anneau extérieur d'aire positive (horaire, y vers le bas)
+            exterior = ring_index == 0
+            if (area > 0) != exterior:
+                ring.reverse()
+            rings.append(ring)
+    return rings
+
+
+# ---------------------------------------------------------------------------
+# Encodage protobuf (spécification Mapbox Vector Tile 2.1)
+# ---------------------------------------------------------------------------
+
+def _varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+
+def _bytes_field(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    return _bytes_field(number, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, 0) + _varint(value)
+        return _field(6, 0) + _varint((value << 1) ^ (value >> 63))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack('<d', value)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    return _bytes_field(1, value.encode('utf-8'))
+
+
+def _encode_commands(geometry_type, parts):
+    commands = []
+    cursor_x = cursor_y = 0
+
+    if geometry_type == GEOM_POINT:
+        commands.append(1 | (len(parts) << 3))
+        for (x, y), in parts:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        return commands
+
+    for part in parts:
+        x, y = part[0]
+        commands += [1 | (1 << 3), _zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+        cursor_x, cursor_y = x, y
+        commands.append(2 | ((len(part) - 1) << 3))
+        for x, y in part[1:]:
+            commands += [_zigzag(x - cursor_x), _zigzag(y - cursor_y)]
+            cursor_x, cursor_y = x, y
+        if geometry_type == GEOM_POLYGON:
+            commands.append(7 | (1 << 3))
+    return commands
+
+
+def encode_vector_tile(layer_name, layer, z, x, y):
+    """Encode les features d'une couche préparée (prepare_layer) dans la tuile XYZ z/x/y."""
+    n = 1 << z
+    scale = MVT_EXTENT * n
+    origin_x, origin_y = x / n, y / n
+    margin = MVT_BUFFER / scale
+    tile_box = (origin_x - margin, origin_y - margin,
+                origin_x + 1 / n + margin, origin_y + 1 / n + margin)
+
+    keys, values = {}, {}
+    encoded_features = []
+
+    # Features candidates (index spatial), dans l'ordre du fichier (ordre de rendu)
+    features, tree = layer
+    for index in sorted(tree.query(shapely.box(*tile_box)).tolist()):
+        feature = features[index]
+        parts = _tile_geometry(feature, scale, origin_x, origin_y)
+        if not parts:
+            continue
+
+        tags = []
+        for key, value in feature['properties'].items():
+            if value is None:
+                continue
+            key_index = keys.setdefault(key, len(keys))
+            value_key = (type(value).__name__, json.dumps(value, sort_keys=True, default=str))
+            value_index = values.setdefault(value_key, (len(values), value))[0]
+            tags += [key_index, value_index]
+
+        payload = _field(1, 0) + _varint(feature['id'])
+        if tags:
+            payload += _packed(2, tags)
+        payload += _field(3, 0) + _varint(feature['type'])
+        payload += _packed(4, _encode_commands(feature['type'], parts))
+        encoded_features.append(_bytes_field(2, payload))
+
+    if not encoded_features:
+        return b''
+
+    layer = _field(15, 0) + _varint(2)
+    layer += _bytes_field(1, layer_name.encode('utf-8'))
+    layer += b''.join(encoded_features)
+    for key in keys:
+        layer += _bytes_field(3, key.encode('utf-8'))
+    for _, value in sorted(values.values(), key=lambda item: item[0]):
+        layer += _bytes_field(4, _encode_value(value))
+    layer += _field(5, 0) + _varint(MVT_EXTENT)
+
+    return _bytes_field(3, layer)
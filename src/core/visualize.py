@@ -3,10 +3,26 @@ import folium
 import streamlit.components.v1 as components
 
 
-def create_wmts_map(wmts_url, layer_name, username, password):
-    """Crée une carte Folium intégrant une couche WMTS."""
+def create_wmts_map(wmts_url, layer_name, username, password,
+                    proxy_url=None, time_step=None):
+    """Crée une carte Folium intégrant une couche WMTS.
+
+    Avec `proxy_url` (ex: http://localhost:8000), les tuiles passent par le
+    proxy du serveur de tuiles (/wmts/...), qui garde un cache disque partagé :
+    le navigateur n'interroge plus Copernicus directement.
+    """
     m = folium.Map(location=[0, 0], zoom_start=2)
 
+    if proxy_url and time_step:
+        folium.raster_layers.TileLayer(
+            tiles=f"{proxy_url}/wmts/{layer_name}/{time_step}/{{z}}/{{x}}/{{y}}.png",
+            name=layer_name,
+            attr="Copernicus Marine Service",
+            overlay=True,
+        ).add_to(m)
+        folium.LayerControl().add_to(m)
+        return m
+
     folium.raster_layers.WmsTileLayer(
         url=wmts_url,
         layers=layer_name,
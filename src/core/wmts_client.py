@@ -1,16 +1,312 @@
 # src/core/wmts_client.py
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+
 from owslib.wmts import WebMapTileService
 from requests.auth import HTTPBasicAuth
-import requests
 
+from src.core.http_client import get_session
+from src.core.wmts_proxy import parse_time_step
+
+
+# Cache disque des documents GetCapabilities : {hash de l'URL}.xml + .json
+CAPABILITIES_CACHE_DIR = "data/cache/capabilities"
+
+# Durée pendant laquelle le document est réutilisé sans contacter le service
+CAPABILITIES_TTL = 6 * 3600
+
+# Délais (connexion, lecture) : le document Copernicus est volumineux
+CAPABILITIES_TIMEOUT = (10, 120)
+
+# Période ISO 8601 des intervalles de la dimension temps (début/fin/période)
+ISO_PERIOD = re.compile(r"^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?)?$")
+
+
+class WmtsCapabilities:
+    """Document GetCapabilities mis en cache, analysé au plus une fois.
+
+    La liste des couches est lue depuis le cache disque sans analyser le XML.
+    Le `WebMapTileService` d'owslib n'est construit (à partir du XML déjà
+    téléchargé, sans nouvelle requête) qu'au premier accès à l'un de ses
+    attributs : l'objet s'utilise donc comme un `WebMapTileService`.
+    `verified` indique que le service a accepté les identifiants portés par
+    l'objet (copie téléchargée ou revalidée dans ce processus).
+    """
+
+    def __init__(self, url, xml, layers, etag=None, last_modified=None,
+                 fetched_at=None, username=None, password=None, service=None,
+                 verified=False):
+        self.url = url
+        self.xml = xml
+        self.layers = layers
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at or time.time()
+        self._username = username
+        self._password = password
+        self._service = service
+        self._lock = threading.Lock()
+        self.verified = verified
+
+    @property
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                self._service = WebMapTileService(
+                    self.url, xml=self.xml,
+                    username=self._username, password=self._password)
+            return self._service
+
+    def __getattr__(self, name):
+        # Appelé uniquement pour les attributs absents : délégation à owslib
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.service, name)
+
+    def is_fresh(self, ttl=CAPABILITIES_TTL):
+        return time.time() - self.fetched_at < ttl
+
+    def accepts(self, username, password):
+        """Indique si la copie a été obtenue avec ces identifiants."""
+        return self.verified and (self._username, self._password) == (username, password)
+
+
+class CapabilitiesAuthError(Exception):
+    """Identifiants refusés par le service (401/403) : pas de repli sur le cache."""
+
+
+# Mémo en processus : (URL, utilisateur) -> WmtsCapabilities. Le verrou global
+# ne protège que les dictionnaires ; le téléchargement est sérialisé par clé.
+_capabilities = {}
+_capabilities_lock = threading.Lock()
+_url_locks = {}
+
+
+def _cache_key(url, username):
+    # Le document dépend des droits de l'utilisateur : une copie par compte
+    user = hashlib.sha256((username or '').encode('utf-8')).hexdigest()[:16]
+    return url, user
+
+
+def _url_lock(key):
+    with _capabilities_lock:
+        lock = _url_locks.get(key)
+        if lock is None:
+            lock = _url_locks[key] = threading.Lock()
+        return lock
+
+
+def _cache_paths(key, cache_dir):
+    url, user = key
+    digest = hashlib.sha256(f"{url}\n{user}".encode('utf-8')).hexdigest()[:32]
+    base = os.path.join(cache_dir, digest)
+    return base + '.xml', base + '.json'
+
+
+def _read_cached(key, cache_dir, username, password):
+    url, user = key
+    xml_path, meta_path = _cache_paths(key, cache_dir)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(xml_path, 'rb') as f:
+            xml = f.read()
+    except (OSError, ValueError):
+        return None
+    if meta.get('url') != url or meta.get('user') != user:
+        return None
+    return WmtsCapabilities(
+        url, xml, meta.get('layers', []), meta.get('etag'), meta.get('last_modified'),
+        meta.get('fetched_at'), username, password)
+
+
+def _write_cached(capabilities, key, cache_dir, write_xml=True):
+    xml_path, meta_path = _cache_paths(key, cache_dir)
+    meta = {
+        'url': capabilities.url,
+        'user': key[1],
+        'etag': capabilities.etag,
+        'last_modified': capabilities.last_modified,
+        'fetched_at': capabilities.fetched_at,
+        'layers': capabilities.layers,
+    }
+    # Le XML d'abord : un .json présent désigne toujours un XML complet
+    if write_xml:
+        _write_atomic(xml_path, capabilities.xml)
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.capabilities-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _download(url, username, password, cached):
+    """Télécharge le document, ou revalide la copie `cached` (ETag / date)."""
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        headers['If-Modified-Since'] = (
+            cached.last_modified or formatdate(cached.fetched_at, usegmt=True))
+
+    auth = HTTPBasicAuth(username, password) if username and password else None
+    response = get_session().get(
+        url, auth=auth, headers=headers, timeout=CAPABILITIES_TIMEOUT)
+
+    if response.status_code in (401, 403):
+        raise CapabilitiesAuthError(
+            f"Identifiants refusés ({response.status_code}) par {url}")
+
+    if response.status_code == 304 and cached is not None:
+        cached.fetched_at = time.time()
+        cached.etag = response.headers.get('ETag', cached.etag)
+        cached._password = password
+        cached.verified = True
+        return cached, False
 
-def get_wmts_layers(url, username, password):
-    """Retourne les couches disponibles du service WMTS."""
-    response = requests.get(url, auth=HTTPBasicAuth(username, password))
     if response.status_code != 200:
         raise Exception(
             f"Erreur de connexion ({response.status_code}) : {response.text[:300]}")
 
-    wmts = WebMapTileService(url, username=username, password=password)
-    layers = list(wmts.contents.keys())
-    return wmts, layers
+    # Analyse unique du document téléchargé
+    xml = response.content
+    service = WebMapTileService(url, xml=xml, username=username, password=password)
+    capabilities = WmtsCapabilities(
+        url, xml, list(service.contents.keys()),
+        response.headers.get('ETag'), response.headers.get('Last-Modified'),
+        time.time(), username, password, service, verified=True)
+    return capabilities, True
+
+
+def load_capabilities(url, username=None, password=None, ttl=CAPABILITIES_TTL,
+                      cache_dir=CAPABILITIES_CACHE_DIR, refresh=False):
+    """Retourne le document GetCapabilities (WmtsCapabilities) de `url`.
+
+    Ordre de recherche : mémo du processus, cache disque, puis service
+    distant ; les copies sont propres à chaque utilisateur. Passé `ttl`, ou
+    si les identifiants n'ont pas encore été acceptés par le service pour
+    cette copie, elle est revalidée (If-None-Match / If-Modified-Since)
+    plutôt que retéléchargée. Si le service est injoignable, la copie
+    périmée est utilisée ; des identifiants refusés lèvent
+    CapabilitiesAuthError. Les identifiants de l'environnement ne sont
+    utilisés que si aucun n'est fourni.
+    """
+    if username is None and password is None:
+        username = os.getenv("COPERNICUS_USERNAME")
+        password = os.getenv("COPERNICUS_PASSWORD")
+    key = _cache_key(url, username)
+
+    def usable(capabilities):
+        return (capabilities is not None and not refresh and capabilities.is_fresh(ttl)
+                and capabilities.accepts(username, password))
+
+    # Copie chaude : sans attendre un téléchargement en cours
+    with _capabilities_lock:
+        cached = _capabilities.get(key)
+    if usable(cached):
+        return cached
+
+    # Un seul téléchargement par clé ; les autres ne sont pas bloquées
+    with _url_lock(key):
+        # Peut avoir été rafraîchi par un autre appel pendant l'attente
+        with _capabilities_lock:
+            cached = _capabilities.get(key)
+        if cached is None:
+            cached = _read_cached(key, cache_dir, username, password)
+            if cached is not None:
+                with _capabilities_lock:
+                    _capabilities[key] = cached
+        if usable(cached):
+            return cached
+
+        try:
+            capabilities, changed = _download(url, username, password, cached)
+        except CapabilitiesAuthError:
+            raise
+        except Exception as e:
+            if cached is None:
+                raise
+            print(f"⚠️  GetCapabilities indisponible, copie du cache utilisée : {e}")
+            return cached
+
+        _write_cached(capabilities, key, cache_dir, write_xml=changed)
+        with _capabilities_lock:
+            _capabilities[key] = capabilities
+        return capabilities
+
+
+def get_wmts_capabilities(url, username=None, password=None):
+    """Retourne le service WMTS (interface WebMapTileService), depuis le cache."""
+    return load_capabilities(url, username, password)
+
+
+def expand_time_values(values):
+    """Développe les valeurs de la dimension temps (intervalles début/fin/période)."""
+    steps = []
+    for value in values:
+        for item in value.split(','):
+            item = item.strip()
+            parts = item.split('/')
+            if len(parts) != 3:
+                if item:
+                    steps.append(item)
+                continue
+            start, end, period = parts
+            match = ISO_PERIOD.match(period)
+            if not match or parse_time_step(start) is None or parse_time_step(end) is None:
+                continue
+            step = timedelta(**{k: int(v) for k, v in match.groupdict(default='0').items()})
+            if step <= timedelta(0):
+                continue
+            current = datetime.fromtimestamp(parse_time_step(start), timezone.utc)
+            last = datetime.fromtimestamp(parse_time_step(end), timezone.utc)
+            while current <= last:
+                steps.append(current.strftime('%Y-%m-%dT%H:%M:%SZ'))
+                current += step
+    return steps
+
+
+def layer_time_steps(capabilities, layer):
+    """Échéances (dimension « time ») d'une couche et sa valeur par défaut.
+
+    Les intervalles début/fin/période sont développés en instants. La valeur
+    par défaut annoncée est ramenée à l'échéance de même date dans la liste
+    (formats ISO 8601 différents), sinon à la dernière échéance.
+    Retourne (liste des échéances, échéance par défaut) ; ([], None) si la
+    couche n'a pas de dimension temporelle.
+    """
+    dimension = capabilities.contents[layer].dimensions.get('time')
+    if not dimension:
+        return [], None
+    values = expand_time_values(dimension.get('values', []))
+    default = dimension.get('default')
+    if default in values:
+        return values, default
+    timestamp = parse_time_step(default) if default else None
+    for value in values:
+        if timestamp is not None and parse_time_step(value) == timestamp:
+            return values, value
+    return values, values[-1] if values else None
+
+
+def get_wmts_layers(url, username, password):
+    """Retourne les couches disponibles du service WMTS."""
+    capabilities = load_capabilities(url, username, password)
+    return capabilities, list(capabilities.layers)
@@ -0,0 +1,345 @@
+# src/core/wmts_proxy.py
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+
+import requests
+
+from src.core.access_log import logger
+from src.core.http_client import get_session
+
+
+# Service WMTS amont (Copernicus Marine), surchargeable par variable d'environnement
+WMTS_UPSTREAM_URL = os.getenv(
+    "WMTS_TILE_URL", "https://wmts.marine.copernicus.eu/teroWmts")
+
+# Cache disque des tuiles amont : {couche}/{matrixset}/{temps}/{z}/{x}/{y}.png
+WMTS_CACHE_DIR = "data/cache/wmts"
+
+# Route du proxy : /wmts/{couche}/{temps}/{z}/{x}/{y}.png (y depuis le nord,
+# comme TILEROW). Les identifiants de couche Copernicus contiennent des « / ».
+WMTS_ROUTE = re.compile(
+    r"^/wmts/(?P<layer>.+)/(?P<time>[0-9A-Za-z:.+\-]+)"
+    r"/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)(?:\.png)?$")
+
+DEFAULT_TILE_MATRIX_SET = "EPSG:3857"
+TILE_MATRIX_SET_NAME = re.compile(r"^[A-Za-z0-9_\-]+(?::[A-Za-z0-9_\-]+)?$")
+
+# Bulletins de prévision : un run par jour, publié vers 12h UTC. Une tuile
+# reste valable jusqu'à la publication du run suivant.
+FORECAST_RUN_HOUR_UTC = 12
+FORECAST_RUN_INTERVAL_HOURS = 24
+
+# Les échéances passées depuis plus de ARCHIVE_AGE ne changent plus
+ARCHIVE_AGE = 2 * 24 * 3600
+ARCHIVE_TTL = 7 * 24 * 3600
+
+# Délai avant de réessayer l'amont quand une copie périmée a été servie
+STALE_RETRY = 60
+
+# Attente maximale d'un téléchargement lancé par une autre requête (secondes)
+FETCH_WAIT_TIMEOUT = 60
+
+# Nettoyage du cache disque : âge maximal des copies (au-delà de la durée de
+# vie d'une échéance archivée, elles ne servent plus de secours), taille totale
+# maximale et intervalle entre deux passes
+WMTS_CACHE_MAX_AGE = 2 * ARCHIVE_TTL
+WMTS_CACHE_MAX_MB = 2048
+WMTS_CACHE_PRUNE_INTERVAL = 3600
+
+WmtsTile = namedtuple("WmtsTile", ["data", "fetched_at", "expires_at", "stale"])
+
+
+class UpstreamError(RuntimeError):
+    """Le service WMTS amont n'a pas pu fournir la tuile."""
+
+
+def parse_wmts_path(url_path):
+    """Extrait (couche, temps, z, x, y) d'une URL du proxy, ou None."""
+    match = WMTS_ROUTE.match(url_path)
+    if not match or '..' in match.group('layer').split('/'):
+        return None
+    # Échéance illisible (ex: intervalle tronqué) : refusée plutôt que
+    # transmise à l'amont et mémorisée comme tuile absente
+    if parse_time_step(match.group('time')) is None:
+        return None
+    return (match.group('layer'), match.group('time'), int(match.group('z')),
+            int(match.group('x')), int(match.group('y')))
+
+
+def parse_time_step(value):
+    """Horodatage (secondes UTC) d'une échéance ISO 8601, ou None."""
+    try:
+        step = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if step.tzinfo is None:
+        step = step.replace(tzinfo=timezone.utc)
+    return step.timestamp()
+
+
+def latest_run(now):
+    """Heure de publication (secondes UTC) du dernier run avant `now`."""
+    interval = FORECAST_RUN_INTERVAL_HOURS * 3600
+    offset = FORECAST_RUN_HOUR_UTC * 3600
+    return (now - offset) // interval * interval + offset
+
+
+def tile_expiry(fetched_at, time_step):
+    """Date d'expiration d'une tuile téléchargée à `fetched_at`.
+
+    Les échéances récentes ou futures sont recalculées à chaque run : elles
+    expirent à la publication du run suivant. Les échéances anciennes sont
+    stables et gardées ARCHIVE_TTL.
+    """
+    step = parse_time_step(time_step)
+    if step is not None and step < fetched_at - ARCHIVE_AGE:
+        return fetched_at + ARCHIVE_TTL
+    return latest_run(fetched_at) + FORECAST_RUN_INTERVAL_HOURS * 3600
+
+
+def get_tile_params(layer, time_step, matrix_set, z, x, y):
+    """Paramètres KVP d'une requête GetTile (y depuis le nord : TILEROW)."""
+    return {
+        'SERVICE': 'WMTS', 'REQUEST': 'GetTile', 'VERSION': '1.0.0',
+        'LAYER': layer, 'STYLE': '', 'FORMAT': 'image/png',
+        'TILEMATRIXSET': matrix_set, 'TILEMATRIX': str(z),
+        'TILEROW': str(y), 'TILECOL': str(x), 'TIME': time_step,
+    }
+
+
+def wmts_cache_path(cache_dir, layer, time_step, matrix_set, z, x, y):
+    """Chemin d'une tuile dans le cache disque (partagé avec fetch_wmts_tiles)."""
+    return os.path.join(
+        cache_dir, urllib.parse.quote(layer, safe=''),
+        urllib.parse.quote(matrix_set, safe=''), time_step.replace(':', ''),
+        str(z), str(x), f"{y}.png")
+
+
+def read_cached_tile(path, time_step):
+    """Retourne la copie disque (tuile ou absence mémorisée) ou None."""
+    for candidate, has_data in ((path, True), (path[:-4] + '.miss', False)):
+        try:
+            fetched_at = os.stat(candidate).st_mtime
+            data = None
+            if has_data:
+                with open(candidate, 'rb') as f:
+                    data = f.read()
+        except OSError:
+            continue
+        return WmtsTile(data, fetched_at, tile_expiry(fetched_at, time_step), False)
+    return None
+
+
+def prune_wmts_cache(cache_dir=WMTS_CACHE_DIR, max_age=WMTS_CACHE_MAX_AGE,
+                     max_bytes=WMTS_CACHE_MAX_MB * 1024 * 1024):
+    """Supprime les copies plus anciennes que `max_age`, puis les plus
+    anciennes tant que le cache dépasse `max_bytes`.
+
+    Les répertoires vidés sont supprimés. Retourne (fichiers supprimés,
+    octets restants).
+    """
+    now = time.time()
+    files = []
+    removed = 0
+    for root, _, names in os.walk(cache_dir, topdown=False):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > max_age:
+                _remove(path)
+                removed += 1
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+        if root != cache_dir:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+    total = sum(size for _, size, _ in files)
+    if total > max_bytes:
+        files.sort()
+        for _, size, path in files:
+            if total <= max_bytes:
+                break
+            _remove(path)
+            removed += 1
+            total -= size
+            # Répertoires vidés, jusqu'à la racine du cache exclue
+            directory = os.path.dirname(path)
+            while os.path.abspath(directory) != os.path.abspath(cache_dir):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+    return removed, total
+
+
+def store_cached_tile(path, data):
+    """Écrit une tuile (ou, si `data` est None, son absence) dans le cache disque."""
+    if data is not None:
+        _write_atomic(path, data)
+        _remove(path[:-4] + '.miss')
+    else:
+        _write_atomic(path[:-4] + '.miss', b'')
+        _remove(path)
+
+
+class WmtsProxy:
+    """Proxy des tuiles WMTS Copernicus avec cache disque partagé.
+
+    Chaque tuile est téléchargée une seule fois (session partagée de
+    http_client : connexions réutilisées, nouvelles tentatives), écrite dans
+    WMTS_CACHE_DIR puis servie localement jusqu'à la publication du run de
+    prévision suivant. Les requêtes
+    simultanées pour une même tuile partagent un seul téléchargement. Si
+    l'amont est indisponible, la copie périmée est servie. Les tuiles absentes
+    en amont (404) sont mémorisées par un fichier .miss vide. Le cache est
+    borné en âge et en taille par prune().
+    """
+
+    def __init__(self, upstream_url=WMTS_UPSTREAM_URL, username=None, password=None,
+                 cache_dir=WMTS_CACHE_DIR):
+        self.upstream_url = upstream_url
+        self.cache_dir = cache_dir
+
+        username = username or os.getenv("COPERNICUS_USERNAME")
+        password = password or os.getenv("COPERNICUS_PASSWORD")
+        self.auth = (username, password) if username and password else None
+        self.session = get_session()
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        # Compteurs exposés pour le diagnostic
+        self.hits = 0
+        self.fetched = 0
+        self.stale = 0
+        self.errors = 0
+
+    def get_tile(self, layer, time_step, z, x, y, matrix_set=DEFAULT_TILE_MATRIX_SET):
+        """Retourne la tuile (WmtsTile, data None si absente en amont)."""
+        if not TILE_MATRIX_SET_NAME.match(matrix_set):
+            raise ValueError(f"TileMatrixSet invalide: {matrix_set}")
+        path = wmts_cache_path(self.cache_dir, layer, time_step, matrix_set, z, x, y)
+        cached = read_cached_tile(path, time_step)
+        if cached is not None and cached.expires_at > time.time():
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(path)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[path] = future
+
+        if not owner:
+            try:
+                return future.result(timeout=FETCH_WAIT_TIMEOUT)
+            except FutureTimeoutError:
+                # Téléchargement partagé trop long : copie périmée ou 502
+                self.errors += 1
+                if cached is None:
+                    raise UpstreamError(
+                        f"WMTS amont: pas de réponse après {FETCH_WAIT_TIMEOUT} s") from None
+                self.stale += 1
+                return cached._replace(expires_at=time.time() + STALE_RETRY, stale=True)
+
+        try:
+            tile = self._fetch(path, layer, time_step, matrix_set, z, x, y)
+        except UpstreamError as e:
+            self.errors += 1
+            if cached is None:
+                future.set_exception(e)
+                raise
+            # Amont indisponible : servir la copie périmée, réessayer bientôt
+            self.stale += 1
+            tile = cached._replace(expires_at=time.time() + STALE_RETRY, stale=True)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(path, None)
+
+        future.set_result(tile)
+        return tile
+
+    def _fetch(self, path, layer, time_step, matrix_set, z, x, y):
+        params = get_tile_params(layer, time_step, matrix_set, z, x, y)
+        try:
+            response = self.session.get(self.upstream_url, params=params, auth=self.auth)
+        except requests.RequestException as e:
+            raise UpstreamError(f"WMTS amont injoignable: {e}") from e
+
+        content_type = response.headers.get('Content-Type', '')
+        if response.status_code == 200 and content_type.startswith('image/'):
+            data = response.content
+        elif response.status_code in (400, 404):
+            # Tuile hors emprise ou échéance inconnue : absence mémorisée
+            data = None
+        else:
+            raise UpstreamError(
+                f"WMTS amont: {response.status_code} {response.text[:200]}")
+
+        try:
+            store_cached_tile(path, data)
+        except OSError as e:
+            # Disque plein, droits, répertoire supprimé par prune : la tuile
+            # téléchargée est servie quand même, sans copie disque
+            logger.warning('wmts cache write failed: %s', e, extra={'fields': {
+                'path': path}})
+        self.fetched += 1
+        fetched_at = time.time()
+        return WmtsTile(data, fetched_at, tile_expiry(fetched_at, time_step), False)
+
+    def prune(self):
+        """Nettoie le cache disque (âge et taille) ; voir prune_wmts_cache."""
+        return prune_wmts_cache(self.cache_dir)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'fetched': self.fetched,
+            'stale': self.stale,
+            'errors': self.errors,
+            'inflight': len(self._inflight),
+        }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.wmts-')
+    except FileNotFoundError:
+        # Répertoire supprimé entre-temps par prune_wmts_cache
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.wmts-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -4,12 +4,18 @@ import sys
 import math
 import argparse
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from osgeo import gdal
 from tqdm import tqdm
+import numpy as np
 import shutil
 import time
 
+from src.core.tile_image import (
+    bilinear_sample, decode_png, encode_png, is_empty, premultiply, to_rgba,
+    unpremultiply)
+from src.core.tile_pyramid import TILE_SIZE, grid_size, tile_bounds, write_tile
+
 
 # CRS par défaut
 DEFAULT_CRS_LIST = [
@@ -24,6 +30,28 @@ DEFAULT_CRS_LIST = [
 # Augmentation du nombre de workers - adapté à votre processeur
 MAX_WORKERS = 8
 
+# Moteur natif : un processus de rendu par cœur, tuiles traitées par lots
+RENDER_WORKERS = os.cpu_count() or 1
+TILES_PER_BATCH = 64
+
+# Processus lancés par gdal2tiles (versions modernes)
+GDAL2TILES_PROCESSES = 2
+
+# Cache de blocs GDAL (Mo), partagé entre les processus de rendu
+GDAL_CACHE_MB = 512
+
+# Au-delà de ce facteur de réduction, la fenêtre source est lue déjà
+# sous-échantillonnée par GDAL (moyenne, aperçus si présents)
+MAX_READ_OVERSAMPLING = 2
+
+# Surface maximale d'une métatuile (pixels) : les tampons float32 du
+# ré-échantillonnage restent de l'ordre de 64 Mo par processus
+METATILE_MAX_PIXELS = 2048 * 2048
+
+# Threads d'encodage PNG par processus de rendu (zlib libère le GIL) :
+# l'encodage d'un bloc recouvre la lecture et le rendu du bloc suivant
+ENCODE_THREADS = 2
+
 
 class ProgressTracker:
     """Classe pour gérer les barres de progression"""
@@ -48,6 +76,12 @@ class ProgressTracker:
         if task_id in self.bars:
             self.bars[task_id].update(advance)
 
+    def extend_bar(self, task_id, count):
+        """Ajoute des étapes à une barre existante (travail découvert en cours)"""
+        if task_id in self.bars:
+            self.bars[task_id].total += count
+            self.bars[task_id].refresh()
+
     def complete_bar(self, task_id):
         """Termine une barre de progression"""
         if task_id in self.bars:
@@ -129,8 +163,15 @@ def get_gdal2tiles_version(gdal2tiles_path):
     return 'legacy'
 
 
-def reproject(input_tif, output_tif, crs, verbose=False):
-    """Reprojette le fichier source si nécessaire"""
+def reproject(input_tif, output_tif, crs, verbose=False, warp="gtiff", processes=1):
+    """Reprojette le fichier source si nécessaire
+
+    Avec warp="vrt", seul un VRT de reprojection est écrit : les fenêtres
+    sources sont reprojetées à la lecture, uniquement là où des tuiles sont
+    produites (rien n'est matérialisé sur disque). Chacun des `processes`
+    processus qui lisent le VRT exécute le warp : les cœurs sont répartis
+    entre eux plutôt que d'ajouter des threads GDAL par processus.
+    """
     task_id = f"reproject_{crs}"
     progress_tracker.create_bar(task_id, f"🔄 Reprojection {crs}", 100)
 
@@ -145,7 +186,10 @@ def reproject(input_tif, output_tif, crs, verbose=False):
         # Si déjà dans la bonne projection, copier simplement
         if crs in current_proj:
             log(f"[Info] Fichier déjà en {crs}, copie simple", verbose)
-            shutil.copy2(input_tif, output_tif)
+            if warp == "vrt":
+                gdal.Translate(output_tif, os.path.abspath(input_tif), format="VRT")
+            else:
+                shutil.copy2(input_tif, output_tif)
             progress_tracker.update_bar(task_id, 100)
             progress_tracker.complete_bar(task_id)
             return
@@ -156,11 +200,20 @@ def reproject(input_tif, output_tif, crs, verbose=False):
         progress_tracker.update_bar(task_id, 10)
 
     # Reprojection nécessaire
-    ds = gdal.Warp(output_tif, input_tif, dstSRS=crs,
-                   format="GTiff", multithread=True,
-                   resampleAlg='cubic', creationOptions=['COMPRESS=DEFLATE'],
-                   # Augmentation des threads GDAL
-                   warpOptions=['NUM_THREADS=4'])
+    if warp == "vrt":
+        # Chemin source absolu : le VRT est relu depuis d'autres processus.
+        # Hors emprise source : transparent (bande alpha), comme les tuiles
+        # existantes
+        warp_threads = max((os.cpu_count() or 1) // max(processes, 1), 1)
+        ds = gdal.Warp(output_tif, os.path.abspath(input_tif), dstSRS=crs,
+                       format="VRT", multithread=warp_threads > 1, resampleAlg='cubic',
+                       dstAlpha=True, warpOptions=[f'NUM_THREADS={warp_threads}'])
+    else:
+        ds = gdal.Warp(output_tif, input_tif, dstSRS=crs,
+                       format="GTiff", multithread=True,
+                       resampleAlg='cubic', creationOptions=['COMPRESS=DEFLATE'],
+                       # Augmentation des threads GDAL
+                       warpOptions=['NUM_THREADS=4'])
     if ds is None:
         progress_tracker.complete_bar(task_id)
         raise RuntimeError(f"Erreur lors de la reprojection vers {crs}")
@@ -198,7 +251,7 @@ def generate_tiles_gdal2tiles(gdal2tiles_path, version, input_tif, output_dir, c
             '-z', f'{min_zoom}-{max_zoom}',
             '-w', 'none',  # Pas de génération de page web
             '--xyz',       # Format XYZ
-            '--processes', '2',  # Utilisation de plusieurs processus
+            '--processes', str(GDAL2TILES_PROCESSES),  # Utilisation de plusieurs processus
         ])
 
         if resume:
@@ -279,6 +332,335 @@ def generate_tiles_gdal2tiles(gdal2tiles_path, version, input_tif, output_dir, c
         raise
 
 
+# Dataset et threads d'encodage propres à chaque processus de rendu (moteur natif)
+_worker_dataset = None
+_encode_executor = None
+
+
+def _init_render_worker(input_tif, cache_mb=None):
+    global _worker_dataset, _encode_executor
+    gdal.UseExceptions()
+    if cache_mb:
+        gdal.SetCacheMax(cache_mb * 1024 * 1024)
+    _worker_dataset = gdal.Open(input_tif, gdal.GA_ReadOnly)
+    _encode_executor = ThreadPoolExecutor(max_workers=ENCODE_THREADS)
+
+
+def plan_native_tiles(input_tif, output_dir, crs, min_zoom, max_zoom, resume):
+    """Liste des tuiles (z, x, y) TMS recouvrant l'emprise du GeoTIFF."""
+    ds = gdal.Open(input_tif, gdal.GA_ReadOnly)
+    gt = ds.GetGeoTransform()
+    width, height = ds.RasterXSize, ds.RasterYSize
+    ds = None
+
+    xmin, xmax = sorted((gt[0], gt[0] + width * gt[1]))
+    ymin, ymax = sorted((gt[3], gt[3] + height * gt[5]))
+
+    tiles = []
+    for z in range(min_zoom, max_zoom + 1):
+        columns, rows = grid_size(crs, z)
+        left, bottom, right, top = tile_bounds(crs, z, 0, 0)
+        tile_width, tile_height = right - left, top - bottom
+        first_x = max(int(math.floor((xmin - left) / tile_width)), 0)
+        last_x = min(int(math.ceil((xmax - left) / tile_width)) - 1, columns - 1)
+        first_y = max(int(math.floor((ymin - bottom) / tile_height)), 0)
+        last_y = min(int(math.ceil((ymax - bottom) / tile_height)) - 1, rows - 1)
+        for x in range(first_x, last_x + 1):
+            for y in range(first_y, last_y + 1):
+                if resume and os.path.exists(
+                        os.path.join(output_dir, str(z), str(x), f"{y}.png")):
+                    continue
+                tiles.append((z, x, y))
+    return tiles
+
+
+def bilinear_resample(rgba, u, v, valid):
+    """Ré-échantillonne rgba (h, w, 4) aux positions colonnes `u` × lignes `v`.
+
+    Les positions sont en pixels du tableau (centre du premier pixel à 0) et
+    la grille cible est alignée sur les axes : le calcul est séparable.
+    L'alpha est prémultiplié pour ne pas assombrir les bords transparents.
+    """
+    height, width = rgba.shape[:2]
+    pixels = premultiply(rgba)
+
+    def sample(vi, ui):
+        return pixels[np.clip(vi, 0, height - 1)[:, np.newaxis],
+                      np.clip(ui, 0, width - 1)[np.newaxis, :]]
+
+    result = bilinear_sample(sample, u, v)
+    result[..., 3][~valid] = 0
+    return unpremultiply(result)
+
+
+def read_window_rgba(ds, xoff, yoff, xsize, ysize, buf_xsize, buf_ysize):
+    """Lit une fenêtre du dataset en RGBA, alpha issu de la bande alpha ou du masque."""
+    resample = gdal.GRIORA_Average if (buf_xsize, buf_ysize) != (xsize, ysize) \
+        else gdal.GRIORA_NearestNeighbour
+    bands = ds.ReadAsArray(xoff, yoff, xsize, ysize, buf_xsize=buf_xsize,
+                           buf_ysize=buf_ysize, resample_alg=resample)
+    bands = np.asarray(bands)
+    if bands.ndim == 2:
+        bands = bands[np.newaxis]
+    if bands.shape[0] in (2, 4):
+        return to_rgba(bands)
+    mask = ds.GetRasterBand(1).GetMaskBand().ReadAsArray(
+        xoff, yoff, xsize, ysize, buf_xsize=buf_xsize, buf_ysize=buf_ysize)
+    return to_rgba(bands, alpha=mask)
+
+
+def render_native_block(ds, crs, size, z, x, y, columns=1, rows=1):
+    """Rend un bloc de columns × rows tuiles TMS (tuile sud-ouest x, y).
+
+    Une seule lecture fenêtrée et un seul ré-échantillonnage numpy pour tout
+    le bloc ; retourne le tableau RGBA (rows*size, columns*size, 4), nord en
+    haut, ou None si le bloc ne recouvre pas le raster.
+    """
+    gt = ds.GetGeoTransform()
+    width, height = ds.RasterXSize, ds.RasterYSize
+    minx, miny, _, _ = tile_bounds(crs, z, x, y)
+    _, _, maxx, maxy = tile_bounds(crs, z, x + columns - 1, y + rows - 1)
+    block_width, block_height = columns * size, rows * size
+
+    # Centres des pixels du bloc, en pixels sources (centre du pixel 0 à 0)
+    xs = minx + (np.arange(block_width) + 0.5) * ((maxx - minx) / block_width)
+    ys = maxy - (np.arange(block_height) + 0.5) * ((maxy - miny) / block_height)
+    u = (xs - gt[0]) / gt[1] - 0.5
+    v = (ys - gt[3]) / gt[5] - 0.5
+
+    valid_u = (u >= -0.5) & (u <= width - 0.5)
+    valid_v = (v >= -0.5) & (v <= height - 0.5)
+    if not valid_u.any() or not valid_v.any():
+        return None
+
+    # Fenêtre source recouvrant le bloc (plus un pixel pour l'interpolation)
+    xoff = max(int(math.floor(u[valid_u].min())), 0)
+    xend = min(int(math.floor(u[valid_u].max())) + 2, width)
+    yoff = max(int(math.floor(v[valid_v].min())), 0)
+    yend = min(int(math.floor(v[valid_v].max())) + 2, height)
+    xsize, ysize = xend - xoff, yend - yoff
+
+    buf_xsize = min(xsize, block_width * MAX_READ_OVERSAMPLING)
+    buf_ysize = min(ysize, block_height * MAX_READ_OVERSAMPLING)
+    rgba = read_window_rgba(ds, xoff, yoff, xsize, ysize, buf_xsize, buf_ysize)
+
+    # Positions dans le tampon lu (éventuellement sous-échantillonné)
+    u = (u - xoff + 0.5) * (buf_xsize / xsize) - 0.5
+    v = (v - yoff + 0.5) * (buf_ysize / ysize) - 0.5
+    valid = valid_v[:, np.newaxis] & valid_u[np.newaxis, :]
+    return bilinear_resample(rgba, u, v, valid)
+
+
+def render_native_tile(ds, crs, size, z, x, y):
+    """Rend une tuile TMS par lecture fenêtrée et ré-échantillonnage numpy."""
+    tile = render_native_block(ds, crs, size, z, x, y)
+    return None if tile is None or is_empty(tile) else tile
+
+
+def plan_metatiles(tiles, metatile):
+    """Regroupe les tuiles en métatuiles de metatile × metatile.
+
+    Retourne des tâches (z, x, y, colonnes, lignes, tuiles à écrire) ; le bloc
+    est réduit à l'emprise des tuiles demandées (bords du raster, reprise).
+    """
+    groups = {}
+    for z, x, y in tiles:
+        groups.setdefault((z, x // metatile, y // metatile), []).append((x, y))
+
+    jobs = []
+    for (z, _, _), members in sorted(groups.items()):
+        xs = [x for x, _ in members]
+        ys = [y for _, y in members]
+        jobs.append((z, min(xs), min(ys), max(xs) - min(xs) + 1,
+                     max(ys) - min(ys) + 1, members))
+    return jobs
+
+
+def _encode_tile(output_dir, z, x, y, tile):
+    """Encode et écrit une tuile découpée dans un bloc ; False si elle est vide."""
+    if is_empty(tile):
+        return False
+    write_tile(output_dir, z, x, y, encode_png(np.ascontiguousarray(tile)))
+    return True
+
+
+def _render_batch(output_dir, crs, size, batch):
+    """Rend un lot de métatuiles dans le processus courant ; retourne (écrites, vides).
+
+    Les tuiles de chaque bloc sont encodées par les threads du processus
+    pendant que le bloc suivant est lu et ré-échantillonné.
+    """
+    pending = []
+    empty = 0
+    for z, x0, y0, columns, rows, members in batch:
+        block = render_native_block(_worker_dataset, crs, size, z, x0, y0, columns, rows)
+        if block is None:
+            empty += len(members)
+            continue
+        for x, y in members:
+            # Ligne du bloc depuis le nord (y TMS croissant vers le nord)
+            row = (y0 + rows - 1 - y) * size
+            column = (x - x0) * size
+            tile = block[row:row + size, column:column + size]
+            pending.append(_encode_executor.submit(_encode_tile, output_dir, z, x, y, tile))
+
+    written = sum(future.result() for future in pending)
+    return written, empty + len(pending) - written
+
+
+def downsample_children(children, size):
+    """Construit une tuile parente à partir de ses quatre enfants (2×2 → 1).
+
+    `children` associe (dx, dy) en numérotation TMS (dy = 1 : moitié nord) au
+    tableau RGBA de l'enfant ; les enfants absents sont transparents. Moyenne
+    par blocs de 2×2 pixels, alpha prémultiplié.
+    """
+    canvas = np.zeros((2 * size, 2 * size, 4), dtype=np.uint8)
+    for (dx, dy), rgba in children.items():
+        row, column = (1 - dy) * size, dx * size
+        canvas[row:row + size, column:column + size] = rgba
+
+    pixels = premultiply(canvas).reshape(size, 2, size, 2, 4).mean(axis=(1, 3))
+    return unpremultiply(pixels)
+
+
+def _build_parent_batch(output_dir, size, z, batch):
+    """Construit un lot de tuiles parentes du zoom z ; retourne (écrites, vides)."""
+    written = empty = 0
+    for x, y in batch:
+        children = {}
+        for dx in (0, 1):
+            for dy in (0, 1):
+                path = os.path.join(output_dir, str(z + 1), str(2 * x + dx), f"{2 * y + dy}.png")
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        rgba = decode_png(f.read())
+                    if rgba.shape != (size, size, 4):
+                        raise ValueError(f"Taille de tuile inattendue: {path} {rgba.shape}")
+                    children[(dx, dy)] = rgba
+
+        tile = downsample_children(children, size) if children else None
+        if tile is None or is_empty(tile):
+            empty += 1
+            continue
+        write_tile(output_dir, z, x, y, encode_png(tile))
+        written += 1
+    return written, empty
+
+
+def level_tiles(output_dir, z):
+    """Tuiles (x, y) présentes sur disque au zoom z."""
+    tiles = []
+    level_dir = os.path.join(output_dir, str(z))
+    if not os.path.isdir(level_dir):
+        return tiles
+    with os.scandir(level_dir) as column_entries:
+        for column_entry in column_entries:
+            if not (column_entry.is_dir() and column_entry.name.isdigit()):
+                continue
+            with os.scandir(column_entry.path) as tile_entries:
+                for tile_entry in tile_entries:
+                    name, ext = os.path.splitext(tile_entry.name)
+                    if ext == '.png' and name.isdigit():
+                        tiles.append((int(column_entry.name), int(name)))
+    return tiles
+
+
+def build_overviews(executor, output_dir, size, min_zoom, max_zoom, resume, task_id):
+    """Construit les zooms max_zoom-1 … min_zoom depuis le niveau inférieur.
+
+    Un niveau est traité en entier (par lots, dans le pool) avant le suivant,
+    puisqu'il sert d'entrée au niveau parent. Retourne (écrites, vides).
+    """
+    written = empty = 0
+    for z in range(max_zoom - 1, min_zoom - 1, -1):
+        parents = sorted({(x // 2, y // 2) for x, y in level_tiles(output_dir, z + 1)})
+        if resume:
+            parents = [(x, y) for x, y in parents if not os.path.exists(
+                os.path.join(output_dir, str(z), str(x), f"{y}.png"))]
+        progress_tracker.extend_bar(task_id, len(parents))
+
+        batches = [parents[i:i + TILES_PER_BATCH]
+                   for i in range(0, len(parents), TILES_PER_BATCH)]
+        futures = {executor.submit(_build_parent_batch, output_dir, size, z, batch): len(batch)
+                   for batch in batches}
+        for future in as_completed(futures):
+            batch_written, batch_empty = future.result()
+            written += batch_written
+            empty += batch_empty
+            progress_tracker.update_bar(task_id, futures[future])
+    return written, empty
+
+
+def generate_tiles_native(input_tif, output_dir, crs, scale, min_zoom, max_zoom,
+                          resume=False, verbose=False, workers=RENDER_WORKERS,
+                          gdal_cache_mb=GDAL_CACHE_MB, overviews=False, metatile=1):
+    """Génère les tuiles (TMS) dans un pool de processus, sans gdal2tiles.
+
+    Les tuiles sont réparties en lots de tuiles voisines ; chaque processus
+    garde le GeoTIFF ouvert, lit uniquement la fenêtre de chaque tuile et la
+    ré-échantillonne avec numpy. La progression suit les tuiles terminées.
+    Le cache de blocs GDAL (`gdal_cache_mb`) est réparti entre les processus.
+
+    Avec `overviews`, seul max_zoom est rendu depuis le raster ; les zooms
+    inférieurs sont construits niveau par niveau en réduisant les tuiles
+    enfants (2×2 → 1), sans nouvelle lecture du raster.
+
+    Avec `metatile` > 1, les tuiles sont rendues par blocs de N × N (une
+    lecture et un ré-échantillonnage par bloc, sans raccord entre tuiles),
+    puis découpées et encodées en parallèle par les threads du processus qui
+    a rendu le bloc. N est réduit pour que le bloc ne dépasse pas
+    METATILE_MAX_PIXELS (ex: 8 à @1x, 4 à @2x, 2 à @3x).
+    """
+    if crs not in ("EPSG:3857", "EPSG:4326"):
+        raise ValueError(f"CRS non supporté: {crs}")
+
+    size = TILE_SIZE * scale
+    max_metatile = max(math.isqrt(METATILE_MAX_PIXELS) // size, 1)
+    if metatile > max_metatile:
+        print(f"⚠️  Métatuiles {metatile}×{metatile} trop grandes à @{scale}x : "
+              f"réduites à {max_metatile}×{max_metatile}")
+        metatile = max_metatile
+
+    render_min_zoom = max_zoom if overviews else min_zoom
+    tiles = plan_native_tiles(input_tif, output_dir, crs, render_min_zoom, max_zoom, resume)
+    jobs = plan_metatiles(tiles, metatile)
+    jobs_per_batch = max(TILES_PER_BATCH // (metatile * metatile), 1)
+    batches = [jobs[i:i + jobs_per_batch] for i in range(0, len(jobs), jobs_per_batch)]
+
+    task_id = f"tiles_{crs}@{scale}"
+    progress_tracker.create_bar(task_id, f"🗺️  Génération {crs}@{scale}x", len(tiles))
+    log(f"[Tiles] Moteur natif - CRS={crs}, zoom {min_zoom}-{max_zoom}, "
+        f"{len(tiles)} tuiles, {len(jobs)} métatuiles {metatile}×{metatile}, "
+        f"{len(batches)} lots, {workers} processus", verbose)
+
+    written = empty = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(input_tif, max(gdal_cache_mb // workers, 16))) as executor:
+            futures = {executor.submit(_render_batch, output_dir, crs, size, batch):
+                       sum(len(job[5]) for job in batch)
+                       for batch in batches}
+            for future in as_completed(futures):
+                batch_written, batch_empty = future.result()
+                written += batch_written
+                empty += batch_empty
+                progress_tracker.update_bar(task_id, futures[future])
+
+            if overviews:
+                overview_written, overview_empty = build_overviews(
+                    executor, output_dir, size, min_zoom, max_zoom, resume, task_id)
+                log(f"[Overviews] {overview_written} tuiles construites depuis le zoom "
+                    f"{max_zoom}", verbose)
+                written += overview_written
+                empty += overview_empty
+    finally:
+        progress_tracker.complete_bar(task_id)
+
+    log(f"[Tiles OK] {written} tuiles écrites, {empty} vides ignorées → {output_dir}", verbose)
+    return count_tiles_in_directory(output_dir)
+
+
 def count_tiles_in_directory(directory):
     """Compte le nombre de fichiers PNG dans un répertoire"""
     count = 0
@@ -299,8 +681,27 @@ def get_total_size(path):
     return total_size
 
 
-def process_crs(gdal2tiles_path, version, input_file, output_dir, crs, scale, min_zoom, max_zoom, resume, verbose):
-    """Traite un CRS spécifique"""
+def reprojected_path(output_dir, crs, warp="gtiff"):
+    """GeoTIFF (ou VRT) reprojeté partagé par toutes les échelles d'un CRS."""
+    extension = "vrt" if warp == "vrt" else "tif"
+    return os.path.join(output_dir, f"{crs.replace(':', '')}.reprojected.{extension}")
+
+
+def plan_pipeline(crs_list):
+    """Graphe des tâches : une reprojection par CRS, dont dépendent ses échelles.
+
+    Retourne {crs: [échelles]} dans l'ordre de la liste demandée.
+    """
+    graph = {}
+    for crs, scale in crs_list:
+        scales = graph.setdefault(crs, [])
+        if scale not in scales:
+            scales.append(scale)
+    return graph
+
+
+def process_crs(engine, gdal2tiles_path, version, reprojected_tif, output_dir, crs, scale, min_zoom, max_zoom, resume, verbose, workers=RENDER_WORKERS, gdal_cache_mb=GDAL_CACHE_MB, overviews=False, metatile=1):
+    """Génère les tuiles d'une échelle à partir du GeoTIFF reprojeté du CRS"""
     scale_suffix = f"@{scale}x" if scale > 1 else ""
     crs_name = crs.replace(":", "")
     crs_dir = os.path.join(output_dir, f"{crs_name}{scale_suffix}")
@@ -311,23 +712,78 @@ def process_crs(gdal2tiles_path, version, input_file, output_dir, crs, scale, mi
     else:
         os.makedirs(crs_dir, exist_ok=True)
 
-    # Reprojection si nécessaire
-    reprojected_tif = os.path.join(crs_dir, "reprojected.tif")
-    reproject(input_file, reprojected_tif, crs, verbose)
-
-    # Génération des tuiles avec gdal2tiles
-    tile_count = generate_tiles_gdal2tiles(
-        gdal2tiles_path, version, reprojected_tif, crs_dir, crs, min_zoom, max_zoom, resume, verbose)
+    # Génération des tuiles (moteur natif ou gdal2tiles)
+    if engine == "native":
+        tile_count = generate_tiles_native(
+            reprojected_tif, crs_dir, crs, scale, min_zoom, max_zoom, resume, verbose, workers,
+            gdal_cache_mb, overviews, metatile)
+    else:
+        tile_count = generate_tiles_gdal2tiles(
+            gdal2tiles_path, version, reprojected_tif, crs_dir, crs, min_zoom, max_zoom, resume, verbose)
 
     total_size = get_total_size(crs_dir)
 
-    log(f"[Process CRS] {crs} terminé → {crs_dir} ({tile_count} tuiles, {total_size / (1024*1024):.1f} Mo)", verbose)
-    return crs, tile_count, total_size
+    log(f"[Process CRS] {crs}{scale_suffix} terminé → {crs_dir} ({tile_count} tuiles, {total_size / (1024*1024):.1f} Mo)", verbose)
+    return f"{crs}{scale_suffix}", tile_count, total_size
+
+
+def run_pipeline(args, crs_list, gdal2tiles_path, version, global_progress):
+    """Exécute le graphe : reprojections en parallèle, puis tuiles de chaque échelle.
+
+    Les tâches de tuiles d'un CRS sont lancées dès que sa reprojection est
+    terminée, sans attendre celle des autres CRS.
+    """
+    graph = plan_pipeline(crs_list)
+    results = []
+
+    # Le moteur natif occupe déjà tous les cœurs : une échelle à la fois
+    tile_workers = 1 if args.engine == "native" else MAX_WORKERS
+    with ThreadPoolExecutor(max_workers=len(graph)) as warp_pool, \
+            ThreadPoolExecutor(max_workers=tile_workers) as tile_pool:
+        warps = {}
+        for crs in graph:
+            reprojected_tif = reprojected_path(args.output_dir, crs, args.warp)
+            if args.resume and os.path.exists(reprojected_tif):
+                log(f"[Resume] Reprojection existante réutilisée: {reprojected_tif}", args.verbose)
+                future = warp_pool.submit(lambda: None)
+            else:
+                processes = args.workers if args.engine == "native" else GDAL2TILES_PROCESSES
+                future = warp_pool.submit(
+                    reproject, args.input_file, reprojected_tif, crs, args.verbose, args.warp,
+                    processes)
+            warps[future] = crs
+
+        tile_futures = []
+        for future in as_completed(warps):
+            crs = warps[future]
+            global_progress.update(1)
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[Erreur] Reprojection {crs} → {e}")
+                global_progress.update(len(graph[crs]))
+                continue
+
+            for scale in graph[crs]:
+                tile_futures.append(tile_pool.submit(
+                    process_crs, args.engine, gdal2tiles_path, version,
+                    reprojected_path(args.output_dir, crs, args.warp), args.output_dir, crs, scale,
+                    args.min_zoom, args.max_zoom, args.resume, args.verbose, args.workers,
+                    args.gdal_cache_mb, args.overviews, args.metatile))
+
+        for future in as_completed(tile_futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"[Erreur] {e}")
+            global_progress.update(1)
+
+    return results
 
 
 def parse_args():
     parser = argparse.ArgumentParser(
-        description="Création de tuiles XYZ avec gdal2tiles")
+        description="Création de tuiles (moteur natif ou gdal2tiles)")
     parser.add_argument("input_file", help="Fichier GeoTIFF d'entrée")
     parser.add_argument("output_dir", help="Répertoire de sortie")
     parser.add_argument("--min-zoom", type=int, default=0, help="Zoom minimum")
@@ -336,6 +792,18 @@ def parse_args():
                         help="Liste CRS@scale ex: EPSG:3857@1 EPSG:4326@2")
     parser.add_argument("--resume", action="store_true",
                         help="Reprendre les tuiles existantes")
+    parser.add_argument("--engine", choices=["native", "gdal2tiles"], default="native",
+                        help="Moteur de rendu : pool de processus intégré ou gdal2tiles.py")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS,
+                        help="Processus de rendu du moteur natif")
+    parser.add_argument("--warp", choices=["gtiff", "vrt"], default="gtiff",
+                        help="Reprojection : GeoTIFF complet ou VRT lu à la demande")
+    parser.add_argument("--gdal-cache-mb", type=int, default=GDAL_CACHE_MB,
+                        help="Cache de blocs GDAL (Mo), toutes tâches confondues")
+    parser.add_argument("--overviews", action="store_true",
+                        help="Moteur natif : zooms inférieurs construits depuis max-zoom")
+    parser.add_argument("--metatile", type=int, default=1,
+                        help="Moteur natif : rendu par blocs de N×N tuiles (ex: 8)")
     parser.add_argument("--verbose", action="store_true",
                         help="Afficher les logs détaillés")
     return parser.parse_args()
@@ -382,12 +850,12 @@ def get_free_space(path):
         return 100 * 1024 * 1024 * 1024  # 100 GB
 
 
-def remove_reprojected_files():
-    """Supprime les fichiers reprojetés temporaires"""
+def remove_reprojected_files(output_dir="data/map/tiles"):
+    """Supprime les fichiers reprojetés temporaires (un par CRS)"""
     paths = []
-    for root, dirs, files in os.walk("data/map/tiles"):
+    for root, dirs, files in os.walk(output_dir):
         for file in files:
-            if file == "reprojected.tif":
+            if file.endswith(("reprojected.tif", "reprojected.vrt")):
                 paths.append(os.path.join(root, file))
 
     removed_count = 0
@@ -406,17 +874,32 @@ def remove_reprojected_files():
 
 def main():
     """Fonction principale avec barre de progression globale"""
-    # Vérifier que gdal2tiles est disponible
-    gdal2tiles_path = check_gdal2tiles()
-    if not gdal2tiles_path:
-        print("❌ gdal2tiles non trouvé. Arrêt.")
-        sys.exit(1)
+    args = parse_args()
 
-    # Déterminer la version
-    version = get_gdal2tiles_version(gdal2tiles_path)
-    print(f"🔧 Version détectée: {version}")
+    # Cache de blocs borné, hérité par gdal2tiles (variable d'environnement)
+    gdal.SetCacheMax(args.gdal_cache_mb * 1024 * 1024)
+    os.environ["GDAL_CACHEMAX"] = str(args.gdal_cache_mb)
 
-    args = parse_args()
+    gdal2tiles_path = version = None
+    if args.overviews and args.engine != "native":
+        print("⚠️  --overviews nécessite le moteur natif : option ignorée")
+        args.overviews = False
+    if args.metatile < 1:
+        print("❌ --metatile doit être supérieur ou égal à 1")
+        sys.exit(1)
+    if args.metatile > 1 and args.engine != "native":
+        print("⚠️  --metatile nécessite le moteur natif : option ignorée")
+        args.metatile = 1
+    if args.engine == "gdal2tiles":
+        # Vérifier que gdal2tiles est disponible
+        gdal2tiles_path = check_gdal2tiles()
+        if not gdal2tiles_path:
+            print("❌ gdal2tiles non trouvé. Arrêt.")
+            sys.exit(1)
+
+        # Déterminer la version
+        version = get_gdal2tiles_version(gdal2tiles_path)
+        print(f"🔧 Version détectée: {version}")
     crs_list = build_crs_list(args.crs)
 
     # S'assurer que le répertoire de sortie existe
@@ -438,8 +921,13 @@ def main():
     print(f"💾 Taille estimée : {total_size_gb:.2f} Go")
     print(f"📂 Espace disque disponible : {free_space_gb:.2f} Go")
     print(f"📁 Répertoire de sortie : {os.path.abspath(args.output_dir)}")
-    print(f"🔧 Méthode : gdal2tiles.py ({version})")
-    print(f"🚀 Workers parallèles : {MAX_WORKERS}")
+    if args.engine == "native":
+        print(f"🔧 Méthode : moteur natif ({args.workers} processus de rendu)")
+    else:
+        print(f"🔧 Méthode : gdal2tiles.py ({version})")
+        print(f"🚀 Workers parallèles : {MAX_WORKERS}")
+    print(f"🧭 Reprojection : {'VRT à la demande' if args.warp == 'vrt' else 'GeoTIFF complet'}"
+          f", cache GDAL {args.gdal_cache_mb} Mo")
 
     if free_space_gb < total_size_gb * 1.1:
         print("⚠️  Espace disque potentiellement insuffisant !")
@@ -450,28 +938,14 @@ def main():
         print("❌ Génération annulée par l'utilisateur.")
         sys.exit(0)
 
-    print("\n✅ Lancement de la génération des tuiles avec gdal2tiles...\n")
+    print(f"\n✅ Lancement de la génération des tuiles ({args.engine})...\n")
 
     # Barre de progression globale
-    global_progress = tqdm(total=len(crs_list) * 2,
+    graph = plan_pipeline(crs_list)
+    global_progress = tqdm(total=len(graph) + sum(len(scales) for scales in graph.values()),
                            desc="🌍 Progression globale", unit="task")
 
-    results = []
-
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [
-            executor.submit(process_crs, gdal2tiles_path, version, args.input_file, args.output_dir, crs, scale,
-                            args.min_zoom, args.max_zoom, args.resume, args.verbose)
-            for crs, scale in crs_list
-        ]
-
-        for future in as_completed(futures):
-            try:
-                results.append(future.result())
-                global_progress.update(1)
-            except Exception as e:
-                print(f"[Erreur] {e}")
-                global_progress.update(1)
+    results = run_pipeline(args, crs_list, gdal2tiles_path, version, global_progress)
 
     global_progress.close()
 
@@ -493,8 +967,8 @@ def main():
     print("="*50)
 
     # Suppression des fichiers temporaires
-    print("\n🗑️ Suppression des fichiers reprojected.tif...")
-    remove_reprojected_files()
+    print("\n🗑️ Suppression des fichiers reprojetés...")
+    remove_reprojected_files(args.output_dir)
     print("✅ Suppression terminée.")
 
     print("\n🎉 Génération terminée avec succès!")
@@ -0,0 +1,323 @@
+# src/utils/fetch_wmts_tiles.py
+import os
+import re
+import sys
+import math
+import time
+import asyncio
+import argparse
+
+import httpx
+from tqdm import tqdm
+
+from src.core.http_client import (
+    DEFAULT_TIMEOUT, RETRY_TOTAL, UpstreamMetrics, is_retryable, retry_delay)
+from src.core.tile_pyramid import MERCATOR_EXTENT
+from src.core.wmts_client import expand_time_values, load_capabilities
+from src.core.wmts_proxy import (
+    DEFAULT_TILE_MATRIX_SET, WMTS_CACHE_DIR, WMTS_UPSTREAM_URL, get_tile_params,
+    parse_time_step, store_cached_tile, tile_expiry, wmts_cache_path)
+
+
+# Requêtes simultanées par défaut vers le service amont
+DEFAULT_CONCURRENCY = 16
+
+# Taille d'un pixel de référence WMTS (mètres) et longueur d'un degré à l'équateur
+STANDARD_PIXEL_SIZE = 0.00028
+METERS_PER_DEGREE = 2 * math.pi * 6378137 / 360
+
+
+def select_time_steps(layer, times=None, time_range=None):
+    """Échéances à télécharger : liste explicite, intervalle ou échéance par défaut."""
+    if times:
+        return times
+    dimension = layer.dimensions.get('time') or {}
+    if time_range:
+        start, end = (parse_time_step(value) for value in time_range)
+        return [step for step in expand_time_values(dimension.get('values', []))
+                if start <= parse_time_step(step) <= end]
+    default = dimension.get('default')
+    return [default] if default else []
+
+
+def to_crs(crs, lon, lat):
+    """Coordonnées (x, y) d'un point lon/lat dans le CRS de la grille."""
+    if crs == 'EPSG:3857':
+        lat = max(min(lat, 85.0511287798), -85.0511287798)
+        x = lon * MERCATOR_EXTENT / 180.0
+        y = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * MERCATOR_EXTENT / math.pi
+        return x, y
+    if crs == 'EPSG:4326':
+        return lon, lat
+    raise ValueError(f"CRS non supporté: {crs}")
+
+
+def matrix_set_crs(tile_matrix_set):
+    """CRS (ex: EPSG:3857) d'un TileMatrixSet, quelle que soit la forme de l'URN."""
+    code = re.search(r"EPSG:+(\d+)$", tile_matrix_set.crs or tile_matrix_set.identifier)
+    if not code:
+        raise ValueError(f"CRS inconnu pour {tile_matrix_set.identifier}")
+    return f"EPSG:{code.group(1)}"
+
+
+def tile_ranges(tile_matrix_set, limits, bbox, min_zoom, max_zoom):
+    """Tuiles (z, identifiant de matrice, colonnes, lignes) couvrant la bbox lon/lat.
+
+    Les lignes sont comptées depuis le nord (TILEROW), comme dans le proxy.
+    """
+    crs = matrix_set_crs(tile_matrix_set)
+    minx, miny = to_crs(crs, bbox[0], bbox[1])
+    maxx, maxy = to_crs(crs, bbox[2], bbox[3])
+    meters_per_unit = METERS_PER_DEGREE if crs == 'EPSG:4326' else 1.0
+
+    ranges = []
+    for z, (identifier, matrix) in enumerate(tile_matrix_set.tilematrix.items()):
+        if z < min_zoom or z > max_zoom:
+            continue
+        left, top = matrix.topleftcorner
+        if crs == 'EPSG:4326' and abs(left) <= 90 and abs(top) == 180:
+            # Ordre des axes lat/lon des URN EPSG:4326
+            left, top = top, left
+        span = matrix.scaledenominator * STANDARD_PIXEL_SIZE / meters_per_unit
+        tile_width = matrix.tilewidth * span
+        tile_height = matrix.tileheight * span
+
+        first_col = max(int((minx - left) // tile_width), 0)
+        last_col = min(int(math.ceil((maxx - left) / tile_width)) - 1, matrix.matrixwidth - 1)
+        first_row = max(int((top - maxy) // tile_height), 0)
+        last_row = min(int(math.ceil((top - miny) / tile_height)) - 1, matrix.matrixheight - 1)
+
+        limit = limits.get(identifier)
+        if limit is not None:
+            first_col, last_col = max(first_col, limit.mintilecol), min(last_col, limit.maxtilecol)
+            first_row, last_row = max(first_row, limit.mintilerow), min(last_row, limit.maxtilerow)
+        if first_col <= last_col and first_row <= last_row:
+            ranges.append((z, identifier, range(first_col, last_col + 1),
+                           range(first_row, last_row + 1)))
+    return ranges
+
+
+def is_cached(path, time_step, now):
+    """Vérifie qu'une tuile (ou son absence) est déjà en cache et encore valable."""
+    for candidate in (path, path[:-4] + '.miss'):
+        try:
+            fetched_at = os.stat(candidate).st_mtime
+        except OSError:
+            continue
+        return tile_expiry(fetched_at, time_step) > now
+    return False
+
+
+class FetchStats:
+    """Compteurs d'un téléchargement en masse."""
+
+    def __init__(self):
+        self.fetched = 0
+        self.missing = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.errors = []
+
+
+async def fetch_tile(client, url, params, path, stats, metrics):
+    """Télécharge une tuile avec nouvelles tentatives, puis l'écrit dans le cache.
+
+    Les statuts retentés et les attentes sont ceux de la session partagée
+    (http_client.retry_policy). Chaque tuile est enregistrée dans `metrics` (UpstreamMetrics) comme une
+    requête de la session partagée : statut final, tentatives et durée totale.
+    """
+    host = httpx.URL(url).netloc.decode('ascii')
+    start = time.perf_counter()
+    status = 'error'
+    for attempt in range(RETRY_TOTAL + 1):
+        try:
+            response = await client.get(url, params=params)
+        except httpx.TransportError as e:
+            error, retry_after, status = f"{type(e).__name__}: {e}", None, 'error'
+        else:
+            status = response.status_code
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code == 200 and content_type.startswith('image/'):
+                metrics.record(host, status, attempt, time.perf_counter() - start)
+                await asyncio.to_thread(store_cached_tile, path, response.content)
+                stats.fetched += 1
+                stats.bytes += len(response.content)
+                return
+            if response.status_code in (400, 404):
+                metrics.record(host, status, attempt, time.perf_counter() - start)
+                await asyncio.to_thread(store_cached_tile, path, None)
+                stats.missing += 1
+                return
+            error = f"{response.status_code} {response.text[:200]}"
+            retry_after = response.headers.get('Retry-After')
+            if not is_retryable(response.status_code, retry_after is not None):
+                break
+
+        if attempt < RETRY_TOTAL:
+            stats.retries += 1
+            await asyncio.sleep(retry_delay(
+                attempt + 1, None if status == 'error' else status, retry_after))
+
+    metrics.record(host, status, attempt, time.perf_counter() - start)
+    stats.failed += 1
+    if len(stats.errors) < 10:
+        stats.errors.append(f"{params['TILEMATRIX']}/{params['TILECOL']}/{params['TILEROW']} "
+                            f"{params['TIME']} → {error}")
+
+
+async def fetch_all(jobs, url, auth, concurrency, stats, progress, metrics):
+    """Télécharge les tuiles `jobs` avec au plus `concurrency` requêtes en vol.
+
+    Un nombre fixe de tâches consomme une file bornée : la mémoire reste
+    constante quel que soit le nombre de tuiles, et chaque tuile est écrite
+    dès sa réception (une interruption ne perd que les requêtes en cours).
+    """
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    timeout = httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0])
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    async with httpx.AsyncClient(auth=auth, limits=limits, timeout=timeout) as client:
+        async def worker():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                params, path = job
+                await fetch_tile(client, url, params, path, stats, metrics)
+                progress.update(1)
+                progress.set_postfix(mo=f"{stats.bytes / 1e6:.1f}", échecs=stats.failed)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for job in jobs:
+                await queue.put(job)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+
+def plan_jobs(layer_name, time_steps, matrix_set, ranges, cache_dir, force, stats):
+    """Génère (paramètres GetTile, chemin du cache) des tuiles à télécharger."""
+    now = time.time()
+    for time_step in time_steps:
+        for z, identifier, columns, rows in ranges:
+            for x in columns:
+                for y in rows:
+                    path = wmts_cache_path(cache_dir, layer_name, time_step, matrix_set, z, x, y)
+                    if not force and is_cached(path, time_step, now):
+                        stats.skipped += 1
+                        continue
+                    params = get_tile_params(layer_name, time_step, matrix_set, z, x, y)
+                    params['TILEMATRIX'] = identifier
+                    yield params, path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Télécharge en masse des tuiles WMTS Copernicus dans le cache du proxy")
+    parser.add_argument("layer", help="Identifiant de la couche (PRODUIT/DATASET/VARIABLE)")
+    parser.add_argument("--bbox", nargs=4, type=float, default=[-180, -85, 180, 85],
+                        metavar=("MINLON", "MINLAT", "MAXLON", "MAXLAT"),
+                        help="Emprise géographique (lon/lat)")
+    parser.add_argument("--min-zoom", type=int, default=0, help="Zoom minimal")
+    parser.add_argument("--max-zoom", type=int, default=3, help="Zoom maximal")
+    parser.add_argument("--times", nargs="*", help="Échéances ISO 8601 explicites")
+    parser.add_argument("--time-range", nargs=2, metavar=("DEBUT", "FIN"),
+                        help="Échéances annoncées par la couche entre DEBUT et FIN")
+    parser.add_argument("--matrix-set", default=DEFAULT_TILE_MATRIX_SET,
+                        help="TileMatrixSet demandé")
+    parser.add_argument("--url", default=WMTS_UPSTREAM_URL, help="Point d'accès WMTS (GetTile)")
+    parser.add_argument("--capabilities-url",
+                        help="URL GetCapabilities (par défaut déduite de la couche)")
+    parser.add_argument("--cache-dir", default=WMTS_CACHE_DIR,
+                        help="Cache disque (celui du proxy /wmts/ par défaut)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Requêtes simultanées maximales")
+    parser.add_argument("--force", action="store_true",
+                        help="Retélécharger les tuiles déjà présentes et valables")
+    parser.add_argument("--username", default=os.getenv("COPERNICUS_USERNAME"))
+    parser.add_argument("--password", default=os.getenv("COPERNICUS_PASSWORD"))
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # GetCapabilities du dataset (document réduit) plutôt que du service entier
+    capabilities_url = args.capabilities_url
+    if not capabilities_url:
+        dataset = args.layer.rsplit('/', 1)[0] if args.layer.count('/') >= 2 else ''
+        base = f"{args.url.rstrip('/')}/{dataset}" if dataset else args.url
+        capabilities_url = f"{base}?request=GetCapabilities&service=WMTS"
+
+    try:
+        capabilities = load_capabilities(capabilities_url, args.username, args.password)
+    except Exception as e:
+        print(f"❌ GetCapabilities impossible : {e}")
+        sys.exit(1)
+
+    layer = capabilities.contents.get(args.layer)
+    if layer is None:
+        print(f"❌ Couche inconnue : {args.layer}")
+        sys.exit(1)
+    link = layer.tilematrixsetlinks.get(args.matrix_set)
+    tile_matrix_set = capabilities.tilematrixsets.get(args.matrix_set)
+    if link is None or tile_matrix_set is None:
+        print(f"❌ TileMatrixSet {args.matrix_set} non proposé "
+              f"(disponibles : {', '.join(layer.tilematrixsetlinks)})")
+        sys.exit(1)
+
+    time_steps = select_time_steps(layer, args.times, args.time_range)
+    if not time_steps:
+        print("❌ Aucune échéance sélectionnée")
+        sys.exit(1)
+
+    ranges = tile_ranges(tile_matrix_set, link.tilematrixlimits, args.bbox,
+                         args.min_zoom, args.max_zoom)
+    total = len(time_steps) * sum(len(c) * len(r) for _, _, c, r in ranges)
+    print(f"🛰️  {args.layer} : {len(time_steps)} échéance(s), zooms "
+          f"{args.min_zoom}-{args.max_zoom}, {total} tuiles")
+
+    stats = FetchStats()
+    metrics = UpstreamMetrics()
+    auth = httpx.BasicAuth(args.username, args.password) if args.username and args.password else None
+    jobs = plan_jobs(args.layer, time_steps, args.matrix_set, ranges,
+                     args.cache_dir, args.force, stats)
+
+    start = time.perf_counter()
+    with tqdm(total=total, desc="Tuiles", unit="tuile") as progress:
+        try:
+            asyncio.run(fetch_all(jobs, args.url, auth, args.concurrency, stats, progress,
+                                  metrics))
+        except KeyboardInterrupt:
+            print("\n🛑 Interrompu : relancez la même commande pour reprendre")
+        progress.update(stats.skipped)
+    elapsed = time.perf_counter() - start
+
+    requested = stats.fetched + stats.missing + stats.failed
+    print(f"\n✅ {stats.fetched} tuiles téléchargées ({stats.bytes / 1e6:.1f} Mo), "
+          f"{stats.missing} absentes, {stats.skipped} déjà en cache, {stats.failed} échecs, "
+          f"{stats.retries} nouvelles tentatives")
+    if elapsed > 0 and requested:
+        print(f"⚡ {requested / elapsed:.1f} tuiles/s, {stats.bytes / 1e6 / elapsed:.2f} Mo/s "
+              f"en {elapsed:.1f} s ({args.concurrency} requêtes simultanées)")
+    for host, m in metrics.snapshot().items():
+        statuses = ', '.join(f"{status}: {count}" for status, count in
+                             sorted(m['statuses'].items(), key=lambda item: str(item[0])))
+        print(f"🌐 {host} : {m['count']} requêtes ({statuses}), latence moyenne "
+              f"{m['duration_sum'] / m['count'] * 1000:.0f} ms")
+    for error in stats.errors:
+        print(f"   ⚠️  {error}")
+    print(f"📁 Cache : {args.cache_dir}")
+    if stats.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
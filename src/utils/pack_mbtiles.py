@@ -0,0 +1,208 @@
+# src/utils/pack_mbtiles.py
+import os
+import sys
+import argparse
+import hashlib
+import sqlite3
+from tqdm import tqdm
+
+from src.core.mbtiles import MBTILES_DIR
+from src.core.tile_pyramid import TILES_DIR, iter_pyramid_tiles
+
+
+# Nombre de tuiles insérées par transaction
+BATCH_SIZE = 1000
+
+
+def create_mbtiles_schema(conn):
+    """Crée le schéma MBTiles 1.3 (tables metadata et tiles)."""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+        CREATE UNIQUE INDEX IF NOT EXISTS metadata_name ON metadata (name);
+        CREATE TABLE IF NOT EXISTS tiles (
+            zoom_level INTEGER,
+            tile_column INTEGER,
+            tile_row INTEGER,
+            tile_data BLOB
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS tile_index
+            ON tiles (zoom_level, tile_column, tile_row);
+    """)
+
+
+def create_dedup_schema(conn):
+    """Crée le schéma MBTiles dédupliqué (tables map et images, vue tiles).
+
+    Chaque contenu distinct est stocké une seule fois dans `images`, indexé
+    par son empreinte ; `map` associe chaque z/x/y à une empreinte. La vue
+    `tiles` garde la compatibilité avec les lecteurs MBTiles standards.
+    """
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+        CREATE UNIQUE INDEX IF NOT EXISTS metadata_name ON metadata (name);
+        CREATE TABLE IF NOT EXISTS map (
+            zoom_level INTEGER,
+            tile_column INTEGER,
+            tile_row INTEGER,
+            tile_id TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS map_index
+            ON map (zoom_level, tile_column, tile_row);
+        CREATE TABLE IF NOT EXISTS images (tile_data BLOB, tile_id TEXT);
+        CREATE UNIQUE INDEX IF NOT EXISTS images_id ON images (tile_id);
+        CREATE VIEW IF NOT EXISTS tiles AS
+            SELECT map.zoom_level AS zoom_level,
+                   map.tile_column AS tile_column,
+                   map.tile_row AS tile_row,
+                   images.tile_data AS tile_data
+            FROM map JOIN images ON images.tile_id = map.tile_id;
+    """)
+
+
+def tile_hash(data):
+    """Empreinte de contenu d'une tuile (identifiant dans la table images)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def pack_directory(tiles_dir, output_path, name=None, verbose=False, dedup=False):
+    """Regroupe une pyramide z/x/y.png dans une archive MBTiles.
+
+    Avec `dedup`, les tuiles identiques (océan uniforme, tuiles transparentes
+    hors données) ne sont stockées qu'une fois (schéma map/images).
+    """
+    if not os.path.isdir(tiles_dir):
+        raise FileNotFoundError(f"Pyramide introuvable : {tiles_dir}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    # Import en une passe : pas besoin de journal ni de synchronisation
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    if dedup:
+        create_dedup_schema(conn)
+    else:
+        create_mbtiles_schema(conn)
+
+    pyramid = os.path.basename(os.path.normpath(tiles_dir))
+    zooms = set()
+    tile_count = 0
+    total_bytes = 0
+    # Empreintes déjà stockées dans images (mode dédupliqué)
+    stored = set()
+    batch = []
+
+    def flush(batch):
+        if dedup:
+            images = []
+            for _, _, _, tile_id, data in batch:
+                if data is not None:
+                    images.append((data, tile_id))
+            conn.executemany("INSERT OR IGNORE INTO images VALUES (?, ?)", images)
+            conn.executemany("INSERT OR REPLACE INTO map VALUES (?, ?, ?, ?)",
+                             [row[:4] for row in batch])
+        else:
+            conn.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", batch)
+        conn.commit()
+
+    with tqdm(desc=f"📦 {pyramid}", unit="tile") as bar:
+        for z, x, y, path in iter_pyramid_tiles(tiles_dir):
+            with open(path, 'rb') as f:
+                data = f.read()
+            total_bytes += len(data)
+            zooms.add(z)
+
+            if dedup:
+                tile_id = tile_hash(data)
+                if tile_id in stored:
+                    data = None
+                else:
+                    stored.add(tile_id)
+                batch.append((z, x, y, tile_id, data))
+            else:
+                batch.append((z, x, y, data))
+
+            if len(batch) >= BATCH_SIZE:
+                flush(batch)
+                tile_count += len(batch)
+                bar.update(len(batch))
+                batch = []
+
+        if batch:
+            flush(batch)
+            tile_count += len(batch)
+            bar.update(len(batch))
+
+    metadata = {
+        'name': name or pyramid,
+        'format': 'png',
+        'type': 'baselayer',
+        'version': '1.3',
+        # Les lignes reprennent la numérotation des répertoires (TMS)
+        'scheme': 'tms',
+        'crs': pyramid.split('@')[0].replace('EPSG', 'EPSG:'),
+    }
+    if zooms:
+        metadata['minzoom'] = str(min(zooms))
+        metadata['maxzoom'] = str(max(zooms))
+
+    conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                     metadata.items())
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    os.replace(tmp_path, output_path)
+
+    if verbose:
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print(f"[MBTiles OK] {tile_count} tuiles → {output_path} ({size_mb:.1f} Mo)")
+        if dedup:
+            print(f"   ♻️  {len(stored)} contenus distincts "
+                  f"(source: {total_bytes / (1024 * 1024):.1f} Mo)")
+    return tile_count
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Regroupe une pyramide de tuiles z/x/y.png dans une archive MBTiles")
+    parser.add_argument("pyramids", nargs="*",
+                        help="Pyramides à importer (ex: EPSG3857 EPSG4326@2x). "
+                             "Par défaut : toutes celles de --tiles-dir")
+    parser.add_argument("--tiles-dir", default=TILES_DIR,
+                        help="Répertoire racine des pyramides")
+    parser.add_argument("--output-dir", default=MBTILES_DIR,
+                        help="Répertoire de sortie des archives .mbtiles")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Stocke une seule fois les tuiles identiques "
+                             "(schéma map/images)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    pyramids = args.pyramids
+    if not pyramids:
+        if not os.path.isdir(args.tiles_dir):
+            print(f"❌ Répertoire de tuiles introuvable : {args.tiles_dir}")
+            sys.exit(1)
+        pyramids = sorted(d for d in os.listdir(args.tiles_dir)
+                          if os.path.isdir(os.path.join(args.tiles_dir, d)))
+
+    for pyramid in pyramids:
+        tiles_dir = os.path.join(args.tiles_dir, pyramid)
+        output_path = os.path.join(args.output_dir, f"{pyramid}.mbtiles")
+        try:
+            pack_directory(tiles_dir, output_path, verbose=True, dedup=args.dedup)
+        except Exception as e:
+            print(f"[Erreur] {pyramid} → {e}")
+
+    print("\n🎉 Import MBTiles terminé")
+    print("💡 Démarrez le serveur avec run_tile_server(tile_backend='mbtiles')")
+
+
+if __name__ == "__main__":
+    main()
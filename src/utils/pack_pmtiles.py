@@ -0,0 +1,191 @@
+# src/utils/pack_pmtiles.py
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from tqdm import tqdm
+
+from src.core.pmtiles import (
+    COMPRESSION_GZIP, COMPRESSION_NONE, HEADER_SIZE, PMTILES_DIR,
+    ROOT_DIRECTORY_MAX_SIZE, TILE_TYPE_PNG, Entry, flip_row,
+    serialize_directory, serialize_header, zxy_to_tileid)
+from src.core.tile_pyramid import TILES_DIR, iter_pyramid_tiles
+
+
+# Emprise géographique (lon/lat) des pyramides par CRS
+CRS_BOUNDS = {
+    'EPSG3857': (-180.0, -85.0511287798, 180.0, 85.0511287798),
+    'EPSG4326': (-180.0, -90.0, 180.0, 90.0),
+}
+
+
+def build_directories(entries):
+    """Construit le répertoire racine et les répertoires feuilles.
+
+    Si toutes les entrées ne tiennent pas dans les 16 Ko réservés à la racine,
+    elles sont réparties en feuilles de taille croissante jusqu'à ce que la
+    racine (les pointeurs vers les feuilles) tienne.
+    """
+    root = serialize_directory(entries)
+    if len(root) <= ROOT_DIRECTORY_MAX_SIZE:
+        return root, b"", 0
+
+    leaf_size = 4096
+    while True:
+        leaves = bytearray()
+        root_entries = []
+        for start in range(0, len(entries), leaf_size):
+            chunk = entries[start:start + leaf_size]
+            leaf = serialize_directory(chunk)
+            root_entries.append(
+                Entry(chunk[0].tile_id, len(leaves), len(leaf), 0))
+            leaves.extend(leaf)
+
+        root = serialize_directory(root_entries)
+        if len(root) <= ROOT_DIRECTORY_MAX_SIZE:
+            return root, bytes(leaves), len(root_entries)
+        leaf_size *= 2
+
+
+def pack_directory(tiles_dir, output_path, name=None, verbose=False):
+    """Convertit une pyramide z/x/y.png (process_crs) en archive PMTiles v3.
+
+    Les tuiles identiques (océan uniforme, tuiles transparentes) ne sont
+    stockées qu'une fois, et les suites d'identifiants consécutifs pointant
+    vers le même contenu sont encodées en une seule entrée (run-length).
+    """
+    if not os.path.isdir(tiles_dir):
+        raise FileNotFoundError(f"Pyramide introuvable : {tiles_dir}")
+
+    pyramid = os.path.basename(os.path.normpath(tiles_dir))
+    # Identifiants PMTiles en numérotation XYZ (lignes depuis le nord)
+    tiles = sorted((zxy_to_tileid(z, x, flip_row(z, y)), z, path)
+                   for z, x, y, path in iter_pyramid_tiles(tiles_dir))
+    if not tiles:
+        raise ValueError(f"Aucune tuile dans {tiles_dir}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    entries = []
+    contents = {}
+    data_length = 0
+
+    with tempfile.TemporaryFile() as data_file:
+        for tile_id, _, path in tqdm(tiles, desc=f"📦 {pyramid}", unit="tile"):
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            location = contents.get(digest)
+            if location is None:
+                location = (data_length, len(data))
+                contents[digest] = location
+                data_file.write(data)
+                data_length += len(data)
+
+            offset, length = location
+            last = entries[-1] if entries else None
+            if (last and last.offset == offset and last.length == length
+                    and last.tile_id + last.run_length == tile_id):
+                entries[-1] = last._replace(run_length=last.run_length + 1)
+            else:
+                entries.append(Entry(tile_id, offset, length, 1))
+
+        root, leaves, leaf_count = build_directories(entries)
+
+        min_lon, min_lat, max_lon, max_lat = CRS_BOUNDS.get(
+            pyramid.split('@')[0], CRS_BOUNDS['EPSG4326'])
+        zooms = [z for _, z, _ in tiles]
+        metadata = gzip.compress(json.dumps({
+            'name': name or pyramid,
+            'format': 'png',
+            'type': 'baselayer',
+            'crs': pyramid.split('@')[0].replace('EPSG', 'EPSG:'),
+        }).encode('utf-8'), mtime=0)
+
+        header = {
+            'root_offset': HEADER_SIZE,
+            'root_length': len(root),
+            'metadata_offset': HEADER_SIZE + len(root),
+            'metadata_length': len(metadata),
+            'leaf_directory_offset': HEADER_SIZE + len(root) + len(metadata),
+            'leaf_directory_length': len(leaves),
+            'tile_data_offset': HEADER_SIZE + len(root) + len(metadata) + len(leaves),
+            'tile_data_length': data_length,
+            'addressed_tiles_count': len(tiles),
+            'tile_entries_count': len(entries),
+            'tile_contents_count': len(contents),
+            'clustered': 1,
+            'internal_compression': COMPRESSION_GZIP,
+            'tile_compression': COMPRESSION_NONE,
+            'tile_type': TILE_TYPE_PNG,
+            'min_zoom': min(zooms),
+            'max_zoom': max(zooms),
+            'min_lon_e7': int(min_lon * 1e7),
+            'min_lat_e7': int(min_lat * 1e7),
+            'max_lon_e7': int(max_lon * 1e7),
+            'max_lat_e7': int(max_lat * 1e7),
+            'center_zoom': min(zooms),
+            'center_lon_e7': 0,
+            'center_lat_e7': 0,
+        }
+
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(serialize_header(header))
+            out.write(root)
+            out.write(metadata)
+            out.write(leaves)
+            data_file.seek(0)
+            shutil.copyfileobj(data_file, out, 1024 * 1024)
+        os.replace(tmp_path, output_path)
+
+    if verbose:
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print(f"[PMTiles OK] {len(tiles)} tuiles, {len(contents)} contenus distincts, "
+              f"{leaf_count} feuilles → {output_path} ({size_mb:.1f} Mo)")
+    return len(tiles)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convertit une pyramide de tuiles z/x/y.png en archive PMTiles v3")
+    parser.add_argument("pyramids", nargs="*",
+                        help="Pyramides à convertir (ex: EPSG3857 EPSG4326@2x). "
+                             "Par défaut : toutes celles de --tiles-dir")
+    parser.add_argument("--tiles-dir", default=TILES_DIR,
+                        help="Répertoire racine des pyramides")
+    parser.add_argument("--output-dir", default=PMTILES_DIR,
+                        help="Répertoire de sortie des archives .pmtiles")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    pyramids = args.pyramids
+    if not pyramids:
+        if not os.path.isdir(args.tiles_dir):
+            print(f"❌ Répertoire de tuiles introuvable : {args.tiles_dir}")
+            sys.exit(1)
+        pyramids = sorted(d for d in os.listdir(args.tiles_dir)
+                          if os.path.isdir(os.path.join(args.tiles_dir, d)))
+
+    for pyramid in pyramids:
+        tiles_dir = os.path.join(args.tiles_dir, pyramid)
+        output_path = os.path.join(args.output_dir, f"{pyramid}.pmtiles")
+        try:
+            pack_directory(tiles_dir, output_path, verbose=True)
+        except Exception as e:
+            print(f"[Erreur] {pyramid} → {e}")
+
+    print("\n🎉 Conversion PMTiles terminée")
+    print("💡 Démarrez le serveur avec run_tile_server(tile_backend='pmtiles')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# src/utils/wmts_standin.py
+import argparse
+import base64
+import hashlib
+import http.server
+import random
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+from datetime import datetime, timedelta
+
+
+# Couches exposées par défaut (identifiants au format Copernicus Marine)
+DEFAULT_LAYERS = [
+    "GLOBAL_ANALYSISFORECAST_WAV_001_027/cmems_mod_glo_wav_anfc_0.083deg_PT3H-i_202411/VHM0",
+    "GLOBAL_ANALYSISFORECAST_WAV_001_027/cmems_mod_glo_wav_anfc_0.083deg_PT3H-i_202411/VMDR",
+]
+
+CAPABILITIES_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Capabilities xmlns="http://www.opengis.net/wmts/1.0"
+    xmlns:ows="http://www.opengis.net/ows/1.1"
+    xmlns:xlink="http://www.w3.org/1999/xlink" version="1.0.0">
+  <ows:ServiceIdentification>
+    <ows:Title>WMTS de substitution</ows:Title>
+    <ows:ServiceType>OGC WMTS</ows:ServiceType>
+    <ows:ServiceTypeVersion>1.0.0</ows:ServiceTypeVersion>
+  </ows:ServiceIdentification>
+  <Contents>
+{layers}
+    <TileMatrixSet>
+      <ows:Identifier>EPSG:3857</ows:Identifier>
+      <ows:SupportedCRS>urn:ogc:def:crs:EPSG::3857</ows:SupportedCRS>
+{matrices}
+    </TileMatrixSet>
+  </Contents>
+</Capabilities>
+"""
+
+LAYER_TEMPLATE = """    <Layer>
+      <ows:Title>{title}</ows:Title>
+      <ows:Identifier>{identifier}</ows:Identifier>
+      <Style isDefault="true"><ows:Identifier>default</ows:Identifier></Style>
+      <Format>image/png</Format>
+      <Dimension>
+        <ows:Identifier>time</ows:Identifier>
+        <Default>{time}</Default>
+        <Value>{start}/{time}/PT3H</Value>
+      </Dimension>
+      <TileMatrixSetLink><TileMatrixSet>EPSG:3857</TileMatrixSet></TileMatrixSetLink>
+    </Layer>"""
+
+MATRIX_TEMPLATE = """      <TileMatrix>
+        <ows:Identifier>{z}</ows:Identifier>
+        <ScaleDenominator>{scale}</ScaleDenominator>
+        <TopLeftCorner>-20037508.3427892 20037508.3427892</TopLeftCorner>
+        <TileWidth>256</TileWidth>
+        <TileHeight>256</TileHeight>
+        <MatrixWidth>{size}</MatrixWidth>
+        <MatrixHeight>{size}</MatrixHeight>
+      </TileMatrix>"""
+
+
+def solid_png(rgba, size=256):
+    """PNG uni (sans dépendance) : une couleur par tuile suffit aux essais."""
+    row = b'\x00' + bytes(rgba) * size
+    raw = zlib.compress(row * size, 9)
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', raw) + chunk(b'IEND', b''))
+
+
+class StandinHandler(http.server.BaseHTTPRequestHandler):
+    """Répond à GetCapabilities et GetTile comme le WMTS Copernicus (KVP)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+
+        if server.auth and self.headers.get('Authorization') != server.auth:
+            self._reply(401, b'Unauthorized', 'text/plain',
+                        {'WWW-Authenticate': 'Basic realm="wmts"'})
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self._reply(503, b'Service Unavailable', 'text/plain')
+            return
+
+        query = {k.upper(): v[0] for k, v in urllib.parse.parse_qs(
+            urllib.parse.urlsplit(self.path).query, keep_blank_values=True).items()}
+        request = query.get('REQUEST', '').lower()
+
+        if request == 'getcapabilities':
+            etag = f'"{hashlib.md5(server.capabilities).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._reply(304, b'', None, {'ETag': etag})
+                return
+            self._reply(200, server.capabilities, 'application/xml', {
+                'ETag': etag,
+                'Last-Modified': self.date_time_string(server.started_at),
+            })
+            return
+
+        if request == 'gettile':
+            if query.get('LAYER') not in server.layers:
+                self._reply(400, b'Unknown layer', 'text/plain')
+                return
+            try:
+                z, x, y = (int(query[k]) for k in ('TILEMATRIX', 'TILECOL', 'TILEROW'))
+            except (KeyError, ValueError):
+                self._reply(400, b'Bad tile', 'text/plain')
+                return
+            if '/' in query.get('TIME', ''):
+                self._reply(400, b'Bad time', 'text/plain')
+                return
+            if not (0 <= x < 1 << z and 0 <= y < 1 << z):
+                self._reply(404, b'Tile out of range', 'text/plain')
+                return
+            color = (x * 37 % 256, y * 59 % 256, z * 23 % 256, 160)
+            self._reply(200, solid_png(color), 'image/png')
+            return
+
+        self._reply(400, b'Unsupported request', 'text/plain')
+
+    def _reply(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+def build_capabilities(layers, time_step, max_zoom):
+    # Échéances annoncées comme Copernicus : intervalle début/fin/période
+    # (les 24 heures précédant `time_step`, pas de 3 heures)
+    end = datetime.fromisoformat(time_step.replace('Z', '+00:00'))
+    start = (end - timedelta(hours=21)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    layer_xml = "\n".join(
+        LAYER_TEMPLATE.format(title=layer.rsplit('/', 1)[-1], identifier=layer,
+                              time=time_step, start=start)
+        for layer in layers)
+    matrices = "\n".join(
+        MATRIX_TEMPLATE.format(z=z, size=1 << z, scale=559082264.0287178 / (1 << z))
+        for z in range(max_zoom + 1))
+    return CAPABILITIES_TEMPLATE.format(layers=layer_xml, matrices=matrices).encode('utf-8')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serveur WMTS local de substitution pour tester le proxy et le client")
+    parser.add_argument("--port", type=int, default=8090, help="Port d'écoute")
+    parser.add_argument("--layers", nargs="*", default=DEFAULT_LAYERS,
+                        help="Identifiants des couches exposées")
+    parser.add_argument("--time", default="2025-01-01T00:00:00Z",
+                        help="Échéance annoncée dans GetCapabilities")
+    parser.add_argument("--max-zoom", type=int, default=8,
+                        help="Zoom maximal de la grille EPSG:3857")
+    parser.add_argument("--username", help="Identifiant exigé (Basic)")
+    parser.add_argument("--password", help="Mot de passe exigé (Basic)")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="Latence ajoutée à chaque réponse (simulation WAN)")
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="Proportion de réponses 503 (essais de reprise)")
+    parser.add_argument("--verbose", action="store_true", help="Journal des requêtes")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    server = http.server.ThreadingHTTPServer(("", args.port), StandinHandler)
+    server.layers = set(args.layers)
+    server.capabilities = build_capabilities(args.layers, args.time, args.max_zoom)
+    server.auth = None
+    if args.username and args.password:
+        token = base64.b64encode(f"{args.username}:{args.password}".encode()).decode()
+        server.auth = f"Basic {token}"
+    server.latency = args.latency_ms / 1000
+    server.error_rate = args.error_rate
+    server.verbose = args.verbose
+    server.started_at = time.time()
+    server.requests = 0
+    server.lock = threading.Lock()
+
+    print(f"🛰️  WMTS de substitution sur http://localhost:{args.port}/teroWmts")
+    print(f"💡 Proxy : WMTS_TILE_URL=http://localhost:{args.port}/teroWmts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 Arrêt ({server.requests} requêtes reçues)")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
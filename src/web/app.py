@@ -1,8 +1,10 @@
 # src/web/app.py
+import requests
 import streamlit as st
-from src.core.wmts_client import get_wmts_layers
+from src.core.wmts_client import get_wmts_layers, layer_time_steps
 from src.core.visualize import create_wmts_map, display_folium_map
-from src.app.config import WMTS_URL, COPERNICUS_USERNAME, COPERNICUS_PASSWORD
+from src.app.config import (
+    WMTS_URL, COPERNICUS_USERNAME, COPERNICUS_PASSWORD, TILE_SERVER_URL)
 from dotenv import set_key
 
 st.set_page_config(page_title="Copernicus Marine WMTS Viewer", layout="wide")
@@ -28,6 +30,19 @@ if save_credentials and username and password:
     set_key(".env", "COPERNICUS_PASSWORD", password)
     st.sidebar.success("Identifiants sauvegardés dans .env ✅")
 
+
+def tile_server_available():
+    """Vérifie que le serveur de tuiles (proxy WMTS) répond.
+
+    Requête locale directe, sans la session Copernicus (nouvelles tentatives,
+    métriques amont).
+    """
+    try:
+        return requests.get(f"{TILE_SERVER_URL}/health", timeout=2).ok
+    except requests.RequestException:
+        return False
+
+
 # Connexion
 if username and password:
     try:
@@ -37,8 +52,23 @@ if username and password:
         selected_layer = st.selectbox(
             "🛰️ Sélectionnez une couche à afficher :", layers)
 
+        time_steps, default_time_step = layer_time_steps(wmts, selected_layer)
+        time_step = default_time_step
+        if time_steps:
+            time_step = st.selectbox(
+                "🕒 Échéance :", time_steps,
+                index=time_steps.index(default_time_step)
+                if default_time_step in time_steps else len(time_steps) - 1)
+
         if st.button("Afficher la carte"):
-            m = create_wmts_map(WMTS_URL, selected_layer, username, password)
+            # Tuiles servies par le proxy du serveur de tuiles (cache disque),
+            # sinon directement par Copernicus
+            proxy_url = TILE_SERVER_URL if tile_server_available() else None
+            if proxy_url is None:
+                st.warning(f"Serveur de tuiles injoignable ({TILE_SERVER_URL}) : "
+                           "tuiles demandées directement à Copernicus.")
+            m = create_wmts_map(WMTS_URL, selected_layer, username, password,
+                                proxy_url=proxy_url, time_step=time_step)
             display_folium_map(m)
 
     except Exception as e:
@@ -4,6 +4,9 @@ import { ScaleBar } from './scaleBar.js';
 import { ZoomController } from './zoomController.js';
 import { CoordinatesControl } from './coordinates.js';
 
+// Tuile transparente 1x1 renvoyée pour les tuiles invalides ou absentes
+const EMPTY_TILE_URL = 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=';
+
 export class MapManager {
     constructor() {
         this.map = null;
@@ -129,6 +132,8 @@ export class MapManager {
         const config = this.getProjectionConfig();
         const { initialCenter, initialZoom } = this.calculateInitialView(config);
 
+        TileValidator.loadTileIndex(this.currentProjection);
+
         console.log('🎯 Configuration vue initiale:', {
             center: initialCenter,
             zoom: initialZoom,
@@ -332,6 +337,7 @@ export class MapManager {
         this.saveViewState();
 
         this.currentProjection = newProjection;
+        TileValidator.loadTileIndex(newProjection);
 
         if (this.map) {
             const config = this.getProjectionConfig();
@@ -446,7 +452,7 @@ export class MapManager {
             if (this.currentProjection === 'EPSG4326') {
                 console.warn(`🚫 Tuile EPSG4326 invalide ignorée: ${z}/${x}/${y}`);
             }
-            return 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=';
+            return EMPTY_TILE_URL;
         }
 
         let y_corrected;
@@ -458,6 +464,11 @@ export class MapManager {
             y_corrected = limits.maxY - y;
         }
 
+        // Tuile jamais générée : inutile de la demander au serveur
+        if (!TileValidator.hasTile(this.currentProjection, z, x, y_corrected)) {
+            return EMPTY_TILE_URL;
+        }
+
         const url = `http://localhost:8000/data/map/tiles/${this.currentProjection}/${z}/${x}/${y_corrected}.png`;
         return url;
     }
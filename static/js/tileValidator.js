@@ -1,5 +1,89 @@
 // static/js/tileValidator.js
+const TILE_SERVER_URL = 'http://localhost:8000';
+
 export class TileValidator {
+    // Index des tuiles existantes publié par le serveur, par projection
+    static tileIndexes = {};
+
+    static loadTileIndex(projection) {
+        if (this.tileIndexes[projection]) {
+            return this.tileIndexes[projection].ready;
+        }
+
+        const entry = { summary: null, bitmaps: {}, pending: {} };
+        entry.ready = fetch(`${TILE_SERVER_URL}/data/map/tile-index/${projection}.json`)
+            .then(response => response.ok ? response.json() : null)
+            .then(summary => {
+                entry.summary = summary;
+                if (summary) {
+                    console.log(`🧮 Index des tuiles ${projection} chargé:`, summary.zooms);
+                }
+            })
+            .catch(error => {
+                console.warn(`⚠️ Index des tuiles ${projection} indisponible:`, error);
+            });
+
+        this.tileIndexes[projection] = entry;
+        return entry.ready;
+    }
+
+    static loadZoomBitmap(projection, entry, z) {
+        if (entry.pending[z]) return;
+
+        entry.pending[z] = fetch(`${TILE_SERVER_URL}/data/map/tile-index/${projection}/${z}.bin`)
+            .then(response => response.ok ? response.arrayBuffer() : null)
+            .then(buffer => {
+                if (!buffer) return;
+                const level = entry.summary.zooms[z];
+                if (level.encoding !== 'blocks') {
+                    entry.bitmaps[z] = new Uint8Array(buffer);
+                    return;
+                }
+                // Blocs non vides : (bx, by) en uint32 puis le bitmap du bloc
+                const blockSize = entry.summary.block_size;
+                const blockBytes = blockSize * blockSize / 8;
+                const view = new DataView(buffer);
+                const blocks = new Map();
+                for (let offset = 0; offset + 8 + blockBytes <= buffer.byteLength; offset += 8 + blockBytes) {
+                    const bx = view.getUint32(offset, true);
+                    const by = view.getUint32(offset + 4, true);
+                    blocks.set(`${bx}/${by}`, new Uint8Array(buffer, offset + 8, blockBytes));
+                }
+                entry.bitmaps[z] = blocks;
+            })
+            .catch(error => {
+                console.warn(`⚠️ Bitmap du zoom ${z} indisponible:`, error);
+            });
+    }
+
+    // Vérifie dans l'index si la tuile existe (y en numérotation TMS).
+    // Tant que l'index n'est pas chargé, la tuile est supposée présente.
+    static hasTile(projection, z, x, y) {
+        const entry = this.tileIndexes[projection];
+        if (!entry || !entry.summary || entry.summary.dynamic) return true;
+
+        const level = entry.summary.zooms[z];
+        if (!level) return false;
+        if (level.count === level.columns * level.rows) return true;
+
+        const bitmap = entry.bitmaps[z];
+        if (!bitmap) {
+            this.loadZoomBitmap(projection, entry, z);
+            return true;
+        }
+
+        if (level.encoding === 'blocks') {
+            const blockSize = entry.summary.block_size;
+            const block = bitmap.get(`${Math.floor(x / blockSize)}/${Math.floor(y / blockSize)}`);
+            if (!block) return false;
+            const i = (y % blockSize) * blockSize + (x % blockSize);
+            return (block[i >> 3] & (1 << (i & 7))) !== 0;
+        }
+
+        const i = y * level.columns + x;
+        return (bitmap[i >> 3] & (1 << (i & 7))) !== 0;
+    }
+
     static isValidTile(projection, z, x, y) {
         if (projection === 'EPSG3857') {
             const max = Math.pow(2, z) - 1;